@@ -1,15 +1,17 @@
+import time
+
+APP_START = time.perf_counter()
+
 import streamlit as st
 import sys
 import os
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-import joblib
 import base64
-import time
+from concurrent.futures import ThreadPoolExecutor
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from src.prediction_pipeline import FlightDelayPredictor
+# plotly, pandas, joblib and the model code are imported where they are first needed so the
+# loading screen can paint before they are loaded
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(APP_ROOT)
 
 # Page Configuration
 st.set_page_config(
@@ -30,8 +32,9 @@ def get_month_name(month_number):
     return MONTH_NAMES.get(month_number, 'Unknown')
 
 
+@st.cache_resource
 def get_image_base64(image_path):
-    """Convert image to base64 for embedding in HTML"""
+    """Convert image to base64 for embedding in HTML, once per server process"""
     try:
         with open(image_path, "rb") as img_file:
             return base64.b64encode(img_file.read()).decode()
@@ -40,7 +43,24 @@ def get_image_base64(image_path):
         return None
 
 
-def get_risk_profile(probability):
+def get_risk_range(result):
+    """Text for the prediction interval of a predict() result, or None when it has no interval"""
+    low, high = result.get('interval_low'), result.get('interval_high')
+    if low is None or high is None or low != low or high != high:
+        return None
+    levels = _risk_profile(low)["level"], _risk_profile(high)["level"]
+    basis = "route history" if result.get('interval_source') == 'observed' else "model trees"
+    span = levels[0] if levels[0] == levels[1] else f"{levels[0]} to {levels[1]}"
+    return f"{result['interval_level']:.0%} range {low:.1%}–{high:.1%} ({span}, from {basis})"
+
+
+def get_risk_profile(probability, result=None):
+    profile = _risk_profile(probability)
+    profile["range"] = get_risk_range(result) if result is not None else None
+    return profile
+
+
+def _risk_profile(probability):
     if probability < 0.15:
         return {
             "level": "Very Low",
@@ -87,29 +107,112 @@ def get_risk_profile(probability):
         }
 
 
+@st.cache_resource
+def load_stylesheet(css_path):
+    with open(css_path, encoding="utf-8") as css_file:
+        return f"<style>\n{css_file.read()}\n</style>"
+
+
 # Caching
+def _create_predictor():
+    from src.prediction_pipeline import ReloadingPredictor
+    # FLIGHTCAST_MISS_MODEL=surrogate scores unseen routes with the distilled surrogate
+    # FLIGHTCAST_DRIFT_INTERVAL=<seconds> prints a drift report of the queries at that interval
+    # FLIGHTCAST_TELEMETRY=<path> writes prediction telemetry there every minute (.prom for Prometheus)
+    # FLIGHTCAST_RELOAD_INTERVAL=<seconds> how often to check the model registry for a new version
+    # FLIGHTCAST_SHADOW_MODELS=<all or comma-separated keys, e.g. rf,gb> scores those models in the background
+    # and prints how far they are from the served model every minute
+    drift_interval = os.environ.get("FLIGHTCAST_DRIFT_INTERVAL")
+    telemetry_path = os.environ.get("FLIGHTCAST_TELEMETRY")
+    shadow_models = os.environ.get("FLIGHTCAST_SHADOW_MODELS")
+    if shadow_models and shadow_models != "all":
+        shadow_models = shadow_models.split(",")
+
+    def on_load(new, old):
+        # The monitor and exporter threads move to the newly loaded predictor
+        if old is not None and old.monitor is not None:
+            old.monitor.stop()
+        if old is not None and old.telemetry is not None:
+            old.telemetry.stop_exporter()
+        if old is not None and old.shadow is not None:
+            old.shadow.close()
+        if new.monitor is not None:
+            new.monitor.start(float(drift_interval))
+        if new.telemetry is not None:
+            new.telemetry.start_exporter(telemetry_path)
+        if new.shadow is not None:
+            new.shadow.start()
+
+    return ReloadingPredictor(interval=float(os.environ.get("FLIGHTCAST_RELOAD_INTERVAL", 30)), on_load=on_load,
+                              miss_model=os.environ.get("FLIGHTCAST_MISS_MODEL", "model"),
+                              monitor_drift=bool(drift_interval), telemetry=bool(telemetry_path),
+                              shadow_models=shadow_models)
+
+
 @st.cache_resource
+def warm_predictor():
+    """Start loading the predictor in the background and return its future"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="predictor-warmup").submit(_create_predictor)
+
+
 def load_predictor():
-    return FlightDelayPredictor()
+    try:
+        return warm_predictor().result()
+    except Exception:
+        # Otherwise the failed future stays cached and every rerun raises the same error
+        warm_predictor.clear()
+        raise
+
+
+@st.cache_data
+def load_leaderboards(model_version):
+    import joblib
+    from src.utils import build_leaderboards
+
+    predictor = load_predictor()
+    models_path = os.path.join(APP_ROOT, predictor.models_dir)
+    carrier_path = os.path.join(models_path, 'carrier_leaderboard.pkl')
+    airport_path = os.path.join(models_path, 'airport_leaderboard.pkl')
+    if os.path.exists(carrier_path) and os.path.exists(airport_path):
+        return joblib.load(carrier_path), joblib.load(airport_path)
+
+    # Artifacts from before the leaderboards were saved: aggregate the lookup table once
+    return build_leaderboards(predictor.lookup.to_frame(), predictor.carrier_names, predictor.airport_names)
+
+
+@st.cache_data
+def load_network_monthly():
+    # Network-wide monthly delay rate from the report tables written by main.py, if present
+    from src.report_tables import read_report_table
+
+    models_path = os.path.join(APP_ROOT, 'models')
+    try:
+        monthly_stats = read_report_table('monthly_patterns', models_path)
+    except FileNotFoundError:
+        return None
+    return monthly_stats[('delay_rate', 'mean')]
 
 
 @st.cache_data
-def load_ui_lookup():
-    models_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
-    ui_lookup_path = os.path.join(models_path, 'ui_lookup_table.pkl')
-    return joblib.load(ui_lookup_path)
+def get_monthly_profile(carrier, airport, model_version):
+    return load_predictor().predict_months(carrier, airport, 100)
 
 
 @st.cache_data
-def get_carrier_airports(_ui_lookup_df, carrier):
-    carrier_airports = _ui_lookup_df[_ui_lookup_df['carrier'] == carrier]['airport'].unique().tolist()
-    return sorted(carrier_airports)
+def get_capacity_scenarios(carrier, airport, model_version):
+    return load_predictor().scenario_grid(carrier, airport)
 
 
 @st.cache_data
-def get_airport_carriers(_ui_lookup_df, airport):
-    airport_carriers = _ui_lookup_df[_ui_lookup_df['airport'] == airport]['carrier'].unique().tolist()
-    return sorted(airport_carriers)
+def get_carrier_comparison(airport, month, model_version):
+    predictor = load_predictor()
+    return predictor.predict_carriers(predictor.get_airport_carriers(airport), airport, month, 100)
+
+
+@st.cache_data
+def get_airport_comparison(carrier, month, model_version):
+    predictor = load_predictor()
+    return predictor.predict_airports(carrier, predictor.get_carrier_airports(carrier), month, 100)
 
 
 # Initialize session state for loading
@@ -121,646 +224,13 @@ if 'show_toast' not in st.session_state:
     st.session_state.show_toast = False
 
 
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Manrope:wght@300;400;500;600;700&display=swap');
-
-    /* Simplified Loading Screen */
-    .loading-screen {
-        position: fixed;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background: #fafafa;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        z-index: 99999;
-        animation: fadeOut 0.8s ease-in-out 2s forwards;
-    }
-
-    @keyframes fadeOut {
-        from {
-            opacity: 1;
-            visibility: visible;
-        }
-        to {
-            opacity: 0;
-            visibility: hidden;
-        }
-    }
-
-    .loading-logo {
-        width: 200px;
-        height: auto;
-        animation: logoFloat 2.5s ease-in-out infinite;
-    }
-
-    @keyframes logoFloat {
-        0%, 100% {
-            transform: translateY(0px);
-            opacity: 0.9;
-        }
-        50% {
-            transform: translateY(-15px);
-            opacity: 1;
-        }
-    }
-
-    /* Reset and Base */
-    .stApp {
-        background: #fafafa;
-        font-family: 'Manrope', sans-serif;
-    }
-
-    /* Hide default Streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-
-    /* Typography */
-    h1, h2, h3 {
-        font-family: 'Manrope', sans-serif !important;
-        font-weight: 500 !important;
-        color: #1f1f1f !important;
-        letter-spacing: -0.02em;
-    }
-
-    h1 {
-        font-size: 3rem !important;
-        margin-bottom: 0.5rem !important;
-    }
-
-    h2 {
-        font-size: 2rem !important;
-        margin-top: 2rem !important;
-    }
-
-    h3 {
-        font-size: 1.5rem !important;
-    }
-
-    p, label, div {
-        color: #3c4043;
-        font-size: 1rem;
-    }
-
-    label {
-        font-weight: 500 !important;
-        color: #1f1f1f !important;
-        font-size: 0.95rem !important;
-    }
-
-    /* Cards */
-    .metric-card {
-        background: white;
-        border-radius: 12px;
-        padding: 28px;
-        box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3), 0 1px 3px 1px rgba(60,64,67,0.15);
-        transition: box-shadow 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        border: none;
-    }
-
-    .metric-card:hover {
-        box-shadow: 0 1px 3px 0 rgba(60,64,67,0.3), 0 4px 8px 3px rgba(60,64,67,0.15);
-    }
-
-    /* Input Fields - Material Design */
-    .stSelectbox > div > div {
-        background: #ffffff !important;
-        border: 1.5px solid #dadce0 !important;
-        border-radius: 8px !important;
-        transition: all 0.2s !important;
-        font-size: 1rem !important;
-        color: #1f1f1f !important;
-    }
-
-    .stSelectbox > div > div:hover {
-        border-color: #1f1f1f !important;
-        box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3) !important;
-        background: #ffffff !important;
-    }
-
-    .stSelectbox > div > div:focus-within {
-        border-color: #1a73e8 !important;
-        border-width: 2px !important;
-        box-shadow: 0 0 0 1px #1a73e8 !important;
-        background: #ffffff !important;
-    }
-
-    /* Text Input Styling */
-    .stTextInput > div > div > input {
-        background: #ffffff !important;
-        border: 1.5px solid #dadce0 !important;
-        border-radius: 8px !important;
-        transition: all 0.2s !important;
-        font-size: 1rem !important;
-        color: #1f1f1f !important;
-        padding: 10px 14px !important;
-    }
-
-    .stTextInput > div > div > input:hover {
-        border-color: #1f1f1f !important;
-        box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3) !important;
-    }
-
-    .stTextInput > div > div > input:focus {
-        border-color: #1a73e8 !important;
-        border-width: 2px !important;
-        box-shadow: 0 0 0 1px #1a73e8 !important;
-        outline: none !important;
-    }
-
-    /* Dropdown options */
-    [data-baseweb="select"] > div {
-        background: #ffffff !important;
-        color: #1f1f1f !important;
-        font-size: 1rem !important;
-    }
-
-    /* Dropdown menu */
-    [data-baseweb="popover"] {
-        background: #ffffff !important;
-    }
-
-    [role="option"] {
-        background: #ffffff !important;
-        color: #1f1f1f !important;
-    }
-
-    [role="option"]:hover {
-        background: #f1f3f4 !important;
-        color: #1f1f1f !important;
-    }
-
-    /* Selected option in dropdown */
-    [data-baseweb="select"] [data-baseweb="input"] {
-        color: #1f1f1f !important;
-    }
-
-    /* Input text while typing in selectbox */
-    [data-baseweb="select"] input {
-        color: #1f1f1f !important;
-        caret-color: #1a73e8 !important;
-    }
-
-    /* Ensure all text in select is visible */
-    [data-baseweb="select"] * {
-        color: #1f1f1f !important;
-    }
-
-    /* Search input in dropdown */
-    [data-baseweb="menu"] input {
-        color: #1f1f1f !important;
-        background: #ffffff !important;
-    }
-
-    /* Multi-select specific */
-    .stMultiSelect > div > div {
-        background: #ffffff !important;
-        border: 1.5px solid #dadce0 !important;
-        color: #1f1f1f !important;
-    }
-
-    .stMultiSelect > div > div:hover {
-        border-color: #1f1f1f !important;
-        background: #ffffff !important;
-    }
-
-    /* Buttons */
-    .stButton > button {
-        background: #1a73e8 !important;
-        color: #ffffff !important;
-        border: none !important;
-        border-radius: 100px !important;
-        padding: 14px 36px !important;
-        font-family: 'Manrope', sans-serif !important;
-        font-weight: 500 !important;
-        font-size: 1rem !important;
-        letter-spacing: 0.0107em !important;
-        box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3), 0 1px 3px 1px rgba(60,64,67,0.15) !important;
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1) !important;
-        height: auto !important;
-    }
-
-    .stButton > button:hover {
-        background: #1557b0 !important;
-        color: #ffffff !important;
-        box-shadow: 0 1px 3px 0 rgba(60,64,67,0.3), 0 4px 8px 3px rgba(60,64,67,0.15) !important;
-    }
-
-    .stButton > button:active {
-        background: #174ea6 !important;
-        color: #ffffff !important;
-    }
-
-    /* Force white text color on button text specifically */
-    .stButton > button p,
-    .stButton > button span,
-    .stButton > button div {
-        color: #ffffff !important;
-    }
-
-    /* Disabled button - Material Design style */
-    .stButton > button:disabled,
-    .stButton > button:disabled:hover,
-    .stButton > button:disabled:active,
-    button[disabled],
-    button[disabled]:hover {
-        background: #e8eaed !important;
-        color: #5f6368 !important;
-        box-shadow: none !important;
-        cursor: not-allowed !important;
-        opacity: 1 !important;
-        border: 1px solid #dadce0 !important;
-    }
-
-    /* Tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-        background: transparent;
-        border-bottom: 1px solid #dadce0;
-    }
-
-    .stTabs [data-baseweb="tab"] {
-        background: transparent;
-        border: none;
-        color: #3c4043;
-        font-family: 'Manrope', sans-serif;
-        font-weight: 500;
-        padding: 14px 18px;
-        border-radius: 8px 8px 0 0;
-        font-size: 1rem;
-    }
-
-    .stTabs [aria-selected="true"] {
-        background: white;
-        color: #1a73e8;
-        border-bottom: 3px solid #1a73e8;
-    }
-
-    /* Metrics */
-    [data-testid="stMetricValue"] {
-        font-family: 'Manrope', sans-serif;
-        font-size: 2.25rem;
-        font-weight: 500;
-        color: #1f1f1f;
-    }
-
-    [data-testid="stMetricLabel"] {
-        font-family: 'Manrope', sans-serif;
-        font-size: 0.85rem;
-        color: #3c4043;
-        text-transform: uppercase;
-        letter-spacing: 0.08em;
-        font-weight: 500;
-    }
-
-    /* Dataframes */
-    .stDataFrame {
-        border-radius: 8px;
-        border: 1px solid #dadce0;
-        overflow: hidden;
-    }
-
-    /* Expander */
-    .streamlit-expanderHeader {
-        background: white;
-        border-radius: 8px;
-        border: 1px solid #dadce0;
-        font-family: 'Manrope', sans-serif;
-        color: #1f1f1f;
-        font-size: 1rem;
-        padding: 16px !important;
-    }
-
-    .streamlit-expanderHeader:hover {
-        border-color: #1f1f1f;
-    }
-
-    /* Info boxes */
-    .stAlert {
-        background: white;
-        border: 1px solid #dadce0;
-        border-radius: 8px;
-        padding: 16px;
-        border-left: 4px solid #1a73e8;
-    }
-
-    /* Divider */
-    hr {
-        border: none;
-        border-top: 1px solid #dadce0;
-        margin: 2rem 0;
-    }
-
-    /* Container spacing */
-    .block-container {
-        padding-top: 5rem;
-        padding-bottom: 3rem;
-        max-width: 1400px;
-    }
-
-    /* Navigation Bar - ENHANCED */
-    .nav-bar {
-        position: fixed;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 64px;
-        background: #ffffff;
-        border-bottom: 1px solid #dadce0;
-        z-index: 1000;
-        display: flex;
-        align-items: center;
-        padding: 0 24px;
-        box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3), 0 1px 3px 1px rgba(60,64,67,0.15);
-    }
-
-    .nav-content {
-        max-width: 1400px;
-        width: 100%;
-        margin: 0 auto;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-    }
-
-    .nav-brand {
-        display: flex;
-        align-items: center;
-        gap: 12px;
-        text-decoration: none;
-    }
-
-    .nav-logo {
-        width: auto;
-        height: 50px;
-        object-fit: contain;
-    }
-
-    .nav-logo-emoji {
-        font-size: 28px;
-    }
-
-    .nav-title {
-        font-family: 'Manrope', sans-serif;
-        font-size: 1.5rem;
-        font-weight: 500;
-        color: #1f1f1f;
-        letter-spacing: -0.02em;
-    }
-
-    .nav-links {
-        display: flex;
-        align-items: center;
-        gap: 8px;
-    }
-
-    .nav-link {
-        font-family: 'Manrope', sans-serif;
-        font-size: 0.95rem;
-        font-weight: 500;
-        color: #5f6368;
-        padding: 8px 16px;
-        border-radius: 24px;
-        text-decoration: none;
-        transition: all 0.2s;
-        cursor: pointer;
-    }
-
-    .nav-link:hover {
-        background: #f1f3f4;
-        color: #1f1f1f;
-    }
-
-    /* ENHANCED: Darker background for active nav item */
-    .nav-link.active {
-        background: #d2e3fc;
-        color: #1a73e8;
-        font-weight: 500;
-    }
-
-    .nav-button {
-        background: #1a73e8;
-        color: white;
-        border: none;
-        padding: 10px 24px;
-        border-radius: 24px;
-        font-family: 'Manrope', sans-serif;
-        font-weight: 500;
-        font-size: 0.95rem;
-        cursor: pointer;
-        transition: all 0.2s;
-        box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3);
-    }
-
-    .nav-button:hover {
-        background: #1557b0;
-        box-shadow: 0 1px 3px 0 rgba(60,64,67,0.3), 0 2px 4px 2px rgba(60,64,67,0.15);
-    }
-
-    /* Mobile responsive */
-    @media (max-width: 768px) {
-        .nav-links {
-            display: none;
-        }
-
-        .block-container {
-            padding-top: 4rem;
-        }
-    }
-
-    /* Smooth scroll */
-    html {
-        scroll-behavior: smooth;
-    }
-
-    /* Section anchors */
-    .section-anchor {
-        scroll-margin-top: 80px;
-        display: block;
-        height: 0;
-        visibility: hidden;
-    }
-
-    /* Remove box border from containers */
-    [data-testid="stVerticalBlock"] > div {
-        background: transparent;
-    }
-
-    /* Spinner */
-    .stSpinner > div {
-        border-top-color: #1a73e8 !important;
-    }
-
-    /* Toast Notification Styles */
-    @keyframes slideInDown {
-        from {
-            transform: translateY(-100%);
-            opacity: 0;
-        }
-        to {
-            transform: translateY(0);
-            opacity: 1;
-        }
-    }
-
-    @keyframes slideOutUp {
-        from {
-            transform: translateY(0);
-            opacity: 1;
-        }
-        to {
-            transform: translateY(-100%);
-            opacity: 0;
-        }
-    }
-
-    @keyframes progressBar {
-        from {
-            width: 0%;
-        }
-        to {
-            width: 100%;
-        }
-    }
-
-    .toast-notification {
-        position: fixed;
-        top: 0;
-        left: 0;
-        right: 0;
-        z-index: 9999;
-        width: 100%;
-        padding: 15px 24px;
-        box-shadow: 0 4px 16px rgba(0, 0, 0, 0.15);
-        animation: slideInDown 0.5s cubic-bezier(0.4, 0, 0.2, 1);
-        font-family: 'Manrope', sans-serif;
-        overflow: hidden;
-    }
-
-    .toast-notification.hide {
-        animation: slideOutUp 0.5s cubic-bezier(0.4, 0, 0.2, 1);
-    }
-
-    .toast-progress-bar {
-        position: absolute;
-        bottom: 0;
-        left: 0;
-        height: 4px;
-        background: rgba(255, 255, 255, 0.9);
-        animation: progressBar 4s linear;
-        box-shadow: 0 0 10px rgba(255, 255, 255, 0.5);
-    }
-
-    .toast-very-low {
-        background: linear-gradient(135deg, #34a853 0%, #2d9248 100%);
-        color: white;
-    }
-
-    .toast-very-low .toast-progress-bar {
-        background: rgba(255, 255, 255, 0.9);
-    }
-
-    .toast-low {
-        background: linear-gradient(135deg, #4285f4 0%, #3367d6 100%);
-        color: white;
-    }
-
-    .toast-low .toast-progress-bar {
-        background: rgba(255, 255, 255, 0.9);
-    }
-
-    .toast-moderate {
-        background: linear-gradient(135deg, #fbbc04 0%, #f9ab00 100%);
-        color: white;
-    }
-
-    .toast-moderate .toast-progress-bar {
-        background: rgba(255, 255, 255, 0.9);
-    }
-
-    .toast-high {
-        background: linear-gradient(135deg, #ea4335 0%, #d93025 100%);
-        color: white;
-    }
-
-    .toast-high .toast-progress-bar {
-        background: rgba(255, 255, 255, 0.9);
-    }
-
-    .toast-container {
-        max-width: 1400px;
-        margin: 0 auto;
-        display: flex;
-        align-items: center;
-        position: relative;
-    }
-
-    .toast-icon {
-        font-size: 32px;
-        margin-right: 16px;
-        display: inline-block;
-        vertical-align: middle;
-        filter: drop-shadow(0 2px 4px rgba(0, 0, 0, 0.2));
-    }
-
-    .toast-content {
-        display: inline-block;
-        vertical-align: middle;
-        flex: 1;
-    }
-
-    .toast-title {
-        font-family: 'Manrope', sans-serif;
-        font-size: 1.2rem;
-        font-weight: 500;
-        margin-bottom: 4px;
-        color: white;
-        text-shadow: 0 1px 3px rgba(0, 0, 0, 0.2);
-    }
-
-    .toast-message {
-        font-size: 1rem;
-        color: rgba(255, 255, 255, 0.95);
-        line-height: 1.4;
-        text-shadow: 0 1px 2px rgba(0, 0, 0, 0.1);
-    }
-
-    .toast-close {
-        background: rgba(255, 255, 255, 0.2);
-        border: none;
-        color: white;
-        width: 32px;
-        height: 32px;
-        border-radius: 50%;
-        cursor: pointer;
-        font-size: 20px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        transition: all 0.2s;
-        margin-left: 16px;
-        flex-shrink: 0;
-    }
-
-    .toast-close:hover {
-        background: rgba(255, 255, 255, 0.3);
-        transform: scale(1.1);
-    }
-
-    .toast-close:active {
-        transform: scale(0.95);
-    }
-</style>
-""", unsafe_allow_html=True)
+# Stylesheet is read from disk once per server process
+st.markdown(load_stylesheet(os.path.join(APP_ROOT, "assets", "css", "app.css")), unsafe_allow_html=True)
 
 # Loading Screen
 if not st.session_state.app_loaded:
-    logo_path = "assets/img/FlightCAST_loading (1).png"
+    warm_predictor()
+    logo_path = os.path.join(APP_ROOT, "assets", "img", "FlightCAST_loading (1).png")
     logo_base64_loading = get_image_base64(logo_path)
 
     if logo_base64_loading:
@@ -784,16 +254,16 @@ if not st.session_state.app_loaded:
         </script>
         """, unsafe_allow_html=True)
 
+    if os.environ.get("FLIGHTCAST_PROFILE_STARTUP"):
+        print(f"First paint: {(time.perf_counter() - APP_START) * 1000:.0f} ms after script start")
+
     time.sleep(2.2)
     st.session_state.app_loaded = True
     loading_placeholder.empty()
     st.rerun()
 
-# Initialize
-predictor = load_predictor()
-ui_lookup = load_ui_lookup()
-ui_lookup['carrier_name'] = ui_lookup['carrier'].map(predictor.carrier_names)
-ui_lookup['airport_name'] = ui_lookup['airport'].map(predictor.airport_names)
+# Initialize: one version of the model serves the whole rerun, even if a new one is swapped in meanwhile
+predictor = load_predictor().current
 
 # Initialize session state for navigation
 if 'active_nav' not in st.session_state:
@@ -803,7 +273,7 @@ if 'active_nav' not in st.session_state:
 toast_placeholder = st.empty()
 
 # Navigation Bar with logo
-logo_path = "assets/img/FlightCAST.png"
+logo_path = os.path.join(APP_ROOT, "assets", "img", "FlightCAST.png")
 logo_base64 = get_image_base64(logo_path)
 
 if logo_base64:
@@ -934,7 +404,7 @@ with input_col1:
         label_visibility="visible"
     )
 
-available_airports = get_carrier_airports(ui_lookup, carrier)
+available_airports = predictor.get_carrier_airports(carrier)
 
 
 def format_airport_name(airport_code):
@@ -964,9 +434,11 @@ st.markdown("<div style='height: 32px;'></div>", unsafe_allow_html=True)
 
 # Prediction Results
 if predict_btn and airport:
+    import plotly.graph_objects as go
+
     with st.spinner('Processing analysis...'):
         result = predictor.predict(carrier, airport, month, 100)
-        risk_profile = get_risk_profile(result['delay_probability'])
+        risk_profile = get_risk_profile(result['delay_probability'], result)
 
     # Show toast notification
     import random
@@ -1073,6 +545,7 @@ if predict_btn and airport:
             <div style="color: {risk_profile['color']}; font-size: 0.9rem; font-weight: 500; text-transform: uppercase; letter-spacing: 0.1em; margin-bottom: 12px;">Risk Level</div>
             <div style="font-size: 2.5rem; font-weight: 600; color: {risk_profile['color']}; font-family: 'Manrope', sans-serif; margin-bottom: 16px; position: relative; z-index: 1;">{risk_profile['level']}</div>
             <div style="color: #1f1f1f; font-size: 0.95rem; line-height: 1.5; position: relative; z-index: 1;">{risk_profile['message'][:120]}...</div>
+            {f'<div style="color: #5f6368; font-size: 0.85rem; margin-top: 12px; position: relative; z-index: 1;">{risk_profile["range"]}</div>' if risk_profile['range'] else ''}
         </div>
         """, unsafe_allow_html=True)
 
@@ -1162,8 +635,7 @@ if predict_btn and airport:
             f"<p style='color: #3c4043; margin-bottom: 24px; font-size: 1rem;'>{carrier} operations at {airport}</p>",
             unsafe_allow_html=True)
 
-        monthly_data = [predictor.predict(carrier, airport, m, 100) for m in range(1, 13)]
-        df_monthly = pd.DataFrame(monthly_data)
+        df_monthly = get_monthly_profile(carrier, airport, predictor.version)
         df_monthly['Month_Name'] = df_monthly['month'].map(MONTH_NAMES)
         df_monthly['Delay_Probability_Pct'] = df_monthly['delay_probability'] * 100
 
@@ -1179,6 +651,15 @@ if predict_btn and airport:
                 marker=dict(size=10, color='#1a73e8'),
                 name='Delay Rate'
             ))
+            network_monthly = load_network_monthly()
+            if network_monthly is not None:
+                fig_line.add_trace(go.Scatter(
+                    x=df_monthly['Month_Name'],
+                    y=network_monthly.reindex(df_monthly['month']).to_numpy() * 100,
+                    mode='lines',
+                    line=dict(color='#9aa0a6', width=2, dash='dot'),
+                    name='Network Average'
+                ))
             fig_line.add_hline(
                 y=predictor.stats['overall_delay_rate'] * 100,
                 line_dash="dash",
@@ -1259,6 +740,58 @@ if predict_btn and airport:
             </div>
             """, unsafe_allow_html=True)
 
+        st.markdown("#### Capacity Sensitivity")
+        st.markdown(
+            "<p style='color: #3c4043; margin-bottom: 24px; font-size: 1rem;'>Modelled delay probability by monthly flight volume</p>",
+            unsafe_allow_html=True)
+
+        df_scenarios = get_capacity_scenarios(carrier, airport, predictor.version)
+        selected = df_scenarios[df_scenarios['month'] == month]
+        fig_capacity = go.Figure()
+        for other_month, rows in df_scenarios[df_scenarios['month'] != month].groupby('month'):
+            fig_capacity.add_trace(go.Scatter(
+                x=rows['arr_flights'], y=rows['delay_probability'] * 100, mode='lines',
+                line=dict(color='#dadce0', width=1), name=MONTH_NAMES[other_month], showlegend=False,
+                hovertemplate='%{x} flights: %{y:.1f}%<extra>' + MONTH_NAMES[other_month] + '</extra>'
+            ))
+        if selected['interval_low'].notna().any():
+            fig_capacity.add_trace(go.Scatter(
+                x=list(selected['arr_flights']) + list(selected['arr_flights'][::-1]),
+                y=list(selected['interval_high'] * 100) + list(selected['interval_low'][::-1] * 100),
+                fill='toself', fillcolor='rgba(26, 115, 232, 0.12)', line=dict(width=0),
+                hoverinfo='skip', name='90% range'
+            ))
+        fig_capacity.add_trace(go.Scatter(
+            x=selected['arr_flights'], y=selected['delay_probability'] * 100, mode='lines',
+            line=dict(color='#1a73e8', width=3), name=get_month_name(month)
+        ))
+        if selected['historical_delay_probability'].notna().any():
+            fig_capacity.add_hline(
+                y=selected['historical_delay_probability'].iloc[0] * 100,
+                line_dash="dash",
+                line_color="#ea8600",
+                line_width=2,
+                annotation_text="Historical",
+                annotation_position="right",
+                annotation_font_size=13,
+                annotation_font_color="#1f1f1f"
+            )
+        fig_capacity.update_layout(
+            xaxis_title='Flights per month',
+            yaxis_title='Probability (%)',
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            font=dict(family='Manrope', size=14, color='#1f1f1f'),
+            height=400,
+            margin=dict(l=60, r=40, t=30, b=40),
+            xaxis=dict(type='log', showgrid=False, showline=True, linewidth=1, linecolor='#dadce0',
+                       tickfont=dict(size=13, color='#1f1f1f')),
+            yaxis=dict(showgrid=True, gridwidth=1, gridcolor='#e8eaed', showline=True, linewidth=1,
+                       linecolor='#dadce0', tickfont=dict(size=13, color='#1f1f1f'),
+                       title_font=dict(size=14, color='#1f1f1f'))
+        )
+        st.plotly_chart(fig_capacity, use_container_width=True)
+
     with tab2:
         st.markdown("#### Performance Benchmarking")
         st.markdown(
@@ -1269,9 +802,7 @@ if predict_btn and airport:
 
         with comp_col1:
             st.markdown(f"**Airline Performance at {airport}**")
-            airport_carriers = get_airport_carriers(ui_lookup, airport)
-            carrier_perf = [predictor.predict(c, airport, month, 100) for c in airport_carriers]
-            df_carriers = pd.DataFrame(carrier_perf).sort_values('delay_probability')
+            df_carriers = get_carrier_comparison(airport, month, predictor.version).sort_values('delay_probability')
             df_carriers['Delay_Rate'] = df_carriers['delay_probability'] * 100
 
             fig_carriers = go.Figure()
@@ -1307,9 +838,7 @@ if predict_btn and airport:
 
         with comp_col2:
             st.markdown(f"**Destination Performance for {carrier}**")
-            carrier_airports_comp = get_carrier_airports(ui_lookup, carrier)
-            airport_perf = [predictor.predict(carrier, a, month, 100) for a in carrier_airports_comp]
-            df_airports = pd.DataFrame(airport_perf).sort_values('delay_probability')
+            df_airports = get_airport_comparison(carrier, month, predictor.version).sort_values('delay_probability')
             df_airports['display_name'] = df_airports['airport'].apply(
                 lambda x: f"{x} - {predictor.airport_names.get(x, '')[:20]}")
             df_airports['Delay_Rate'] = df_airports['delay_probability'] * 100
@@ -1354,20 +883,8 @@ if predict_btn and airport:
         # Airline Performance Leaderboard
         st.markdown("**Airline Reliability Rankings**")
 
-        # Calculate airline-level statistics
-        carrier_stats = []
-        for c in predictor.stats['carriers']:
-            carrier_data = ui_lookup[ui_lookup['carrier'] == c]
-            if not carrier_data.empty:
-                carrier_stats.append({
-                    'carrier': c,
-                    'carrier_name': predictor.carrier_names.get(c, c),
-                    'avg_delay_prob': carrier_data['delay_probability'].mean(),
-                    'avg_delay_mins': carrier_data['avg_delay_minutes'].mean(),
-                    'routes_count': len(carrier_data)
-                })
-
-        df_carrier_stats = pd.DataFrame(carrier_stats).sort_values('avg_delay_prob')
+        # Airline and airport leaderboards are aggregated once per artifact set
+        df_carrier_stats, df_airport_stats = load_leaderboards(predictor.version)
         df_carrier_stats['Delay_Rate_Pct'] = df_carrier_stats['avg_delay_prob'] * 100
         df_carrier_stats['Risk_Level'] = df_carrier_stats['avg_delay_prob'].apply(
             lambda p: get_risk_profile(p)['level']
@@ -1453,19 +970,6 @@ if predict_btn and airport:
         # Airport Performance Analysis
         st.markdown("**Airport Reliability Analysis**")
 
-        airport_stats = []
-        for a in ui_lookup['airport'].unique():
-            airport_data = ui_lookup[ui_lookup['airport'] == a]
-            if not airport_data.empty:
-                airport_stats.append({
-                    'airport': a,
-                    'airport_name': predictor.airport_names.get(a, a),
-                    'avg_delay_prob': airport_data['delay_probability'].mean(),
-                    'avg_delay_mins': airport_data['avg_delay_minutes'].mean(),
-                    'carriers_count': len(airport_data['carrier'].unique())
-                })
-
-        df_airport_stats = pd.DataFrame(airport_stats).sort_values('avg_delay_prob')
         df_airport_stats['Delay_Rate_Pct'] = df_airport_stats['avg_delay_prob'] * 100
 
         airport_col1, airport_col2 = st.columns(2)
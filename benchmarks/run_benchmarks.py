@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from main import split_data
+from src.data_preprocessing import load_and_clean_data
+from src.feature_engineering import engineer_features
+from src.model_evaluation import evaluate_models
+from src.model_training import train_models
+from src.prediction_pipeline import FlightDelayPredictor
+from src.profiling import StageProfiler
+from src.run_context import RunContext
+from src.utils import save_artifacts
+
+from .synthetic_data import SCALES, write_bts_csv
+
+# Stage timings below this many seconds are too noisy to flag as regressions
+MIN_STAGE_SECONDS = 0.05
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_per_call(func, calls):
+    timings = []
+    for args in calls:
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def benchmark_predictor(n_queries, batch_size, seed):
+    predictor = FlightDelayPredictor()
+    rng = np.random.default_rng(seed)
+    routes = predictor.lookup.to_frame()[['carrier', 'airport', 'month']].to_numpy()
+    hits = [(c, a, int(m), 100) for c, a, m in routes[rng.choice(len(routes), n_queries)]]
+    misses = [(c, 'ZZZ', int(m), int(f)) for (c, _, m, _), f in zip(hits, rng.integers(10, 2000, n_queries))]
+
+    batch = routes[rng.choice(len(routes), batch_size)]
+    batch_months = batch[:, 2].astype(int)
+    # Half of the batch points at unknown airports so both paths are exercised
+    batch_airports = np.where(np.arange(batch_size) % 2 == 0, batch[:, 1], 'ZZZ')
+
+    start = time.perf_counter()
+    predictor.predict_batch(batch[:, 0], batch_airports, batch_months, 100)
+    batch_seconds = time.perf_counter() - start
+
+    return {'predict_hit': time_per_call(predictor.predict, hits),
+            'predict_miss': time_per_call(predictor.predict, misses),
+            'predict_batch_per_row': batch_seconds / batch_size}
+
+
+def run(scale, n_queries=200, batch_size=2000, seed=42):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='flight-bench-') as workdir:
+        # save_artifacts and the predictor use models/ relative to the working directory,
+        # so run inside a scratch directory instead of overwriting the real artifacts
+        os.chdir(workdir)
+        try:
+            csv_path = os.path.join(workdir, 'Airline_Delay_Cause.csv')
+            raw_rows = write_bts_csv(csv_path, scale, seed=seed)
+            profiler = StageProfiler({'scale': scale, 'raw_rows': raw_rows})
+            context = RunContext()
+
+            with profiler.stage('load') as stage:
+                df = load_and_clean_data(csv_path)
+                stage['rows'] = len(df)
+            with profiler.stage('engineer_features', rows=len(df)):
+                df = engineer_features(df)
+            df, train, val, test = split_data(df)
+
+            models, predictions, feature_cols, encoders, scaler, features_to_scale = train_models(
+                train, val, context=context, profiler=profiler)
+            with profiler.stage('evaluate_models', rows=len(test)):
+                best_model, best_name, results = evaluate_models(models, predictions, train, val, test, feature_cols,
+                                                                 context=context)
+            with profiler.stage('save_artifacts', rows=len(train)):
+                save_artifacts(best_model, scaler, encoders, feature_cols, features_to_scale, train, results)
+
+            predict = benchmark_predictor(n_queries, batch_size, seed)
+        finally:
+            os.chdir(cwd)
+
+    return {'commit': git_commit(), 'scale': scale, 'rows': len(df), 'best_model': best_name,
+            'test_mae': results['test_mae'], 'python': sys.version.split()[0],
+            'stages': {record['stage']: record['wall_seconds'] for record in profiler.stages},
+            'predict': predict}
+
+
+def compare(current, baseline, threshold):
+    """Return (metric, baseline, current, ratio) for every metric slower than baseline by more than threshold"""
+    regressions = []
+    for section in ('stages', 'predict'):
+        for metric, before in baseline.get(section, {}).items():
+            after = current[section].get(metric)
+            if after is None or before <= 0:
+                continue
+            if section == 'stages' and max(before, after) < MIN_STAGE_SECONDS:
+                continue
+            if after > before * (1 + threshold):
+                regressions.append((metric, before, after, after / before))
+    return regressions
+
+
+def print_results(result):
+    print(f"\nScale: {result['scale']} ({result['rows']:,} rows), commit {result['commit']}, "
+          f"best model {result['best_model']} (test MAE {result['test_mae']:.6f})")
+    for metric, seconds in result['stages'].items():
+        print(f'  {metric:<32}{seconds:>10.3f} s')
+    for metric, seconds in result['predict'].items():
+        print(f'  {metric:<32}{seconds * 1e6:>10.1f} us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark training and inference hot paths on synthetic data')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--queries', type=int, default=200, help='single predict calls timed per mode')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown relative to the baseline before failing (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    result = run(args.scale, args.queries, args.batch_size)
+    print_results(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'\nSaved to: {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != result['scale']:
+            sys.exit(f"Baseline was run at scale {baseline.get('scale')}, not {result['scale']}")
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions against {baseline.get('commit')} (threshold {args.threshold:.0%}):")
+            for metric, before, after, ratio in regressions:
+                print(f'  {metric}: {before:.6f}s -> {after:.6f}s ({ratio:.2f}x)')
+            sys.exit(1)
+        print(f"\nNo regressions against {baseline.get('commit')} (threshold {args.threshold:.0%})")
+
+
+if __name__ == '__main__':
+    main()
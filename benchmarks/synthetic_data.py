@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Rough shape of the BTS "Airline Delay Cause" extract at each scale
+SCALES = {
+    'tiny': {'n_carriers': 4, 'n_airports': 20, 'routes_per_carrier': 10},
+    'small': {'n_carriers': 10, 'n_airports': 80, 'routes_per_carrier': 40},
+    'medium': {'n_carriers': 16, 'n_airports': 200, 'routes_per_carrier': 100},
+    'large': {'n_carriers': 20, 'n_airports': 370, 'routes_per_carrier': 180},
+}
+
+DELAY_CAUSES = ['carrier', 'weather', 'nas', 'security', 'late_aircraft']
+CAUSE_SHARES = [0.37, 0.06, 0.19, 0.01, 0.37]
+
+
+def make_bts_data(n_carriers, n_airports, routes_per_carrier, years=range(2013, 2024), seed=42):
+    """Synthetic monthly carrier x airport rows with the columns load_and_clean_data expects"""
+    # COVID years, missing targets and missing arr_flights exercise the cleaning branches as on the real file
+    rng = np.random.default_rng(seed)
+    carriers = np.array([f'C{i}' for i in range(n_carriers)])
+    airports = np.array([f'A{i:03d}' for i in range(n_airports)])
+
+    route_carrier = np.repeat(np.arange(n_carriers), routes_per_carrier)
+    route_airport = np.concatenate([rng.choice(n_airports, routes_per_carrier, replace=False)
+                                    for _ in range(n_carriers)])
+    route_size = rng.lognormal(mean=4.5, sigma=1.2, size=len(route_carrier))
+    route_rate = np.clip(rng.normal(0.19, 0.05, len(route_carrier)), 0.02, 0.6)
+
+    periods = np.array([(year, month) for year in years for month in range(1, 13)])
+    n_routes, n_periods = len(route_carrier), len(periods)
+    route = np.tile(np.arange(n_routes), n_periods)
+    period = np.repeat(np.arange(n_periods), n_routes)
+    year, month = periods[period, 0], periods[period, 1]
+    n = len(route)
+
+    seasonal = 1 + 0.15 * np.isin(month, [6, 7, 12]) - 0.1 * np.isin(month, [9, 10, 11])
+    arr_flights = np.maximum(1, np.round(route_size[route] * rng.uniform(0.8, 1.2, n)))
+    rate = np.clip(route_rate[route] * seasonal + rng.normal(0, 0.03, n), 0, 1)
+    arr_del15 = rng.binomial(arr_flights.astype(int), rate).astype(float)
+    minutes_per_delay = rng.gamma(shape=4, scale=16, size=n)
+
+    df = pd.DataFrame({'year': year, 'month': month, 'carrier': carriers[route_carrier[route]],
+                       'carrier_name': np.char.add(carriers[route_carrier[route]], ' Airlines'),
+                       'airport': airports[route_airport[route]],
+                       'airport_name': np.char.add(airports[route_airport[route]], ' Regional'),
+                       'arr_flights': arr_flights, 'arr_del15': arr_del15})
+
+    shares = rng.dirichlet(np.array(CAUSE_SHARES) * 20, size=n)
+    arr_delay = np.round(arr_del15 * minutes_per_delay)
+    for i, cause in enumerate(DELAY_CAUSES):
+        df[f'{cause}_ct'] = np.round(arr_del15 * shares[:, i], 2)
+    df['arr_cancelled'] = rng.binomial(arr_flights.astype(int), 0.015).astype(float)
+    df['arr_diverted'] = rng.binomial(arr_flights.astype(int), 0.002).astype(float)
+    df['arr_delay'] = arr_delay
+    for i, cause in enumerate(DELAY_CAUSES):
+        df[f'{cause}_delay'] = np.round(arr_delay * shares[:, i])
+
+    missing = rng.random(n)
+    df.loc[missing < 0.002, 'arr_del15'] = np.nan
+    df.loc[(missing >= 0.002) & (missing < 0.004), 'arr_flights'] = np.nan
+    return df
+
+
+def write_bts_csv(path, scale='small', seed=42):
+    df = make_bts_data(**SCALES[scale], seed=seed)
+    df.to_csv(path, index=False)
+    return len(df)
@@ -1,16 +1,40 @@
+import argparse
+import os
+
+import joblib
 import pandas as pd
 import numpy as np
 from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error
 from src.data_preprocessing import load_and_clean_data
-from src.feature_engineering import engineer_features
-from src.model_training import train_models
+from src.feature_engineering import engineer_features, feature_statistics
+from src import (cross_validation, data_preprocessing, distillation, feature_attribution, feature_engineering,
+                 incremental, model_compression, model_evaluation, model_registry, model_training, prediction_pipeline,
+                 report_aggregation, report_tables, run_context, segment_errors, shadow_scoring, utils)
+from src.model_training import candidate_models, prepare_training_data, fit_model, delay_rate, encode_features
 from src.model_evaluation import evaluate_models
 from src.utils import save_artifacts
+from src.report_aggregation import GroupingSetsAggregator
+from src.report_tables import write_report_table
+from src.run_context import RunContext
+from src.profiling import StageProfiler
+from src.pipeline import Pipeline, Stage
+from src.model_compression import compress_model, print_compression_report, save_compact_model
+from src.distillation import SURROGATE_PATH, distill, miss_latency, print_distillation_report
+from src.cross_validation import cross_validate, cv_summary, print_cv_report
+from src.feature_attribution import attribute_features
+from src.segment_errors import segment_error_stats
+from src.model_registry import pointer_path, publish
+from src.shadow_scoring import SHADOW_INDEX_PATH, save_shadow_models
+from src.prediction_pipeline import FlightDelayPredictor
+from src.incremental import (incremental_update, load_feature_statistics, load_training_state, new_rows, print_report,
+                             save_feature_statistics, save_training_state, training_state)
 
 
 def generate_research_report_data(train, val, test, best_model, feature_cols, results, encoders, scaler,
-                                  features_to_scale):
+                                  features_to_scale, context=None, table_format='csv'):
     """Generate comprehensive statistics for research report"""
+    context = context if context is not None else RunContext()
+
     print("\n" + "=" * 80)
     print("RESEARCH REPORT DATA GENERATION")
     print("=" * 80)
@@ -21,18 +45,17 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\n1. FEATURE IMPORTANCE ANALYSIS")
     print("-" * 80)
 
-    if hasattr(best_model, 'feature_importances_'):
-        importance_df = pd.DataFrame({
-            'feature': feature_cols,
-            'importance': best_model.feature_importances_
-        }).sort_values('importance', ascending=False)
+    # Permutation importance works for every model in the zoo; tree models also get exact
+    # path-based attributions (and their impurity importances alongside)
+    X_test = context.get('X_test', lambda: encode_features(test, encoders, scaler, feature_cols, features_to_scale))
+    y_test = context.get('y_test', lambda: delay_rate(test))
+    importance_df = attribute_features(best_model, X_test, y_test, feature_cols)
 
-        print("\nTop 20 Most Important Features:")
-        print(importance_df.head(20).to_string(index=False))
+    print(f"\nTop 20 Most Important Features ({importance_df['method'].iloc[0]}-based):")
+    print(importance_df.head(20).to_string(index=False))
 
-        # Save to CSV
-        importance_df.to_csv('models/feature_importance.csv', index=False)
-        print("\n✓ Saved to: models/feature_importance.csv")
+    # Save to CSV
+    print(f"\n✓ Saved to: {write_report_table(importance_df, 'feature_importance', table_format=table_format)}")
 
     # =========================================================================
     # 2. SEASONAL PATTERNS
@@ -40,25 +63,34 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\n2. SEASONAL DELAY PATTERNS")
     print("-" * 80)
 
-    # Calculate delay rate for each month
-    full_data = pd.concat([train, val, test])
-    full_data['delay_rate'] = np.where(
-        full_data['arr_flights'] > 0,
-        full_data['arr_del15'] / full_data['arr_flights'],
-        0
+    # All rollups below come from one pass over train, val and test, without concatenating them
+    delay_causes = ['avg_carrier_pct', 'avg_weather_pct', 'avg_nas_pct',
+                    'avg_security_pct', 'avg_late_aircraft_pct']
+    has_causes = all(col in split.columns for split in (train, val, test) for col in delay_causes)
+    has_stress = all('operational_stress_level' in split.columns for split in (train, val, test))
+
+    report_agg = GroupingSetsAggregator(
+        keys=['month', 'carrier', 'airport', 'year'] + (['operational_stress_level'] if has_stress else []) + [None],
+        measures={'delay_rate': ['mean', 'std', 'count'], 'arr_del15': 'sum', 'arr_flights': 'sum',
+                  'avg_delay_minutes': 'mean', **{cause: 'mean' for cause in (delay_causes if has_causes else [])}}
     )
+    for split in (train, val, test):
+        split_delay_rate = np.where(split['arr_flights'] > 0, split['arr_del15'] / split['arr_flights'], 0)
+        report_agg.update(split, extra={'delay_rate': split_delay_rate})
 
-    monthly_stats = full_data.groupby('month').agg({
+    # Calculate delay rate for each month
+    rollup_spec = {
         'delay_rate': ['mean', 'std', 'count'],
         'arr_del15': 'sum',
         'arr_flights': 'sum',
         'avg_delay_minutes': 'mean'
-    }).round(4)
+    }
+
+    monthly_stats = report_agg.result('month', rollup_spec).round(4)
 
     print("\nMonthly Delay Statistics:")
     print(monthly_stats)
-    monthly_stats.to_csv('models/monthly_patterns.csv')
-    print("\n✓ Saved to: models/monthly_patterns.csv")
+    print(f"\n✓ Saved to: {write_report_table(monthly_stats, 'monthly_patterns', table_format=table_format)}")
 
     # =========================================================================
     # 3. CARRIER PERFORMANCE ANALYSIS
@@ -66,12 +98,7 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\n3. CARRIER PERFORMANCE ANALYSIS")
     print("-" * 80)
 
-    carrier_stats = full_data.groupby('carrier').agg({
-        'delay_rate': ['mean', 'std', 'count'],
-        'arr_del15': 'sum',
-        'arr_flights': 'sum',
-        'avg_delay_minutes': 'mean'
-    }).round(4)
+    carrier_stats = report_agg.result('carrier', rollup_spec).round(4)
 
     carrier_stats = carrier_stats.sort_values(('delay_rate', 'mean'))
 
@@ -81,8 +108,7 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\nTop 10 Worst Performing Carriers:")
     print(carrier_stats.tail(10))
 
-    carrier_stats.to_csv('models/carrier_performance.csv')
-    print("\n✓ Saved to: models/carrier_performance.csv")
+    print(f"\n✓ Saved to: {write_report_table(carrier_stats, 'carrier_performance', table_format=table_format)}")
 
     # =========================================================================
     # 4. AIRPORT PERFORMANCE ANALYSIS
@@ -90,12 +116,7 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\n4. AIRPORT PERFORMANCE ANALYSIS")
     print("-" * 80)
 
-    airport_stats = full_data.groupby('airport').agg({
-        'delay_rate': ['mean', 'std', 'count'],
-        'arr_del15': 'sum',
-        'arr_flights': 'sum',
-        'avg_delay_minutes': 'mean'
-    }).round(4)
+    airport_stats = report_agg.result('airport', rollup_spec).round(4)
 
     airport_stats = airport_stats.sort_values(('delay_rate', 'mean'))
 
@@ -105,8 +126,7 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\nTop 10 Worst Performing Airports:")
     print(airport_stats.tail(10))
 
-    airport_stats.to_csv('models/airport_performance.csv')
-    print("\n✓ Saved to: models/airport_performance.csv")
+    print(f"\n✓ Saved to: {write_report_table(airport_stats, 'airport_performance', table_format=table_format)}")
 
     # =========================================================================
     # 5. YEARLY TRENDS
@@ -114,17 +134,11 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\n5. YEARLY TREND ANALYSIS")
     print("-" * 80)
 
-    yearly_stats = full_data.groupby('year').agg({
-        'delay_rate': ['mean', 'std', 'count'],
-        'arr_del15': 'sum',
-        'arr_flights': 'sum',
-        'avg_delay_minutes': 'mean'
-    }).round(4)
+    yearly_stats = report_agg.result('year', rollup_spec).round(4)
 
     print("\nYear-over-Year Delay Rates:")
     print(yearly_stats)
-    yearly_stats.to_csv('models/yearly_trends.csv')
-    print("\n✓ Saved to: models/yearly_trends.csv")
+    print(f"\n✓ Saved to: {write_report_table(yearly_stats, 'yearly_trends', table_format=table_format)}")
 
     # =========================================================================
     # 6. DELAY CAUSE ATTRIBUTION
@@ -133,11 +147,9 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("-" * 80)
 
     # Calculate average percentages for each delay cause
-    delay_causes = ['avg_carrier_pct', 'avg_weather_pct', 'avg_nas_pct',
-                    'avg_security_pct', 'avg_late_aircraft_pct']
-
-    if all(col in full_data.columns for col in delay_causes):
-        cause_stats = full_data[delay_causes].mean().sort_values(ascending=False)
+    if has_causes:
+        cause_stats = pd.Series({cause: report_agg.total(cause, 'mean')
+                                 for cause in delay_causes}).sort_values(ascending=False)
         print("\nAverage Delay Attribution (% of total delay minutes):")
         for cause, pct in cause_stats.items():
             print(f"  {cause.replace('avg_', '').replace('_pct', '').title()}: {pct:.2f}%")
@@ -148,8 +160,8 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\n7. OPERATIONAL STRESS LEVEL ANALYSIS")
     print("-" * 80)
 
-    if 'operational_stress_level' in full_data.columns:
-        stress_stats = full_data.groupby('operational_stress_level').agg({
+    if has_stress:
+        stress_stats = report_agg.result('operational_stress_level', {
             'delay_rate': 'mean',
             'arr_del15': 'sum',
             'arr_flights': 'sum'
@@ -157,8 +169,7 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
 
         print("\nDelay Rate by Operational Stress Level:")
         print(stress_stats)
-        stress_stats.to_csv('models/stress_level_analysis.csv')
-        print("\n✓ Saved to: models/stress_level_analysis.csv")
+        print(f"\n✓ Saved to: {write_report_table(stress_stats, 'stress_level_analysis', table_format=table_format)}")
 
     # =========================================================================
     # 8. ERROR ANALYSIS BY SEGMENTS
@@ -166,61 +177,43 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\n8. ERROR ANALYSIS BY SEGMENTS")
     print("-" * 80)
 
-    # Encode and scale test data (same as in model_evaluation.py)
-    categorical = ['carrier', 'airport', 'flight_volume_category', 'operational_stress_level']
-    test_enc = test.copy()
+    def encode_test():
+        # Encode and scale test data (same as in model_evaluation.py)
+        categorical = ['carrier', 'airport', 'flight_volume_category', 'operational_stress_level']
+        test_enc = test.copy()
 
-    for col in categorical:
-        if col in encoders:
-            test_enc[col] = pd.Series(-1, index=test.index)
-            mask = test[col].astype(str).isin(encoders[col].classes_)
-            test_enc.loc[mask, col] = encoders[col].transform(test[col].astype(str)[mask])
+        for col in categorical:
+            if col in encoders:
+                test_enc[col] = pd.Series(-1, index=test.index)
+                mask = test[col].astype(str).isin(encoders[col].classes_)
+                test_enc.loc[mask, col] = encoders[col].transform(test[col].astype(str)[mask])
 
-    # Scale features
-    test_enc[features_to_scale] = scaler.transform(test_enc[features_to_scale])
+        # Scale features
+        test_enc[features_to_scale] = scaler.transform(test_enc[features_to_scale])
+        return test_enc[feature_cols]
 
-    # Get predictions on properly encoded test set
-    X_test = test_enc[feature_cols]
-    y_test = np.where(test['arr_flights'] > 0,
-                      test['arr_del15'] / test['arr_flights'], 0)
-    y_pred = np.clip(best_model.predict(X_test), 0, 1)
+    # Predictions on the encoded test set are reused from evaluate_models when available
+    y_test = context.get('y_test', lambda: np.where(test['arr_flights'] > 0,
+                                                    test['arr_del15'] / test['arr_flights'], 0))
+    y_pred = context.get('y_test_pred', lambda: np.clip(best_model.predict(context.get('X_test', encode_test)), 0, 1))
 
-    # Create error analysis DataFrame
-    test_analysis = test.copy()
-    test_analysis['y_true'] = y_test
-    test_analysis['y_pred'] = y_pred
-    test_analysis['abs_error'] = np.abs(y_test - y_pred)
+    # Only the columns the tables need; segment statistics are accumulated batch by batch
+    test_predictions = pd.DataFrame({'carrier': test['carrier'].to_numpy(), 'airport': test['airport'].to_numpy(),
+                                     'month': test['month'].to_numpy(), 'y_true': y_test, 'y_pred': y_pred,
+                                     'abs_error': np.abs(y_test - y_pred)})
+    volume_stats, delay_stats = segment_error_stats(test['arr_flights'].to_numpy(), y_test, y_pred)
 
     # By flight volume
     print("\nError Analysis by Flight Volume:")
-    volume_bins = [0, 50, 200, 500, float('inf')]
-    volume_labels = ['Low (<50)', 'Medium (50-200)', 'High (200-500)', 'Major (>500)']
-    test_analysis['volume_category'] = pd.cut(test_analysis['arr_flights'],
-                                              bins=volume_bins, labels=volume_labels)
-
-    volume_errors = test_analysis.groupby('volume_category').agg({
-        'abs_error': ['mean', 'median', 'std', 'count']
-    }).round(4)
+    volume_errors = volume_stats.to_frame('volume_category').round(4)
     print(volume_errors)
 
     # By delay rate ranges
     print("\nError Analysis by Delay Rate Range:")
-    delay_bins = [0, 0.15, 0.25, 0.35, 1.0]
-    delay_labels = ['Very Low (<15%)', 'Moderate (15-25%)',
-                    'High (25-35%)', 'Very High (>35%)']
-    test_analysis['delay_category'] = pd.cut(test_analysis['y_true'],
-                                             bins=delay_bins, labels=delay_labels)
-
-    delay_errors = test_analysis.groupby('delay_category').agg({
-        'abs_error': ['mean', 'median', 'std', 'count'],
-        'y_true': 'mean',
-        'y_pred': 'mean'
-    }).round(4)
+    delay_errors = delay_stats.to_frame('delay_category', include_means=True).round(4)
     print(delay_errors)
 
-    test_analysis[['carrier', 'airport', 'month', 'y_true', 'y_pred',
-                   'abs_error']].to_csv('models/test_predictions.csv', index=False)
-    print("\n✓ Saved to: models/test_predictions.csv")
+    print(f"\n✓ Saved to: {write_report_table(test_predictions, 'test_predictions', table_format=table_format)}")
 
     # =========================================================================
     # 9. DATASET STATISTICS
@@ -228,16 +221,17 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("\n9. OVERALL DATASET STATISTICS")
     print("-" * 80)
 
+    years = report_agg.groups('year')
     overall_stats = {
-        'Total Records': len(full_data),
-        'Unique Carriers': full_data['carrier'].nunique(),
-        'Unique Airports': full_data['airport'].nunique(),
-        'Date Range': f"{full_data['year'].min()}-{full_data['year'].max()}",
-        'Total Flights': full_data['arr_flights'].sum(),
-        'Total Delays (15+ min)': full_data['arr_del15'].sum(),
-        'Overall Delay Rate': (full_data['arr_del15'].sum() /
-                               full_data['arr_flights'].sum()),
-        'Avg Delay Duration (min)': full_data['avg_delay_minutes'].mean(),
+        'Total Records': report_agg.n_rows,
+        'Unique Carriers': len(report_agg.groups('carrier')),
+        'Unique Airports': len(report_agg.groups('airport')),
+        'Date Range': f"{years.min()}-{years.max()}",
+        'Total Flights': report_agg.total('arr_flights', 'sum'),
+        'Total Delays (15+ min)': report_agg.total('arr_del15', 'sum'),
+        'Overall Delay Rate': (report_agg.total('arr_del15', 'sum') /
+                               report_agg.total('arr_flights', 'sum')),
+        'Avg Delay Duration (min)': report_agg.total('avg_delay_minutes', 'mean'),
         'Training Set Size': len(train),
         'Validation Set Size': len(val),
         'Test Set Size': len(test)
@@ -257,14 +251,14 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     print("-" * 80)
 
     # Find interesting examples
-    test_analysis_sorted = test_analysis.sort_values('y_true', ascending=False)
+    test_analysis_sorted = test_predictions.sort_values('y_true', ascending=False)
 
     print("\nHigh Risk Routes (Top 5):")
     high_risk = test_analysis_sorted.head(5)[['carrier', 'airport', 'month',
                                               'y_true', 'y_pred', 'abs_error']]
     print(high_risk.to_string(index=False))
 
-    test_analysis_sorted = test_analysis.sort_values('y_true', ascending=True)
+    test_analysis_sorted = test_predictions.sort_values('y_true', ascending=True)
     print("\nLow Risk Routes (Top 5):")
     low_risk = test_analysis_sorted.head(5)[['carrier', 'airport', 'month',
                                              'y_true', 'y_pred', 'abs_error']]
@@ -285,38 +279,307 @@ def generate_research_report_data(train, val, test, best_model, feature_cols, re
     }
 
 
-def main():
-    print('Loading data...')
-    df = load_and_clean_data('data/Airline_Delay_Cause.csv')
+TRAIN_YEARS = [2013, 2014, 2015, 2016, 2017, 2018]
+VAL_YEARS = [2019]
+TEST_YEARS = [2022, 2023]
 
-    print('Engineering features...')
-    df = engineer_features(df)
 
-    print('Splitting data...')
+def split_data(df, extend_train=False):
+    # With extend_train (--incremental), months added after the test period also train the model
     df = df.sort_values(['year', 'month'])
-    train = df[df['year'].isin([2013, 2014, 2015, 2016, 2017, 2018])]
-    val = df[df['year'].isin([2019])]
-    test = df[df['year'].isin([2022, 2023])]
+    train = df[df['year'].isin(TRAIN_YEARS) | (extend_train & (df['year'] > max(TEST_YEARS)))]
+    val = df[df['year'].isin(VAL_YEARS)]
+    test = df[df['year'].isin(TEST_YEARS)]
+    return df, train, val, test
+
 
-    print('Training models...')
-    models, predictions, feature_cols, encoders, scaler, features_to_scale = train_models(train, val)
+ARTIFACT_FILES = ['models/best_model.pkl', 'models/robust_scaler.pkl', 'models/label_encoders.pkl',
+                  'models/feature_columns.pkl', 'models/features_to_scale.pkl', 'models/ui_lookup_table.pkl',
+                  'models/carrier_names.pkl', 'models/airport_names.pkl', 'models/dataset_stats.pkl',
+                  'models/training_state.pkl', 'models/drift_reference.pkl', 'models/feature_statistics.pkl']
+# RunContext hits and misses of the stages run in this process, written to the run record
+CONTEXT_EVENTS = []
+REPORT_TABLES = ['monthly_patterns', 'carrier_performance', 'airport_performance', 'yearly_trends', 'test_predictions']
+VISUALIZATION_FILES = ['visualizations/01_seasonal_patterns.png', 'visualizations/02_carrier_performance.png',
+                       'visualizations/03_carrier_top_bottom.png', 'visualizations/04_feature_importance.png',
+                       'visualizations/05_feature_importance_pie.png', 'visualizations/06_delay_causes.png',
+                       'visualizations/07_yearly_trends.png', 'visualizations/08_model_comparison.png',
+                       'visualizations/09_predicted_vs_actual.png', 'visualizations/10_airport_performance.png']
 
-    print('Evaluating models...')
-    best_model, best_name, results = evaluate_models(models, predictions, train, val, test, feature_cols)
 
-    print('Saving artifacts...')
-    save_artifacts(best_model, scaler, encoders, feature_cols, features_to_scale, train, results)
+def features_stage(df, statistics, frozen=False):
+    # frozen (--incremental) engineers the features with the statistics of the last full fit
+    if frozen:
+        saved = load_feature_statistics()
+        if saved is not None:
+            statistics = saved
+    return engineer_features(df, statistics)
 
-    print(f'\nBest Model: {best_name}')
+
+def split_stage(df, extend_train=False):
+    df, train, val, test = split_data(df, extend_train)
+    return {'train': train, 'val': val, 'test': test}
+
+
+def prepare_stage(split):
+    X_train, y_train, X_val, y_val, feature_cols, encoders, scaler, features_to_scale = prepare_training_data(
+        split['train'], split['val'])
+    return {'X_train': X_train, 'y_train': y_train, 'X_val': X_val, 'y_val': y_val, 'feature_cols': feature_cols,
+            'encoders': encoders, 'scaler': scaler, 'features_to_scale': features_to_scale}
+
+
+def train_stage(prepared, name):
+    print(f'Training {name}...')
+    return fit_model(name, prepared['X_train'], prepared['y_train'], prepared['X_val'])
+
+
+def evaluate_stage(split, prepared, *trained):
+    models = {name: model for name, (model, _, _) in zip(candidate_models(), trained)}
+    predictions = {key: value for _, model_predictions, _ in trained for key, value in model_predictions.items()}
+    fit_seconds = {name: seconds for name, (_, _, seconds) in zip(candidate_models(), trained)}
+    context = RunContext(events=CONTEXT_EVENTS, stage='evaluate')
+    best_model, best_name, results = evaluate_models(models, predictions, split['train'], split['val'], split['test'],
+                                                     prepared['feature_cols'], context=context)
+    best_key = candidate_models()[best_name][0]
+    return {'best_model': best_model, 'best_name': best_name, 'results': results,
+            'best_val_mae': mean_absolute_error(prepared['y_val'], predictions[f'{best_key}_val']),
+            'best_fit_seconds': fit_seconds[best_name],
+            **{name: context.get(name) for name in ('X_test', 'y_test', 'y_test_pred')}}
+
+
+def artifacts_stage(split, prepared, evaluated, statistics):
+    save_artifacts(evaluated['best_model'], prepared['scaler'], prepared['encoders'], prepared['feature_cols'],
+                   prepared['features_to_scale'], split['train'], evaluated['results'])
+    save_feature_statistics(statistics)
+    save_training_state(training_state(evaluated['best_model'], evaluated['best_name'], split['train'],
+                                       prepared['feature_cols'], evaluated['best_val_mae'],
+                                       evaluated['best_fit_seconds']))
+
+
+def shadows_stage(evaluated, *trained):
+    # The models that lost to the best one, for FlightDelayPredictor(shadow_models=...)
+    candidates = candidate_models()
+    save_shadow_models({name: (candidates[name][0], model) for name, (model, _, _) in zip(candidates, trained)
+                        if name != evaluated['best_name']})
+
+
+def save_compressed_model(model, X_val, y_val, X_test, y_test, test_mae, table_format='csv'):
+    # Saves the smallest compressed form of the model that keeps its validation MAE, for serving
+    compact, report = compress_model(model, X_val, y_val, X_test, y_test, test_mae)
+    print_compression_report(report)
+    os.makedirs('models', exist_ok=True)
+    save_compact_model(compact)
+    write_report_table(report, 'compression_report', table_format=table_format)
+
+
+def compress_stage(prepared, evaluated, table_format='csv'):
+    save_compressed_model(evaluated['best_model'], prepared['X_val'], prepared['y_val'], evaluated['X_test'],
+                          evaluated['y_test'], evaluated['results']['test_mae'], table_format=table_format)
+
+
+def save_surrogate(table_format='csv'):
+    # Distils the model just saved to models/ (not the published one), so the artifacts must be saved first
+    predictor = FlightDelayPredictor(models_dir='models')
+    surrogate, report = distill(predictor)
+    print_distillation_report(report, miss_latency(predictor, surrogate))
+    joblib.dump(surrogate, SURROGATE_PATH)
+    write_report_table(report, 'surrogate_fidelity', table_format=table_format)
+
+
+def distill_stage(artifacts, compressed, table_format='csv'):
+    save_surrogate(table_format=table_format)
+
+
+def publish_models():
+    # Running predictors pick the new version up on their next registry check
+    version = publish()
+    print(f'Published model version {version}')
+    return version
+
+
+def publish_stage(artifacts, compressed, distilled, shadows):
+    return publish_models()
+
+
+def cross_validate_stage(split, table_format='csv', max_workers=None):
+    # Every year outside the test and COVID years, validated one year at a time
+    results = cross_validate(pd.concat([split['train'], split['val']]), max_workers=max_workers)
+    print_cv_report(results)
+    os.makedirs('models', exist_ok=True)
+    write_report_table(results, 'cv_results', table_format=table_format)
+    return results
+
+
+def incremental_retrain(split, table_format='csv'):
+    """Extend the saved model with unseen training months; None if the refit policy requires a full refit"""
+    state = load_training_state()
+    if state is None or not os.path.exists('models/best_model.pkl'):
+        print('No training state from a previous full fit')
+        return None
+    if load_feature_statistics() is None:
+        print('No feature statistics from a previous full fit')
+        return None
+    new = new_rows(split['train'], state)
+    if not len(new):
+        print('No training rows newer than the saved model, nothing to update')
+        return {'best_model': state['model'], 'new_rows': 0}
+
+    model = joblib.load('models/best_model.pkl')
+    encoders = joblib.load('models/label_encoders.pkl')
+    scaler = joblib.load('models/robust_scaler.pkl')
+    feature_cols = joblib.load('models/feature_columns.pkl')
+    features_to_scale = joblib.load('models/features_to_scale.pkl')
+
+    model, state, report = incremental_update(model, state, split['train'], split['val'], encoders, scaler,
+                                              feature_cols, features_to_scale)
+    print_report(report)
+    if model is None:
+        return None
+
+    X_test = encode_features(split['test'], encoders, scaler, feature_cols, features_to_scale)
+    y_test = delay_rate(split['test'])
+    y_test_pred = np.clip(model.predict(X_test), 0, 1)
+    results = {'test_mae': mean_absolute_error(y_test, y_test_pred), 'test_r2': r2_score(y_test, y_test_pred),
+               'test_rmse': np.sqrt(mean_squared_error(y_test, y_test_pred))}
     print(f'Test MAE: {results["test_mae"]:.6f}')
     print(f'Test R2: {results["test_r2"]:.4f}')
 
-    # Generate comprehensive research report data
-    print('\n\nGenerating research report data...')
-    report_data = generate_research_report_data(
-        train, val, test, best_model, feature_cols, results, encoders, scaler, features_to_scale
-    )
+    save_artifacts(model, scaler, encoders, feature_cols, features_to_scale, split['train'], results)
+    save_training_state(state)
+    save_compressed_model(model, encode_features(split['val'], encoders, scaler, feature_cols, features_to_scale),
+                          delay_rate(split['val']), X_test, y_test, results['test_mae'], table_format=table_format)
+    save_surrogate(table_format=table_format)
+    publish_models()
+    return {'best_model': state['model'], 'new_rows': report['new_rows'], **results}
+
+
+def report_stage(split, prepared, evaluated, table_format='csv'):
+    os.makedirs('models', exist_ok=True)
+    context = RunContext(events=CONTEXT_EVENTS, stage='report')
+    for name in ('X_test', 'y_test', 'y_test_pred'):
+        context.put(name, evaluated[name])
+    return generate_research_report_data(split['train'], split['val'], split['test'], evaluated['best_model'],
+                                         prepared['feature_cols'], evaluated['results'], prepared['encoders'],
+                                         prepared['scaler'], prepared['features_to_scale'], context=context,
+                                         table_format=table_format)
+
+
+def visualizations_stage(report, artifacts):
+    from generate_visualizations import generate_visualizations
+    return generate_visualizations('models', 'visualizations')
+
+
+def build_pipeline(data_path, profiler=None, cache_dir='.pipeline_cache', max_workers=4, table_format='csv',
+                   cv_workers=None, extend_train=False, frozen_features=False):
+    if table_format == 'parquet' and not report_tables.parquet_available():
+        print('pyarrow is not installed, saving report tables as CSV')
+        table_format = 'csv'
+    train_names = [f'train:{name}' for name in candidate_models()]
+    stages = [
+        Stage('clean', load_and_clean_data, params={'filepath': data_path}, files=[data_path],
+              code=[data_preprocessing]),
+        Stage('feature_statistics', feature_statistics, deps=['clean'], code=[feature_engineering]),
+        # The frozen features read models/feature_statistics.pkl, so they are never cached
+        Stage('features', features_stage, deps=['clean', 'feature_statistics'], params={'frozen': frozen_features},
+              code=[feature_engineering, incremental], cache=not frozen_features),
+        Stage('split', split_stage, deps=['features'], params={'extend_train': extend_train}, code=[split_data],
+              cache=False),
+        Stage('prepare', prepare_stage, deps=['split'], code=[model_training]),
+        *[Stage(stage_name, train_stage, deps=['prepare'], params={'name': name}, code=[model_training])
+          for stage_name, name in zip(train_names, candidate_models())],
+        Stage('evaluate', evaluate_stage, deps=['split', 'prepare'] + train_names,
+              code=[model_evaluation, run_context]),
+        Stage('artifacts', artifacts_stage, deps=['split', 'prepare', 'evaluate', 'feature_statistics'],
+              code=[utils, incremental],
+              outputs=ARTIFACT_FILES),
+        Stage('compress', compress_stage, deps=['prepare', 'evaluate'], params={'table_format': table_format},
+              code=[model_compression, report_tables], outputs=[f'models/compression_report.{table_format}']),
+        Stage('distill', distill_stage, deps=['artifacts', 'compress'], params={'table_format': table_format},
+              code=[distillation, prediction_pipeline, report_tables],
+              outputs=[SURROGATE_PATH, f'models/surrogate_fidelity.{table_format}']),
+        Stage('shadows', shadows_stage, deps=['evaluate'] + train_names, code=[shadow_scoring],
+              outputs=[SHADOW_INDEX_PATH]),
+        Stage('publish', publish_stage, deps=['artifacts', 'compress', 'distill', 'shadows'], code=[model_registry],
+              outputs=[pointer_path()]),
+        Stage('cross_validate', cross_validate_stage, deps=['split'],
+              params={'table_format': table_format, 'max_workers': cv_workers},
+              code=[cross_validation, model_training, report_tables],
+              outputs=[f'models/cv_results.{table_format}']),
+        Stage('report', report_stage, deps=['split', 'prepare', 'evaluate'], params={'table_format': table_format},
+              code=[generate_research_report_data, feature_attribution, report_aggregation, report_tables,
+                    run_context, segment_errors],
+              outputs=[f'models/{name}.{table_format}' for name in REPORT_TABLES]),
+        Stage('visualizations', visualizations_stage, deps=['report', 'artifacts'],
+              files=[os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generate_visualizations.py')],
+              outputs=VISUALIZATION_FILES),
+    ]
+    return Pipeline(stages, cache_dir=cache_dir, max_workers=max_workers, profiler=profiler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train, evaluate and report on the flight delay models')
+    parser.add_argument('--data', default='data/Airline_Delay_Cause.csv')
+    parser.add_argument('--force', action='append', default=[], metavar='STAGE',
+                        help="rerun a stage even if its cached output is current ('all' reruns everything)")
+    parser.add_argument('--jobs', type=int, default=4, help='stages run concurrently')
+    parser.add_argument('--visualize', action='store_true', help='also render the figures in visualizations/')
+    parser.add_argument('--cache-dir', default='.pipeline_cache')
+    parser.add_argument('--report-format', choices=report_tables.TABLE_FORMATS, default='csv',
+                        help='file format of the report tables in models/ (parquet needs pyarrow)')
+    parser.add_argument('--cv', action='store_true',
+                        help='also cross-validate every model on expanding-window year folds')
+    parser.add_argument('--cv-jobs', type=int, default=None, help='processes for the cross-validation folds '
+                                                                   '(default: one per CPU)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='extend the saved model with new training months instead of refitting, '
+                             'falling back to a full run when the refit policy requires it')
+    args = parser.parse_args()
+
+    profiler = StageProfiler()
+    pipeline = build_pipeline(args.data, profiler=profiler, cache_dir=args.cache_dir, max_workers=args.jobs,
+                              table_format=args.report_format, cv_workers=args.cv_jobs, extend_train=args.incremental,
+                              frozen_features=args.incremental)
+    run_metadata = None
+    if args.incremental:
+        split = pipeline.run(['split'])['split']
+        with profiler.stage('incremental', rows=len(split['train'])):
+            run_metadata = incremental_retrain(split, table_format=args.report_format)
+        if run_metadata is None:
+            print('Running the full pipeline')
+            # A full fit engineers the features with the statistics of all the data again
+            pipeline = build_pipeline(args.data, profiler=profiler, cache_dir=args.cache_dir, max_workers=args.jobs,
+                                      table_format=args.report_format, cv_workers=args.cv_jobs, extend_train=True)
+        else:
+            outputs = {'split': split}
+            run_metadata['mode'] = 'incremental'
+
+    if run_metadata is None:
+        targets = ['evaluate', 'artifacts', 'compress', 'distill', 'shadows', 'publish', 'report']
+        targets += ['visualizations'] if args.visualize else []
+        targets += ['cross_validate'] if args.cv else []
+        outputs = pipeline.run(targets, force=args.force)
+
+        evaluated = outputs['evaluate']
+        results = evaluated['results']
+        print(f'\nBest Model: {evaluated["best_name"]}')
+        print(f'Test MAE: {results["test_mae"]:.6f}')
+        print(f'Test R2: {results["test_r2"]:.4f}')
+        if args.cv:
+            summary = cv_summary(outputs['cross_validate'])
+            chosen = summary.loc[evaluated['best_name']]
+            print(f'Cross-validated MAE: {chosen["mean_val_mae"]:.6f} +/- {chosen["std_val_mae"]:.6f} '
+                  f'(best by cross-validation: {summary.index[0]})')
+        run_metadata = {'mode': 'full', 'best_model': evaluated['best_name'], **results}
+
+    if 'split' in outputs:
+        split = outputs['split']
+        profiler.metadata.update({'train_rows': len(split['train']), 'val_rows': len(split['val']),
+                                  'test_rows': len(split['test'])})
+    profiler.metadata.update(run_metadata)
+    print('\nStage profile:')
+    print(profiler.summary())
+    print(f'Saved to: {profiler.write_json("runs", cache_events=pipeline.events + CONTEXT_EVENTS)}')
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,157 @@
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error
+from sklearn.preprocessing import LabelEncoder
+
+from .model_training import CATEGORICAL_FEATURES, candidate_models, delay_rate, feature_columns, scaled_features
+
+MIN_TRAIN_YEARS = 3
+
+_fold_data = {}
+
+
+def expanding_year_folds(years, min_train_years=MIN_TRAIN_YEARS):
+    """(train_years, val_year) pairs, each year after the first ``min_train_years`` validated on those before it"""
+    years = sorted(set(int(year) for year in years))
+    return [(years[:i], years[i]) for i in range(min_train_years, len(years))]
+
+
+class FoldCache:
+    """Preprocessing shared by every fold, computed once"""
+    # Categoricals are label-encoded once over all rows and the categories present in each year are
+    # kept, so a fold's codes (those of a LabelEncoder fitted on its training years, -1 for categories
+    # those years never saw) are a lookup away. The non-missing values of every scaled feature are kept
+    # sorted per year, so a fold's RobustScaler statistics come from merging those sorted runs.
+
+    def __init__(self, frame):
+        self.feature_cols = feature_columns(frame)
+        self.features_to_scale = scaled_features(frame, self.feature_cols)
+        self.years = frame['year'].to_numpy()
+        self.y = delay_rate(frame)
+
+        encoded = frame[self.feature_cols].copy()
+        for col in CATEGORICAL_FEATURES:
+            if col in encoded:
+                encoded[col] = LabelEncoder().fit_transform(encoded[col].astype(str))
+        self.X = encoded.to_numpy(dtype=np.float64)
+        self.scale_index = np.array([self.feature_cols.index(col) for col in self.features_to_scale], dtype=np.int64)
+        self.category_index = np.array([self.feature_cols.index(col) for col in CATEGORICAL_FEATURES
+                                        if col in self.feature_cols], dtype=np.int64)
+        self.n_categories = [int(self.X[:, col].max()) + 1 if len(self.X) else 0 for col in self.category_index]
+
+        self.sorted_runs = {}
+        self.year_categories = {}
+        for year in np.unique(self.years):
+            rows = self.X[self.years == year]
+            self.sorted_runs[int(year)] = [np.sort(column[~np.isnan(column)]) for column in rows[:, self.scale_index].T]
+            self.year_categories[int(year)] = [np.unique(column) for column in rows[:, self.category_index].T]
+
+    def category_codes(self, train_years):
+        """Per categorical, a map from the global code to the code of an encoder fitted on ``train_years``"""
+        codes = []
+        for j, n in enumerate(self.n_categories):
+            seen = np.unique(np.concatenate([self.year_categories[year][j] for year in train_years])).astype(np.int64)
+            mapping = np.full(n, -1.0)
+            # Global codes are sorted like the encoder's classes, so the seen ones keep their order
+            mapping[seen] = np.arange(len(seen))
+            codes.append(mapping)
+        return codes
+
+    def scaler_statistics(self, train_years):
+        """RobustScaler's center_ and scale_ for a fold trained on ``train_years``"""
+        center, scale = [], []
+        for j in range(len(self.scale_index)):
+            # A stable sort of concatenated sorted runs is a merge, not a full re-sort
+            merged = np.sort(np.concatenate([self.sorted_runs[year][j] for year in train_years]), kind='stable')
+            q25, q50, q75 = np.percentile(merged, [25, 50, 75]) if len(merged) else (0.0, 0.0, 0.0)
+            center.append(q50)
+            scale.append(q75 - q25)
+        scale = np.array(scale)
+        scale[scale == 0] = 1.0
+        return np.array(center), scale
+
+
+def _init_worker(X, y, years, scale_index, category_index):
+    _fold_data.update(X=X, y=y, years=years, scale_index=scale_index, category_index=category_index)
+
+
+def _fit_fold(fold, train_years, val_year, name, center, scale, codes):
+    X, y, years, scale_index, category_index = (_fold_data[key] for key in
+                                                ('X', 'y', 'years', 'scale_index', 'category_index'))
+    train = np.isin(years, train_years)
+    val = years == val_year
+    X_train, X_val = X[train], X[val]
+    for block in (X_train, X_val):
+        block[:, scale_index] = (block[:, scale_index] - center) / scale
+        for col, mapping in zip(category_index, codes):
+            block[:, col] = mapping[block[:, col].astype(np.int64)]
+
+    _, model = candidate_models()[name]
+    if 'n_jobs' in model.get_params():
+        # The folds already occupy the cores
+        model.set_params(n_jobs=1)
+    start = time.perf_counter()
+    model.fit(X_train, y[train])
+    fit_seconds = time.perf_counter() - start
+    predictions = np.clip(model.predict(X_val), 0, 1)
+    return {'fold': fold, 'train_years': f'{min(train_years)}-{max(train_years)}', 'val_year': val_year,
+            'model': name, 'train_rows': int(train.sum()), 'val_rows': int(val.sum()),
+            'val_mae': mean_absolute_error(y[val], predictions), 'val_r2': r2_score(y[val], predictions),
+            'val_rmse': float(np.sqrt(mean_squared_error(y[val], predictions))), 'fit_seconds': fit_seconds}
+
+
+def cross_validate(frame, models=None, min_train_years=MIN_TRAIN_YEARS, max_workers=None):
+    """Fit every model on every expanding-window year fold of ``frame``, folds in parallel processes"""
+    # Fits are submitted largest first so the longest ones do not start last; the wall time of the run
+    # is stored in attrs['wall_seconds'].
+    models = list(models or candidate_models())
+    cache = FoldCache(frame)
+    folds = expanding_year_folds(cache.years, min_train_years)
+    if not folds:
+        raise ValueError(f'Cross-validation needs more than {min_train_years} years of data')
+
+    statistics = [(*cache.scaler_statistics(train_years), cache.category_codes(train_years))
+                  for train_years, _ in folds]
+    tasks = [(fold, train_years, val_year, name, *statistics[fold])
+             for fold, (train_years, val_year) in enumerate(folds) for name in models]
+    size = {fold: np.isin(cache.years, train_years).sum() for fold, (train_years, _) in enumerate(folds)}
+    cost = {name: candidate_models()[name][1].get_params().get('n_estimators', 1) for name in models}
+    tasks.sort(key=lambda task: size[task[0]] * cost[task[3]], reverse=True)
+
+    start = time.perf_counter()
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    print(f'Cross-validating {len(models)} models on {len(folds)} folds with {max_workers} processes')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context('spawn'), initializer=_init_worker,
+                             initargs=(cache.X, cache.y, cache.years, cache.scale_index,
+                                       cache.category_index)) as pool:
+        rows = list(pool.map(_fit_fold, *zip(*tasks)))
+
+    results = pd.DataFrame(rows).sort_values(['fold', 'model']).reset_index(drop=True)
+    results.attrs['wall_seconds'] = time.perf_counter() - start
+    return results
+
+
+def cv_summary(results):
+    return (results.groupby('model')
+            .agg(mean_val_mae=('val_mae', 'mean'), std_val_mae=('val_mae', 'std'), mean_val_r2=('val_r2', 'mean'),
+                 fit_seconds=('fit_seconds', 'sum'), max_fit_seconds=('fit_seconds', 'max'))
+            .sort_values('mean_val_mae'))
+
+
+def print_cv_report(results):
+    summary = cv_summary(results)
+    for fold, rows in results.groupby('fold'):
+        print(f"Fold {fold}: train {rows['train_years'].iloc[0]} ({rows['train_rows'].iloc[0]:,} rows), "
+              f"validate {rows['val_year'].iloc[0]} ({rows['val_rows'].iloc[0]:,} rows)")
+    print(summary.to_string(float_format=lambda v: f'{v:.6f}'))
+    serial = results['fit_seconds'].sum()
+    wall = results.attrs.get('wall_seconds')
+    if wall:
+        print(f'Wall time {wall:.1f}s for {serial:.1f}s of fits '
+              f"(longest single fit {results['fit_seconds'].max():.1f}s, {serial / wall:.1f}x parallel speedup)")
+    print(f'Best by cross-validation: {summary.index[0]}')
@@ -3,8 +3,7 @@ import numpy as np
 
 
 def load_and_clean_data(filepath):
-    df = pd.read_csv(
-        'C:\\Users\\smabu\\.cache\\kagglehub\\datasets\\sriharshaeedala\\airline-delay\\versions\\1\\Airline_Delay_Cause.csv')
+    df = pd.read_csv(filepath)
     print(f'Data loaded: {df.shape}')
 
     if 'year' in df.columns:
@@ -30,11 +29,14 @@ def load_and_clean_data(filepath):
     return df
 
 
-def cap_outliers(df):
-    delay_cols = ['arr_delay', 'carrier_delay', 'weather_delay', 'nas_delay', 'late_aircraft_delay']
-    for col in delay_cols:
+DELAY_CAP_COLUMNS = ['arr_delay', 'carrier_delay', 'weather_delay', 'nas_delay', 'late_aircraft_delay']
+
+
+def cap_outliers(df, caps=None):
+    # caps maps a delay column to its cap, by default its own 99th percentile
+    for col in DELAY_CAP_COLUMNS:
         if col in df.columns:
-            cap_value = df[col].quantile(0.99)
+            cap_value = df[col].quantile(0.99) if caps is None else caps[col]
             df[col] = df[col].clip(upper=cap_value)
     print('Capped delay columns at 99th percentile')
 
@@ -0,0 +1,231 @@
+import bisect
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, r2_score
+
+SURROGATE_PATH = 'models/surrogate_model.pkl'
+UNKNOWN = '__unknown__'
+MAX_GRID_ROWS = 200_000
+HOLDOUT_ROWS = 20_000
+N_FLIGHT_KNOTS = 24
+# Knots run past the 99.5th percentile of arr_flights in training, up to this multiple of it
+FLIGHT_KNOT_RANGE = 4
+BACKFIT_ITERATIONS = 10
+# Additive terms of the surrogate: main effects plus the month interactions that carry most
+# of the seasonal structure the ensemble learns per carrier and airport
+TERMS = (('carrier',), ('airport',), ('month',), ('flights',), ('carrier', 'month'), ('airport', 'month'))
+
+
+class AdditiveSurrogate:
+    """Sum of small lookup tables approximating the serving model on lookup misses"""
+    # On a miss the model only sees carrier, airport, month and arr_flights, so an intercept plus one table
+    # per term in TERMS reproduces it closely. Unseen carriers and airports use the UNKNOWN slot; the
+    # arr_flights table is interpolated in log(1 + arr_flights) between its knots.
+
+    def __init__(self, carriers, airports, flight_knots, intercept, tables):
+        self.carriers = list(carriers)
+        self.airports = list(airports)
+        self.flight_knots = np.asarray(flight_knots, dtype=float)
+        self.intercept = float(intercept)
+        self.tables = {term: np.asarray(table, dtype=np.float32) for term, table in tables.items()}
+        self.fidelity = None
+        self._index()
+
+    def _index(self):
+        self._carrier_pos = {c: i for i, c in enumerate(self.carriers)}
+        self._airport_pos = {a: i for i, a in enumerate(self.airports)}
+        self._log_knots = np.log1p(self.flight_knots)
+        self._log_knots_list = self._log_knots.tolist()
+        self._lists = {term: table.astype(float).tolist() for term, table in self.tables.items()}
+
+    def __getstate__(self):
+        return {'carriers': self.carriers, 'airports': self.airports, 'flight_knots': self.flight_knots,
+                'intercept': self.intercept, 'tables': self.tables, 'fidelity': self.fidelity}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._index()
+
+    def covers(self, months):
+        """Whether the month tables have a row for each month (1-12); the model scores the others"""
+        months = np.asarray(months)
+        return (months >= 1) & (months <= 12)
+
+    def codes(self, carriers, airports, months, arr_flights):
+        """Level of each input for every term, with arr_flights at its nearest knot, as arrays"""
+        carrier = np.array([self._carrier_pos.get(c, len(self.carriers) - 1) for c in carriers], dtype=np.int64)
+        airport = np.array([self._airport_pos.get(a, len(self.airports) - 1) for a in airports], dtype=np.int64)
+        # Month codes index the month tables by position, so 0 would wrap to December and 13 overflow
+        if not self.covers(months).all():
+            raise ValueError('the surrogate only scores months 1-12')
+        month = np.asarray(months, dtype=np.int64) - 1
+        log_flights = np.log1p(np.asarray(arr_flights, dtype=float))
+        flights = np.searchsorted((self._log_knots[1:] + self._log_knots[:-1]) / 2, log_flights)
+        levels = {'carrier': carrier, 'airport': airport, 'month': month, 'flights': flights}
+        return {term: _term_codes(term, levels) for term in TERMS}
+
+    def predict(self, carriers, airports, months, arr_flights):
+        codes = self.codes(carriers, airports, months, arr_flights)
+        prediction = np.full(len(codes[TERMS[0]]), self.intercept)
+        for term, table in self.tables.items():
+            if term == ('flights',):
+                prediction += np.interp(np.log1p(np.asarray(arr_flights, dtype=float)), self._log_knots, table)
+            else:
+                prediction += table[codes[term]]
+        return prediction
+
+    def predict_one(self, carrier, airport, month, arr_flights):
+        # Plain Python lists and dicts: a few microseconds per call, no numpy overhead
+        c = self._carrier_pos.get(carrier, len(self.carriers) - 1)
+        a = self._airport_pos.get(airport, len(self.airports) - 1)
+        m = int(month) - 1
+        if not 0 <= m < 12:
+            raise ValueError(f'the surrogate only scores months 1-12, not {month}')
+        t = self._lists
+        return (self.intercept + t[('carrier',)][c] + t[('airport',)][a] + t[('month',)][m]
+                + self._flights_term(arr_flights) + t[('carrier', 'month')][c * 12 + m]
+                + t[('airport', 'month')][a * 12 + m])
+
+    def _flights_term(self, arr_flights):
+        knots, values = self._log_knots_list, self._lists[('flights',)]
+        x = math.log1p(arr_flights)
+        i = bisect.bisect_right(knots, x)
+        if i == 0:
+            return values[0]
+        if i == len(knots):
+            return values[-1]
+        weight = (x - knots[i - 1]) / (knots[i] - knots[i - 1])
+        return values[i - 1] + weight * (values[i] - values[i - 1])
+
+
+def _term_codes(term, levels):
+    if term == ('carrier', 'month'):
+        return levels['carrier'] * 12 + levels['month']
+    if term == ('airport', 'month'):
+        return levels['airport'] * 12 + levels['month']
+    return levels[term[0]]
+
+
+def flight_knots(stats):
+    low = max(int(stats['min_flights']), 1)
+    high = max(int(stats['max_flights']) * FLIGHT_KNOT_RANGE, low + 1)
+    return np.unique(np.round(np.geomspace(low, high, N_FLIGHT_KNOTS)))
+
+
+def input_grid(predictor, carriers, airports, knots, seed=42):
+    """Carrier x airport x month x arr_flights-knot inputs that miss the lookup, up to MAX_GRID_ROWS"""
+    shape = (len(carriers), len(airports), 12, len(knots))
+    n_total = int(np.prod(shape))
+    rng = np.random.default_rng(seed)
+    flat = np.arange(n_total) if n_total <= MAX_GRID_ROWS else rng.choice(n_total, MAX_GRID_ROWS, replace=False)
+    c, a, m, f = np.unravel_index(flat, shape)
+    return _misses(predictor, pd.DataFrame({'carrier': np.array(carriers, dtype=object)[c],
+                                            'airport': np.array(airports, dtype=object)[a],
+                                            'month': m + 1, 'arr_flights': knots[f]}))
+
+
+def holdout_sample(predictor, carriers, airports, knots, seed=43):
+    # Random misses with arr_flights log-uniform between the knots rather than on them
+    rng = np.random.default_rng(seed)
+    log_flights = rng.uniform(np.log(knots[0]), np.log(knots[-1]), HOLDOUT_ROWS)
+    return _misses(predictor, pd.DataFrame({'carrier': rng.choice(np.array(carriers, dtype=object), HOLDOUT_ROWS),
+                                            'airport': rng.choice(np.array(airports, dtype=object), HOLDOUT_ROWS),
+                                            'month': rng.integers(1, 13, HOLDOUT_ROWS),
+                                            'arr_flights': np.round(np.exp(log_flights))}))
+
+
+def _misses(predictor, grid):
+    miss = predictor.lookup.find(grid['carrier'].to_numpy(), grid['airport'].to_numpy(), grid['month'].to_numpy()) < 0
+    return grid[miss].reset_index(drop=True)
+
+
+def _teacher(predictor, grid):
+    features = predictor._build_features(grid['carrier'].to_numpy(), grid['airport'].to_numpy(),
+                                         grid['month'].to_numpy(), grid['arr_flights'].to_numpy())
+    return np.clip(predictor.model.predict(features[predictor.feature_cols]), 0, 1)
+
+
+def backfit(codes, sizes, y, iterations=BACKFIT_ITERATIONS):
+    """Least-squares additive tables by backfitting: each table is refitted to the residual of the others"""
+    intercept = float(y.mean())
+    tables = {term: np.zeros(size) for term, size in sizes.items()}
+    fitted = {term: np.zeros(len(y)) for term in sizes}
+    total = np.full(len(y), intercept)
+    for _ in range(iterations):
+        for term in sizes:
+            residual = y - (total - fitted[term])
+            counts = np.bincount(codes[term], minlength=sizes[term])
+            sums = np.bincount(codes[term], weights=residual, minlength=sizes[term])
+            table = np.divide(sums, counts, out=np.zeros(sizes[term]), where=counts > 0)
+            table -= np.average(table, weights=counts) if counts.sum() else 0.0
+            total += table[codes[term]] - fitted[term]
+            fitted[term] = table[codes[term]]
+            tables[term] = table
+        intercept += float((y - total).mean())
+        total = intercept + sum(fitted.values())
+    return intercept, tables
+
+
+def _fidelity(sample, teacher, student):
+    # Risk levels use the same cut-offs as the app
+    bands = [0.15, 0.25, 0.35]
+    return {'sample': sample, 'rows': len(teacher), 'mae': mean_absolute_error(teacher, student),
+            'max_abs_error': float(np.abs(teacher - student).max()), 'r2': r2_score(teacher, student),
+            'risk_level_agreement': float((np.digitize(teacher, bands) == np.digitize(student, bands)).mean())}
+
+
+def distill(predictor, seed=42):
+    """Fit an AdditiveSurrogate to the predictor's model; returns it and its fidelity on the grid and held-out misses"""
+    # Known carriers and airports plus one slot for those the model has not seen
+    carriers = predictor.route_index['carriers'].tolist() + [UNKNOWN]
+    airports = predictor.route_index['airports'].tolist() + [UNKNOWN]
+    knots = flight_knots(predictor.stats)
+    surrogate = AdditiveSurrogate(carriers, airports, knots, 0.0, {})
+    sizes = {('carrier',): len(carriers), ('airport',): len(airports), ('month',): 12, ('flights',): len(knots),
+             ('carrier', 'month'): len(carriers) * 12, ('airport', 'month'): len(airports) * 12}
+
+    grid = input_grid(predictor, carriers, airports, knots, seed=seed)
+    teacher = _teacher(predictor, grid)
+    codes = surrogate.codes(grid['carrier'], grid['airport'], grid['month'], grid['arr_flights'])
+    intercept, tables = backfit(codes, sizes, teacher)
+    surrogate = AdditiveSurrogate(carriers, airports, knots, intercept, tables)
+
+    holdout = holdout_sample(predictor, carriers, airports, knots, seed=seed + 1)
+    rows = []
+    for sample, frame, target in (('fit', grid, teacher), ('held_out', holdout, _teacher(predictor, holdout))):
+        student = surrogate.predict(frame['carrier'], frame['airport'], frame['month'], frame['arr_flights'])
+        rows.append(_fidelity(sample, target, np.clip(student, 0, 1)))
+    report = pd.DataFrame(rows)
+    surrogate.fidelity = report.set_index('sample').to_dict('index')
+    return surrogate, report
+
+
+def miss_latency(predictor, surrogate, n_calls=200, seed=42):
+    """Median seconds per single-route miss prediction with the model and with the surrogate"""
+    rng = np.random.default_rng(seed)
+    carriers = predictor.route_index['carriers']
+    queries = [(str(rng.choice(carriers)), UNKNOWN, int(rng.integers(1, 13)), int(rng.integers(10, 2000)))
+               for _ in range(n_calls)]
+
+    def median_seconds(func):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            func(*query)
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings))
+
+    def model_predict(carrier, airport, month, arr_flights):
+        X = predictor._build_features(carrier, airport, month, arr_flights)[predictor.feature_cols]
+        return predictor.model.predict(X)[0]
+
+    return {'model': median_seconds(model_predict), 'surrogate': median_seconds(surrogate.predict_one)}
+
+
+def print_distillation_report(report, latency):
+    print(report.to_string(index=False, float_format=lambda v: f'{v:.6g}'))
+    print(f"Miss prediction: {latency['model'] * 1e6:,.0f} us with the model, "
+          f"{latency['surrogate'] * 1e6:,.1f} us with the surrogate")
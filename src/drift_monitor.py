@@ -0,0 +1,187 @@
+import bisect
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .model_training import delay_rate
+
+DRIFT_REFERENCE_PATH = 'models/drift_reference.pkl'
+N_FLIGHT_BINS = 32
+N_PROBABILITY_BINS = 20
+# Usual PSI reading: below 0.1 stable, 0.1-0.25 moderate shift, above 0.25 significant shift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Features whose bins are ordered, so a KS statistic between the binned CDFs makes sense
+ORDERED_FEATURES = ('month', 'arr_flights', 'delay_probability')
+
+
+def flight_edges(train):
+    high = max(float(train['arr_flights'].quantile(0.995)) * 4, 2.0)
+    return np.unique(np.round(np.geomspace(1, high, N_FLIGHT_BINS - 1)))
+
+
+def build_drift_reference(train, stats):
+    """Training distributions the drift monitor compares live queries against"""
+    # Carriers and airports get one bin per value seen in training plus one for unseen values, months one
+    # per month plus one for values outside 1-12, arr_flights log-spaced bins and delay_probability
+    # (compared with the training delay rates) bins of width 1 / N_PROBABILITY_BINS plus one for NaN
+    carriers, airports = list(stats['carriers']), list(stats['airports'])
+    edges = flight_edges(train)
+    counts = {
+        'carrier': np.bincount(_category_bins(train['carrier'], {c: i for i, c in enumerate(carriers)}), minlength=len(carriers) + 1),
+        'airport': np.bincount(_category_bins(train['airport'], {a: i for i, a in enumerate(airports)}), minlength=len(airports) + 1),
+        'month': np.bincount(_month_bins(train['month']), minlength=13),
+        'arr_flights': np.bincount(np.searchsorted(edges, train['arr_flights'].to_numpy(), side='right'),
+                                   minlength=len(edges) + 1),
+        'delay_probability': np.bincount(_probability_bins(delay_rate(train)), minlength=N_PROBABILITY_BINS + 1)}
+    return {'carriers': carriers, 'airports': airports, 'flight_edges': edges, 'counts': counts}
+
+
+def _category_bins(values, position):
+    # Values missing from ``position`` go to the extra bin after the known categories
+    return np.array([position.get(value, len(position)) for value in values], dtype=np.int64)
+
+
+def _month_bins(months):
+    # Months outside 1-12 (or missing) go to the extra bin after December
+    months = np.asarray(months, dtype=float)
+    valid = (months >= 1) & (months <= 12)
+    return np.where(valid, np.nan_to_num(months) - 1, 12).astype(np.int64)
+
+
+def _month_bin(month):
+    return int(month) - 1 if 1 <= month <= 12 else 12
+
+
+def _probability_bins(values):
+    # NaN goes to the extra bin after the probability bins
+    values = np.asarray(values, dtype=float)
+    bins = np.minimum((np.clip(np.nan_to_num(values), 0, 1) * N_PROBABILITY_BINS).astype(np.int64),
+                      N_PROBABILITY_BINS - 1)
+    return np.where(np.isnan(values), N_PROBABILITY_BINS, bins)
+
+
+def _probability_bin(value):
+    if math.isnan(value):
+        return N_PROBABILITY_BINS
+    return min(int(min(max(value, 0.0), 1.0) * N_PROBABILITY_BINS), N_PROBABILITY_BINS - 1)
+
+
+def psi(reference, observed, epsilon=1e-4):
+    """Population stability index between two histograms over the same bins"""
+    expected = np.maximum(reference / max(reference.sum(), 1), epsilon)
+    actual = np.maximum(observed / max(observed.sum(), 1), epsilon)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def binned_ks(reference, observed):
+    # Largest gap between the two CDFs at the bin edges; a lower bound on the exact KS statistic
+    return float(np.abs(np.cumsum(reference) / max(reference.sum(), 1)
+                        - np.cumsum(observed) / max(observed.sum(), 1)).max())
+
+
+class DriftMonitor:
+    """Histograms of scoring traffic compared against the training reference"""
+    # Every thread gets its own fixed-size counters on its first call, so recording never takes a lock;
+    # counts() sums the shards. Out-of-range months and NaN probabilities have bins of their own, so
+    # recording never raises on the scoring path.
+
+    def __init__(self, reference):
+        self.reference = reference
+        self._carrier_pos = {c: i for i, c in enumerate(reference['carriers'])}
+        self._airport_pos = {a: i for i, a in enumerate(reference['airports'])}
+        self._edges = reference['flight_edges'].tolist()
+        self._sizes = {**{name: len(counts) for name, counts in reference['counts'].items()}, 'source': 2}
+        self._local = threading.local()
+        self._shards = []
+        self._register = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _shard(self):
+        shard = getattr(self._local, 'counts', None)
+        if shard is None:
+            # Plain lists: incrementing a list item is several times cheaper than a numpy element
+            shard = {name: [0] * size for name, size in self._sizes.items()}
+            self._local.counts = shard
+            # Only taken once per thread, never on the recording path
+            with self._register:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, carrier, airport, month, arr_flights, delay_prob, hit):
+        shard = self._shard()
+        shard['carrier'][self._carrier_pos.get(carrier, len(self._carrier_pos))] += 1
+        shard['airport'][self._airport_pos.get(airport, len(self._airport_pos))] += 1
+        shard['month'][_month_bin(month)] += 1
+        shard['arr_flights'][bisect.bisect_right(self._edges, arr_flights)] += 1
+        shard['delay_probability'][_probability_bin(delay_prob)] += 1
+        shard['source'][0 if hit else 1] += 1
+
+    def record_batch(self, carriers, airports, months, arr_flights, delay_prob, hit):
+        shard = self._shard()
+        bins = {'carrier': _category_bins(carriers, self._carrier_pos),
+                'airport': _category_bins(airports, self._airport_pos),
+                'month': _month_bins(months),
+                'arr_flights': np.searchsorted(self.reference['flight_edges'], np.asarray(arr_flights), side='right'),
+                'delay_probability': _probability_bins(delay_prob),
+                'source': np.where(hit, 0, 1)}
+        for name, values in bins.items():
+            added = np.bincount(values, minlength=self._sizes[name])
+            for i in np.flatnonzero(added):
+                shard[name][i] += int(added[i])
+
+    def counts(self):
+        with self._register:
+            shards = list(self._shards)
+        return {name: np.array([shard[name] for shard in shards], dtype=np.int64).reshape(-1, size).sum(axis=0)
+                for name, size in self._sizes.items()}
+
+    def report(self, counts=None):
+        """PSI (and KS for ordered features) of the traffic so far against the training reference"""
+        # counts can be the sum of counts() from several monitors, e.g. one per worker
+        counts = counts if counts is not None else self.counts()
+        rows = []
+        for name, reference in self.reference['counts'].items():
+            observed = counts[name]
+            value = psi(reference, observed) if observed.sum() else float('nan')
+            rows.append({'feature': name, 'queries': int(observed.sum()), 'psi': value,
+                         'ks': binned_ks(reference, observed) if name in ORDERED_FEATURES and observed.sum()
+                         else float('nan'),
+                         'status': drift_status(value)})
+        report = pd.DataFrame(rows)
+        hits, misses = counts['source']
+        report.attrs['lookup_hit_rate'] = hits / (hits + misses) if hits + misses else float('nan')
+        return report
+
+    def start(self, interval=60, callback=None):
+        """Call ``callback`` (print_drift_report by default) with a fresh report every ``interval`` seconds"""
+        callback = callback or print_drift_report
+
+        def run():
+            while not self._stop.wait(interval):
+                callback(self.report())
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='drift-monitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def drift_status(value):
+    if np.isnan(value):
+        return 'no data'
+    return 'significant' if value > PSI_SIGNIFICANT else 'moderate' if value > PSI_MODERATE else 'stable'
+
+
+def print_drift_report(report):
+    print(report.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+    print(f"Lookup hit rate: {report.attrs['lookup_hit_rate']:.1%}")
@@ -0,0 +1,135 @@
+import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+N_REPEATS = 3
+MAX_ROWS = 10_000
+FEATURES_PER_BATCH = 4
+
+
+def _as_matrix(X):
+    return np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+
+
+def _serial(model):
+    # Features are already scored in parallel; a shallow copy keeps n_jobs of the shared model untouched
+    if 'n_jobs' in model.get_params():
+        model = copy.copy(model)
+        model.n_jobs = 1
+    return model
+
+
+def _mae(model, X, y, feature_cols):
+    # Wrapping the matrix keeps the feature names the model was fitted with, without copying it
+    frame = pd.DataFrame(X, columns=feature_cols, copy=False)
+    return float(np.abs(np.clip(model.predict(frame), 0, 1) - y).mean())
+
+
+def _permute_batch(model, X, y, feature_cols, columns, baseline, n_repeats, seed):
+    # One preallocated copy per batch; each column is shuffled in place and then restored
+    buffer = X.copy()
+    scores = {}
+    for j in columns:
+        original = buffer[:, j].copy()
+        rng = np.random.default_rng([seed, j])
+        increases = []
+        for _ in range(n_repeats):
+            buffer[:, j] = original[rng.permutation(len(original))]
+            increases.append(_mae(model, buffer, y, feature_cols) - baseline)
+        buffer[:, j] = original
+        scores[j] = increases
+    return scores
+
+
+def permutation_importance(model, X, y, feature_cols=None, n_repeats=N_REPEATS, max_workers=None,
+                           features_per_batch=FEATURES_PER_BATCH, seed=42):
+    """Mean and std of the increase in MAE when each feature is shuffled, for any fitted model"""
+    # Batches of features run on a thread pool, each permuting columns of its own copy of the matrix in place;
+    # shuffles are seeded per feature so the result does not depend on the number of threads.
+    feature_cols = list(feature_cols if feature_cols is not None else X.columns)
+    X, y = _as_matrix(X), np.asarray(y, dtype=np.float64)
+    model = _serial(model)
+    baseline = _mae(model, X, y, feature_cols)
+
+    batches = [range(start, min(start + features_per_batch, len(feature_cols)))
+               for start in range(0, len(feature_cols), features_per_batch)]
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(_permute_batch, model, X, y, feature_cols, batch, baseline, n_repeats, seed)
+                   for batch in batches]
+        scores = {j: increases for future in futures for j, increases in future.result().items()}
+
+    return pd.DataFrame({'feature': feature_cols,
+                         'permutation_importance': [float(np.mean(scores[j])) for j in range(len(feature_cols))],
+                         'permutation_std': [float(np.std(scores[j])) for j in range(len(feature_cols))]})
+
+
+def _tree_terms(model):
+    """(trees, weight per tree, constant added to the weighted sum of tree outputs)"""
+    if isinstance(model, DecisionTreeRegressor):
+        return [model], 1.0, 0.0
+    if isinstance(model, GradientBoostingRegressor):
+        init = 0.0 if isinstance(model.init_, str) else float(np.ravel(model.init_.constant_)[0])
+        return [stage[0] for stage in model.estimators_], model.learning_rate, init
+    return list(model.estimators_), 1.0 / len(model.estimators_), 0.0
+
+
+def supports_path_attribution(model):
+    return isinstance(model, (RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor,
+                              DecisionTreeRegressor))
+
+
+def path_attribution(model, X):
+    """(bias, contributions) decomposing a tree model's predictions along each sample's decision paths"""
+    # Each split's change in node value is credited to the parent's feature; with the bias, the contributions
+    # sum to the unclipped prediction exactly.
+    trees, weight, constant = _tree_terms(model)
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    n_features = model.n_features_in_
+    contributions = np.zeros((len(X), n_features))
+    bias = constant
+    for tree in trees:
+        t = tree.tree_
+        value = t.value[:, 0, 0]
+        parent = np.full(t.node_count, -1)
+        internal = np.flatnonzero(t.children_left >= 0)
+        parent[t.children_left[internal]] = internal
+        parent[t.children_right[internal]] = internal
+
+        # Change of value entering each non-root node, keyed by the feature its parent split on
+        child = np.flatnonzero(parent >= 0)
+        delta = np.zeros((t.node_count, n_features))
+        delta[child, t.feature[parent[child]]] = value[child] - value[parent[child]]
+
+        paths = t.decision_path(X)
+        contributions += weight * (paths @ delta)
+        bias += weight * value[0]
+    return bias, contributions
+
+
+def attribute_features(model, X, y, feature_cols=None, max_rows=MAX_ROWS, n_repeats=N_REPEATS, max_workers=None,
+                        seed=42):
+    """Importance of every feature of ``model`` on held-out rows ``X``/``y``, for any model in the zoo"""
+    # importance is the share of the path-based attribution for tree models, of permutation importance otherwise
+    feature_cols = list(feature_cols if feature_cols is not None else X.columns)
+    X, y = _as_matrix(X), np.asarray(y, dtype=np.float64)
+    if len(X) > max_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(len(X), max_rows, replace=False))
+        X, y = X[rows], y[rows]
+
+    table = permutation_importance(model, X, y, feature_cols, n_repeats=n_repeats, max_workers=max_workers,
+                                   seed=seed)
+    if supports_path_attribution(model):
+        _, contributions = path_attribution(model, X)
+        table['path_importance'] = np.abs(contributions).mean(axis=0)
+        table['impurity_importance'] = model.feature_importances_
+        method, scores = 'path', table['path_importance']
+    else:
+        method, scores = 'permutation', table['permutation_importance'].clip(lower=0)
+    table.insert(1, 'importance', scores / scores.sum() if scores.sum() > 0 else scores)
+    table.insert(2, 'method', method)
+    return table.sort_values('importance', ascending=False).reset_index(drop=True)
@@ -1,12 +1,10 @@
 import pandas as pd
 import numpy as np
 
+from .data_preprocessing import DELAY_CAP_COLUMNS
 
-def engineer_features(df):
-    if 'arr_delay' in df.columns and 'arr_flights' in df.columns:
-        df['avg_delay_minutes'] = df['arr_delay'] / df['arr_flights']
-        df['avg_delay_minutes'] = df['avg_delay_minutes'].fillna(0)
 
+def add_delay_percentages(df):
     if all(col in df.columns for col in
            ['carrier_delay', 'weather_delay', 'nas_delay', 'security_delay', 'late_aircraft_delay', 'arr_delay']):
         total_delay = df['arr_delay'].replace(0, np.nan)
@@ -15,6 +13,46 @@ def engineer_features(df):
         df['nas_delay_pct'] = (df['nas_delay'] / total_delay * 100).fillna(0)
         df['security_delay_pct'] = (df['security_delay'] / total_delay * 100).fillna(0)
         df['late_aircraft_delay_pct'] = (df['late_aircraft_delay'] / total_delay * 100).fillna(0)
+    return df
+
+
+def feature_statistics(df):
+    """Whole-frame statistics engineer_features derives the rate, seasonal and capped features from"""
+    # Saved with the model so --incremental can engineer new months without moving the features
+    # of the rows the model was fitted on
+    df = add_delay_percentages(df.copy())
+    carrier = df.groupby('carrier')[['arr_del15', 'arr_flights']].sum()
+    airport = df.groupby('airport')[['arr_del15', 'arr_flights']].sum()
+    seasonal = df.groupby(['carrier', 'airport', 'month']).agg({'arr_del15': 'sum', 'arr_flights': 'sum'}).reset_index()
+    seasonal['seasonal_delay_rate'] = seasonal['arr_del15'] / seasonal['arr_flights']
+    statistics = {'baseline_year': df['year'].min(),
+                  'carrier_rate': carrier['arr_del15'] / carrier['arr_flights'],
+                  'airport_rate': airport['arr_del15'] / airport['arr_flights'],
+                  'seasonal': seasonal[['carrier', 'airport', 'month', 'seasonal_delay_rate']],
+                  'breakdown': None,
+                  'delay_caps': {col: df[col].quantile(0.99) for col in DELAY_CAP_COLUMNS if col in df.columns}}
+
+    if all(col in df.columns for col in
+           ['carrier_delay_pct', 'weather_delay_pct', 'nas_delay_pct', 'late_aircraft_delay_pct']):
+        breakdown = df.groupby(['carrier', 'airport', 'month']).agg(
+            {'carrier_delay_pct': 'mean', 'weather_delay_pct': 'mean', 'nas_delay_pct': 'mean',
+             'security_delay_pct': 'mean', 'late_aircraft_delay_pct': 'mean'}).reset_index()
+        breakdown.columns = ['carrier', 'airport', 'month', 'avg_carrier_pct', 'avg_weather_pct', 'avg_nas_pct',
+                             'avg_security_pct', 'avg_late_aircraft_pct']
+        statistics['breakdown'] = breakdown
+    return statistics
+
+
+def engineer_features(df, statistics=None):
+    # statistics (from feature_statistics) default to those of df itself
+    if statistics is None:
+        statistics = feature_statistics(df)
+
+    if 'arr_delay' in df.columns and 'arr_flights' in df.columns:
+        df['avg_delay_minutes'] = df['arr_delay'] / df['arr_flights']
+        df['avg_delay_minutes'] = df['avg_delay_minutes'].fillna(0)
+
+    df = add_delay_percentages(df)
 
     for ct_col, flag_col in [('weather_ct', 'weather_impact_occurred'), ('nas_ct', 'system_congestion_occurred'),
                              ('late_aircraft_ct', 'cascade_delay_occurred'), ('carrier_ct', 'carrier_issues_occurred'),
@@ -26,7 +64,7 @@ def engineer_features(df):
              'nas_delay', 'security_delay', 'late_aircraft_delay']
     df = df.drop(columns=[col for col in leaky if col in df.columns], errors='ignore')
 
-    baseline = df['year'].min()
+    baseline = statistics['baseline_year']
     df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
     df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
     df['years_since_baseline'] = df['year'] - baseline
@@ -48,24 +86,15 @@ def engineer_features(df):
                                             labels=['low', 'moderate', 'high', 'severe'])
 
     df['carrier_airport_combo'] = df['carrier'] + '_' + df['airport']
-    carrier_rate = df.groupby('carrier')['arr_del15'].sum() / df.groupby('carrier')['arr_flights'].sum()
-    df['carrier_historical_delay_rate'] = df['carrier'].map(carrier_rate)
-    airport_rate = df.groupby('airport')['arr_del15'].sum() / df.groupby('airport')['arr_flights'].sum()
-    df['airport_historical_delay_rate'] = df['airport'].map(airport_rate)
+    df['carrier_historical_delay_rate'] = df['carrier'].map(statistics['carrier_rate'])
+    df['airport_historical_delay_rate'] = df['airport'].map(statistics['airport_rate'])
 
-    seasonal = df.groupby(['carrier', 'airport', 'month']).agg({'arr_del15': 'sum', 'arr_flights': 'sum'}).reset_index()
-    seasonal['seasonal_delay_rate'] = seasonal['arr_del15'] / seasonal['arr_flights']
-    df = df.merge(seasonal[['carrier', 'airport', 'month', 'seasonal_delay_rate']], on=['carrier', 'airport', 'month'],
-                  how='left')
+    df = df.merge(statistics['seasonal'], on=['carrier', 'airport', 'month'], how='left')
 
-    if all(col in df.columns for col in
-           ['carrier_delay_pct', 'weather_delay_pct', 'nas_delay_pct', 'late_aircraft_delay_pct']):
-        breakdown = df.groupby(['carrier', 'airport', 'month']).agg(
-            {'carrier_delay_pct': 'mean', 'weather_delay_pct': 'mean', 'nas_delay_pct': 'mean',
-             'security_delay_pct': 'mean', 'late_aircraft_delay_pct': 'mean'}).reset_index()
-        breakdown.columns = ['carrier', 'airport', 'month', 'avg_carrier_pct', 'avg_weather_pct', 'avg_nas_pct',
-                             'avg_security_pct', 'avg_late_aircraft_pct']
-        df = df.merge(breakdown, on=['carrier', 'airport', 'month'], how='left')
+    if statistics['breakdown'] is not None and all(col in df.columns for col in
+                                                   ['carrier_delay_pct', 'weather_delay_pct', 'nas_delay_pct',
+                                                    'late_aircraft_delay_pct']):
+        df = df.merge(statistics['breakdown'], on=['carrier', 'airport', 'month'], how='left')
 
     df['carrier_peak_risk'] = df['carrier_historical_delay_rate'] * df['peak_summer']
     df['carrier_winter_risk'] = df['carrier_historical_delay_rate'] * df['winter_weather_season']
@@ -74,7 +103,7 @@ def engineer_features(df):
     # Apply preprocessing steps
     from .data_preprocessing import cap_outliers, create_log_features, reduce_cardinality, remove_duplicate_features
 
-    df = cap_outliers(df)
+    df = cap_outliers(df, statistics['delay_caps'])
     df = create_log_features(df)
     df = reduce_cardinality(df)
     df = remove_duplicate_features(df)
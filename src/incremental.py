@@ -0,0 +1,154 @@
+import copy
+import math
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor
+from sklearn.metrics import mean_absolute_error
+
+from .model_training import delay_rate, encode_features
+
+STATE_PATH = 'models/training_state.pkl'
+FEATURE_STATISTICS_PATH = 'models/feature_statistics.pkl'
+WARM_START_MODELS = (RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor)
+
+# Refit policy: a full refit is required once the model has been extended this many times,
+# once the rows added incrementally exceed this fraction of the rows of the last full fit,
+# or when an incremental update makes the validation MAE this much (relative) worse than
+# the last full fit.
+# The features of an incremental run are engineered with the statistics saved at the last full
+# fit (feature_statistics), so the rows the existing trees were fitted on keep their features and
+# the validation MAE before an update is that of the full fit. Route-months the full fit never saw
+# have no seasonal rate under those statistics and require a full refit.
+MAX_INCREMENTAL_UPDATES = 6
+MAX_INCREMENTAL_ROW_FRACTION = 0.25
+MAX_VAL_MAE_INCREASE = 0.05
+MIN_NEW_TREES = 5
+
+
+def period(frame):
+    return frame['year'].to_numpy() * 12 + frame['month'].to_numpy() - 1
+
+
+def training_state(model, name, train, feature_cols, val_mae, fit_seconds=None):
+    """What the refit policy needs to know about a full fit"""
+    return {'model': name, 'feature_cols': list(feature_cols), 'trained_through': int(period(train).max()),
+            'full_fit_rows': len(train), 'full_fit_val_mae': float(val_mae), 'full_fit_seconds': fit_seconds,
+            'n_estimators_full': getattr(model, 'n_estimators', None), 'incremental_updates': 0,
+            'incremental_rows': 0, 'incremental_seconds': 0.0}
+
+
+def save_training_state(state, path=STATE_PATH):
+    joblib.dump(state, path)
+
+
+def load_training_state(path=STATE_PATH):
+    return joblib.load(path) if os.path.exists(path) else None
+
+
+def save_feature_statistics(statistics, path=FEATURE_STATISTICS_PATH):
+    joblib.dump(statistics, path)
+
+
+def load_feature_statistics(path=FEATURE_STATISTICS_PATH):
+    return joblib.load(path) if os.path.exists(path) else None
+
+
+def new_rows(train, state):
+    """Training rows newer than the data the saved model has seen"""
+    return train[period(train) > state['trained_through']]
+
+
+def full_refit_reason(model, state, new, encoders, feature_cols):
+    """Why the saved model cannot simply be extended with ``new``, or None if it can"""
+    if state is None:
+        return 'no training state from a previous full fit'
+    if not isinstance(model, WARM_START_MODELS):
+        return f"{state['model']} cannot be extended with warm_start trees"
+    if list(feature_cols) != state['feature_cols']:
+        return 'the feature columns changed'
+    # Other categoricals fall back to -1 like the validation and test rows do, but a new carrier
+    # or airport has no code the existing trees could have split on
+    for col in ('carrier', 'airport'):
+        unseen = set(new[col].astype(str)) - set(encoders[col].classes_)
+        if unseen:
+            return f"{len(unseen)} {col} value(s) unseen by the fitted encoders (e.g. {sorted(unseen)[0]})"
+    unknown = new['seasonal_delay_rate'].isna().sum() if 'seasonal_delay_rate' in new.columns else 0
+    if unknown:
+        return f"{unknown} new row(s) on route-months without a seasonal rate at the last full fit"
+    if state['incremental_updates'] >= MAX_INCREMENTAL_UPDATES:
+        return f"already extended {state['incremental_updates']} times since the last full fit"
+    if state['incremental_rows'] + len(new) > MAX_INCREMENTAL_ROW_FRACTION * state['full_fit_rows']:
+        return (f"incremental rows would exceed {MAX_INCREMENTAL_ROW_FRACTION:.0%} "
+                f"of the {state['full_fit_rows']:,} rows of the last full fit")
+    return None
+
+
+def extend_ensemble(model, X, y, n_new_trees):
+    """Copy of ``model`` with ``n_new_trees`` more trees (boosting stages) fitted on ``X``"""
+    # With warm_start only the added trees are built, so the cost is proportional to n_new_trees
+    model = copy.deepcopy(model)
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + n_new_trees)
+    model.fit(X, y)
+    model.set_params(warm_start=False)
+    return model
+
+
+def incremental_update(model, state, train, val, encoders, scaler, feature_cols, features_to_scale,
+                       n_new_trees=None):
+    """Extend the saved ensemble for new training months; returns (model, state, report), model None on refit"""
+    # The added trees are fitted on all of train: trees fitted on the new months alone would only know those months
+    new = new_rows(train, state) if state is not None else train
+    report = {'new_rows': len(new)}
+    reason = full_refit_reason(model, state, new, encoders, feature_cols)
+    if reason is not None:
+        return None, state, {**report, 'mode': 'full', 'reason': reason}
+
+    if n_new_trees is None:
+        # Grow the ensemble in proportion to the data added
+        n_new_trees = max(MIN_NEW_TREES, math.ceil(state['n_estimators_full'] * len(new) / state['full_fit_rows']))
+
+    X_train = encode_features(train, encoders, scaler, feature_cols, features_to_scale)
+    X_val = encode_features(val, encoders, scaler, feature_cols, features_to_scale)
+    y_val = delay_rate(val)
+    val_mae_before = mean_absolute_error(y_val, np.clip(model.predict(X_val), 0, 1))
+
+    start = time.perf_counter()
+    extended = extend_ensemble(model, X_train, delay_rate(train), n_new_trees)
+    seconds = time.perf_counter() - start
+    val_mae_after = mean_absolute_error(y_val, np.clip(extended.predict(X_val), 0, 1))
+
+    # The full fit time is measured by the train stage while other stages may run alongside it (--jobs)
+    full_fit_seconds = state.get('full_fit_seconds')
+    report.update({'mode': 'incremental', 'new_trees': n_new_trees, 'seconds': seconds,
+                   'full_fit_seconds': full_fit_seconds,
+                   'seconds_saved': None if full_fit_seconds is None else full_fit_seconds - seconds,
+                   'val_mae_before': val_mae_before,
+                   'val_mae_after': val_mae_after, 'full_fit_val_mae': state['full_fit_val_mae'],
+                   'val_mae_change': val_mae_after / state['full_fit_val_mae'] - 1})
+
+    if val_mae_after > state['full_fit_val_mae'] * (1 + MAX_VAL_MAE_INCREASE):
+        report.update({'mode': 'full', 'reason': f"val MAE would be {report['val_mae_change']:+.1%} "
+                                                 f"against the last full fit"})
+        return None, state, report
+
+    state = {**state, 'trained_through': max(state['trained_through'], int(period(new).max())),
+             'incremental_updates': state['incremental_updates'] + 1,
+             'incremental_rows': state['incremental_rows'] + len(new),
+             'incremental_seconds': state['incremental_seconds'] + seconds}
+    return extended, state, report
+
+
+def print_report(report):
+    if report['mode'] == 'incremental':
+        print(f"Incremental update: +{report['new_trees']} trees on {report['new_rows']:,} new rows "
+              f"in {report['seconds']:.2f}s")
+        if report['full_fit_seconds'] is not None:
+            print(f"Last full fit: {report['full_fit_seconds']:.2f}s, {report['seconds_saved']:.2f}s saved "
+                  f"({report['seconds'] / report['full_fit_seconds']:.0%} of the fit time)")
+        print(f"Val MAE: {report['val_mae_before']:.6f} before -> {report['val_mae_after']:.6f} after "
+              f"(last full fit {report['full_fit_val_mae']:.6f}, {report['val_mae_change']:+.2%})")
+    else:
+        print(f"Full refit required: {report['reason']}")
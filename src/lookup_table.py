@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+KEYS = ['carrier', 'airport', 'month']
+VALUES = ['arr_del15', 'arr_flights', 'avg_delay_minutes']
+
+
+def _compact(column, exact):
+    # Flight counts stay exact in float32 up to 2**24; larger sums keep float64
+    column = np.asarray(column, dtype=float)
+    compact = column.astype(np.float32)
+    if exact and not np.array_equal(compact, column, equal_nan=True):
+        return column
+    return compact
+
+
+class CompactLookup:
+    """Historical (carrier, airport, month) lookup with int16 codes, float32 values and binary-search access"""
+    # Delayed and total flights are kept exactly, so the derived delay probability matches the float64 one
+
+    def __init__(self, carriers, airports, carrier_codes, airport_codes, months, values):
+        self.carriers = np.asarray(carriers, dtype=str)
+        self.airports = np.asarray(airports, dtype=str)
+        self.carrier_codes = np.asarray(carrier_codes, dtype=np.int16)
+        self.airport_codes = np.asarray(airport_codes, dtype=np.int16)
+        self.months = np.asarray(months, dtype=np.int8)
+        self.values = {name: _compact(column, exact=name != 'avg_delay_minutes') for name, column in values.items()}
+        self._index()
+
+    def _index(self):
+        self._carrier_pos = {c: i for i, c in enumerate(self.carriers.tolist())}
+        self._airport_pos = {a: i for i, a in enumerate(self.airports.tolist())}
+        self._keys = self._key(self.carrier_codes, self.airport_codes, self.months)
+        if len(self._keys) > 1 and (np.diff(self._keys) <= 0).any():
+            raise ValueError('Lookup rows must be unique and sorted by (carrier, airport, month)')
+
+    def _key(self, carrier_codes, airport_codes, months):
+        return ((np.asarray(carrier_codes, dtype=np.int64) * len(self.airports) + airport_codes) * 13
+                + np.asarray(months, dtype=np.int64))
+
+    @classmethod
+    def from_frame(cls, df):
+        df = df.dropna(subset=KEYS)
+        carriers = np.array(sorted(df['carrier'].astype(str).unique()), dtype=str)
+        airports = np.array(sorted(df['airport'].astype(str).unique()), dtype=str)
+        if max(len(carriers), len(airports)) > np.iinfo(np.int16).max:
+            raise ValueError('Too many carriers or airports for int16 codes')
+
+        carrier_codes = np.searchsorted(carriers, df['carrier'].to_numpy(dtype=str))
+        airport_codes = np.searchsorted(airports, df['airport'].to_numpy(dtype=str))
+        months = df['month'].to_numpy(dtype=np.int64)
+        order = np.lexsort((months, airport_codes, carrier_codes))
+        return cls(carriers, airports, carrier_codes[order], airport_codes[order], months[order],
+                   {name: df[name].to_numpy(dtype=float)[order] for name in VALUES})
+
+    def __getstate__(self):
+        return {'carriers': self.carriers, 'airports': self.airports, 'carrier_codes': self.carrier_codes,
+                'airport_codes': self.airport_codes, 'months': self.months, 'values': self.values}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._index()
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def avg_delay_minutes(self):
+        return self.values['avg_delay_minutes']
+
+    def delay_probability(self, positions=slice(None)):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self.values['arr_del15'][positions].astype(float) /
+                    self.values['arr_flights'][positions].astype(float))
+
+    @property
+    def nbytes(self):
+        arrays = [self.carriers, self.airports, self.carrier_codes, self.airport_codes, self.months,
+                  *self.values.values()]
+        return sum(array.nbytes for array in arrays)
+
+    def get(self, carrier, airport, month):
+        """Row position of one route-month, or -1 if it is not in the lookup"""
+        c = self._carrier_pos.get(carrier)
+        a = self._airport_pos.get(airport)
+        # Keys are positional, so a month outside 1-12 would land on a neighbouring route's row
+        if c is None or a is None or not 1 <= month <= 12:
+            return -1
+        key = (c * len(self.airports) + a) * 13 + int(month)
+        pos = int(np.searchsorted(self._keys, key))
+        return pos if pos < len(self._keys) and self._keys[pos] == key else -1
+
+    def _encode(self, names, sorted_names):
+        names = np.asarray(names).astype(str)
+        codes = np.searchsorted(sorted_names, names)
+        found = codes < len(sorted_names)
+        found[found] = sorted_names[codes[found]] == names[found]
+        return np.where(found, codes, -1)
+
+    def find(self, carriers, airports, months):
+        """Row positions for equal-length arrays of route-months, -1 where there is no match"""
+        carrier_codes = self._encode(carriers, self.carriers)
+        airport_codes = self._encode(airports, self.airports)
+        months = np.asarray(months, dtype=np.int64)
+        keys = self._key(carrier_codes, airport_codes, months)
+        if not len(self):
+            return np.full(len(keys), -1)
+        positions = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        hit = ((carrier_codes >= 0) & (airport_codes >= 0) & (months >= 1) & (months <= 12)
+               & (self._keys[positions] == keys))
+        return np.where(hit, positions, -1)
+
+    def carrier_means(self):
+        return self._group_means(self.carrier_codes, self.carriers, 'carrier')
+
+    def airport_means(self):
+        return self._group_means(self.airport_codes, self.airports, 'airport')
+
+    def _group_means(self, codes, labels, index_name):
+        # Mean delay probability per group; like groupby().mean(), missing values are skipped
+        values = self.delay_probability()
+        valid = ~np.isnan(values)
+        counts = np.bincount(codes[valid], minlength=len(labels))
+        sums = np.bincount(codes[valid], weights=values[valid], minlength=len(labels))
+        present = counts > 0
+        return pd.Series(sums[present] / counts[present], index=pd.Index(labels[present], name=index_name),
+                         name='delay_probability')
+
+    def to_frame(self):
+        """The lookup as a DataFrame with string keys, for aggregations such as the leaderboards"""
+        return pd.DataFrame({'carrier': self.carriers[self.carrier_codes], 'airport': self.airports[self.airport_codes],
+                             'month': self.months.astype(np.int64),
+                             'arr_del15': self.values['arr_del15'].astype(float),
+                             'arr_flights': self.values['arr_flights'].astype(float),
+                             'delay_probability': self.delay_probability(),
+                             'avg_delay_minutes': self.values['avg_delay_minutes'].astype(float)})
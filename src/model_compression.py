@@ -0,0 +1,250 @@
+import os
+import pickle
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.tree import DecisionTreeRegressor
+
+COMPACT_MODEL_PATH = 'models/compact_model.pkl'
+AVERAGING_MODELS = (RandomForestRegressor, ExtraTreesRegressor, DecisionTreeRegressor)
+BOOSTING_MODELS = (GradientBoostingRegressor,)
+
+# Settings tried by compress_model; the smallest one whose validation MAE is within
+# MAX_VAL_MAE_INCREASE (relative) of the uncompressed model is saved for serving
+KEEP_FRACTIONS = (1.0, 0.75, 0.5, 0.25)
+LEAF_DTYPES = ('float32', 'float16')
+THRESHOLD_BINS = (None, 256)
+MAX_VAL_MAE_INCREASE = 0.01
+PREDICT_CHUNK_ROWS = 8192
+
+
+def _smallest_uint(max_value):
+    return next(dtype for dtype in (np.uint8, np.uint16, np.uint32) if max_value <= np.iinfo(dtype).max)
+
+
+def _trees(model):
+    if isinstance(model, DecisionTreeRegressor):
+        return [model]
+    if isinstance(model, BOOSTING_MODELS):
+        return [stage[0] for stage in model.estimators_]
+    return list(model.estimators_)
+
+
+def is_compressible(model):
+    return isinstance(model, AVERAGING_MODELS + BOOSTING_MODELS)
+
+
+class CompactForest:
+    """Tree ensemble flattened into small numpy arrays for serving"""
+    # Thresholds become uint8/uint16 indices into sorted per-feature edges and inputs are binned once with
+    # searchsorted, then all trees are walked together level by level. With exact edges the splits are
+    # sklearn's (x <= threshold on float32 inputs); the prediction is base + scale * sum(leaf values).
+
+    def __init__(self, edges, offsets, feature, bins, left, right, value, missing_left, base, scale, max_depth,
+                 feature_names=None, averaging=False):
+        self.edges = edges
+        self.offsets = offsets
+        self.feature = feature
+        self.bins = bins
+        self.left = left
+        self.right = right
+        self.value = value
+        self.missing_left = missing_left
+        self.base = base
+        self.scale = scale
+        self.max_depth = max_depth
+        self.feature_names = feature_names
+        self.averaging = averaging
+
+    @classmethod
+    def from_model(cls, model, trees=None, leaf_dtype='float32', max_bins=None):
+        """Compress ``model``, keeping the trees (boosting stages) at positions ``trees`` in that order"""
+        all_trees = _trees(model)
+        trees = [all_trees[i] for i in (range(len(all_trees)) if trees is None else trees)]
+        structures = [tree.tree_ for tree in trees]
+
+        n_features = model.n_features_in_
+        thresholds = [[] for _ in range(n_features)]
+        for t in structures:
+            internal = t.children_left >= 0
+            for f in np.unique(t.feature[internal]):
+                thresholds[f].append(t.threshold[internal & (t.feature == f)])
+        edges = [np.unique(np.concatenate(values)) if values else np.empty(0) for values in thresholds]
+        if max_bins is not None:
+            edges = [np.unique(np.quantile(e, np.linspace(0, 1, max_bins))) if len(e) > max_bins else e
+                     for e in edges]
+
+        sizes = np.array([t.node_count for t in structures])
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        node_dtype = _smallest_uint(sizes.max() - 1)
+        feature, bins, left, right, value, missing_left = [], [], [], [], [], []
+        for t in structures:
+            local = np.arange(t.node_count)
+            leaf = t.children_left < 0
+            f = np.where(leaf, 0, t.feature)
+            b = np.zeros(t.node_count, dtype=np.int64)
+            for j in np.unique(f[~leaf]):
+                nodes = ~leaf & (f == j)
+                # Nearest edge at or above the threshold (exact when the edges are not snapped)
+                b[nodes] = np.minimum(np.searchsorted(edges[j], t.threshold[nodes]), len(edges[j]) - 1)
+            feature.append(f)
+            bins.append(b)
+            # Leaves point at themselves so every tree can be walked for max_depth levels
+            left.append(np.where(leaf, local, t.children_left))
+            right.append(np.where(leaf, local, t.children_right))
+            value.append(t.value[:, 0, 0])
+            missing = getattr(t, 'missing_go_to_left', None)
+            missing_left.append(np.zeros(t.node_count, dtype=bool) if missing is None else missing.astype(bool))
+
+        if isinstance(model, BOOSTING_MODELS):
+            base = 0.0 if isinstance(model.init_, str) else float(np.ravel(model.init_.constant_)[0])
+            scale = model.learning_rate
+        else:
+            base, scale = 0.0, 1.0 / len(trees)
+        missing_left = np.concatenate(missing_left)
+        return cls(edges=edges, offsets=offsets.astype(np.int64),
+                   feature=np.concatenate(feature).astype(_smallest_uint(max(n_features - 1, 0))),
+                   bins=np.concatenate(bins).astype(_smallest_uint(max(len(e) for e in edges) if edges else 0)),
+                   left=np.concatenate(left).astype(node_dtype), right=np.concatenate(right).astype(node_dtype),
+                   value=np.concatenate(value).astype(leaf_dtype),
+                   missing_left=missing_left if missing_left.any() else None, base=base, scale=scale,
+                   max_depth=max(t.max_depth for t in structures),
+                   feature_names=list(getattr(model, 'feature_names_in_', [])) or None,
+                   averaging=not isinstance(model, BOOSTING_MODELS))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        arrays = [*self.edges, self.offsets, self.feature, self.bins, self.left, self.right, self.value]
+        if self.missing_left is not None:
+            arrays.append(self.missing_left)
+        return sum(array.nbytes for array in arrays)
+
+    def _bin(self, X):
+        # sklearn compares float32 inputs against the thresholds, so bin the float32 values
+        X = X.astype(np.float32).astype(np.float64)
+        binned = np.empty(X.shape, dtype=np.int64)
+        for j, edges in enumerate(self.edges):
+            binned[:, j] = np.searchsorted(edges, X[:, j])
+        return binned, np.isnan(X)
+
+    def _leaf_values_chunk(self, X):
+        binned, missing = self._bin(X)
+        rows = np.arange(len(X))
+        base = self.offsets[:-1, None]
+        node = np.zeros((len(self), len(X)), dtype=np.int64)
+        for _ in range(self.max_depth):
+            nodes = base + node
+            features = self.feature[nodes]
+            go_left = binned[rows, features] <= self.bins[nodes]
+            if self.missing_left is not None:
+                is_missing = missing[rows, features]
+                go_left = np.where(is_missing, self.missing_left[nodes], go_left)
+            node = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[base + node].astype(np.float64)
+
+    def _chunks(self, X, func):
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names] if self.feature_names is not None else X
+        X = np.asarray(X, dtype=np.float64)
+        return [func(self._leaf_values_chunk(X[start:start + PREDICT_CHUNK_ROWS]))
+                for start in range(0, len(X), PREDICT_CHUNK_ROWS)]
+
+    def leaf_values(self, X):
+        """Leaf value of every tree for every row, shape (trees, rows), from one traversal of all trees"""
+        chunks = self._chunks(X, lambda values: values)
+        return np.concatenate(chunks, axis=1) if chunks else np.empty((len(self), 0))
+
+    def predict_from_leaves(self, values):
+        return self.base + self.scale * values.sum(axis=0)
+
+    def predict(self, X):
+        chunks = self._chunks(X, self.predict_from_leaves)
+        return np.concatenate(chunks) if chunks else np.empty(0)
+
+
+def tree_order(model, X_val, y_val):
+    """Tree (boosting stage) positions from most to least useful, so a prefix drops the low-impact ones"""
+    # Boosting stages keep their order; averaging trees are ordered by greedy forward selection on validation MAE
+    trees = _trees(model)
+    if isinstance(model, BOOSTING_MODELS) or len(trees) == 1:
+        return list(range(len(trees)))
+
+    X_val = np.asarray(X_val, dtype=np.float32)
+    predictions = np.array([tree.predict(X_val) for tree in trees])
+    remaining = list(range(len(trees)))
+    order, total = [], np.zeros(len(X_val))
+    while remaining:
+        average = (total + predictions[remaining]) / (len(order) + 1)
+        errors = np.abs(np.clip(average, 0, 1) - y_val).mean(axis=1)
+        best = remaining.pop(int(np.argmin(errors)))
+        order.append(best)
+        total += predictions[best]
+    return order
+
+
+def compress_model(model, X_val, y_val, X_test, y_test, test_mae):
+    """Compress a tree ensemble at each setting; returns the selected CompactForest (or None) and a size/MAE table"""
+    # Trees are ordered on alternate validation rows and the settings are checked on the others,
+    # since the greedy ordering flatters the rows it was chosen on
+    X_val, y_val = pd.DataFrame(X_val), np.asarray(y_val)
+    order_rows = np.arange(len(X_val)) % 2 == 0
+    X_check, y_check = X_val[~order_rows], y_val[~order_rows]
+
+    original_size = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    original_val_mae = mean_absolute_error(y_check, np.clip(model.predict(X_check), 0, 1))
+    rows = [{'model': 'original', 'trees': len(_trees(model)) if is_compressible(model) else None,
+             'leaf_dtype': 'float64', 'threshold_bins': 'exact', 'size_kb': original_size / 1024,
+             'size_ratio': 1.0, 'val_mae': original_val_mae, 'test_mae': test_mae, 'test_mae_change': 0.0}]
+    if not is_compressible(model):
+        return None, pd.DataFrame(rows).assign(selected=True)
+
+    order = tree_order(model, X_val[order_rows], y_val[order_rows])
+    candidates = []
+    for n_trees in sorted({max(1, round(fraction * len(order))) for fraction in KEEP_FRACTIONS}, reverse=True):
+        for leaf_dtype in LEAF_DTYPES:
+            for max_bins in THRESHOLD_BINS:
+                compact = CompactForest.from_model(model, order[:n_trees], leaf_dtype=leaf_dtype, max_bins=max_bins)
+                size = len(pickle.dumps(compact, protocol=pickle.HIGHEST_PROTOCOL))
+                compact_test_mae = mean_absolute_error(y_test, np.clip(compact.predict(X_test), 0, 1))
+                rows.append({'model': 'compact', 'trees': n_trees, 'leaf_dtype': leaf_dtype,
+                             'threshold_bins': 'exact' if max_bins is None else str(max_bins),
+                             'size_kb': size / 1024, 'size_ratio': size / original_size,
+                             'val_mae': mean_absolute_error(y_check, np.clip(compact.predict(X_check), 0, 1)),
+                             'test_mae': compact_test_mae, 'test_mae_change': compact_test_mae / test_mae - 1})
+                candidates.append(compact)
+
+    report = pd.DataFrame(rows)
+    # Chosen on validation MAE so the test MAE in the table stays an unbiased estimate
+    acceptable = report.index[(report['model'] == 'compact') &
+                              (report['val_mae'] <= original_val_mae * (1 + MAX_VAL_MAE_INCREASE))]
+    selected = report.loc[acceptable, 'size_kb'].idxmin() if len(acceptable) else 0
+    report['selected'] = report.index == selected
+    return (candidates[selected - 1] if selected else None), report
+
+
+def save_compact_model(compact, path=COMPACT_MODEL_PATH):
+    """Save the compressed model for serving, or remove a stale one when there is none"""
+    if compact is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    joblib.dump(compact, path)
+
+
+def print_compression_report(report):
+    selected = report[report['selected']].iloc[0]
+    original = report.iloc[0]
+    print(report.drop(columns='selected').to_string(index=False, float_format=lambda v: f'{v:.6g}'))
+    if selected['model'] == 'original':
+        print('Keeping the uncompressed model for serving')
+    else:
+        print(f"Compressed model: {selected['trees']} trees, {selected['leaf_dtype']} leaves, "
+              f"{selected['threshold_bins']} threshold bins, {selected['size_kb']:,.0f} KB "
+              f"({selected['size_ratio']:.1%} of {original['size_kb']:,.0f} KB), "
+              f"test MAE {selected['test_mae']:.6f} ({selected['test_mae_change']:+.2%})")
@@ -4,7 +4,7 @@ from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error
 from sklearn.preprocessing import LabelEncoder, RobustScaler
 
 
-def evaluate_models(models, predictions, train, val, test, feature_cols):
+def evaluate_models(models, predictions, train, val, test, feature_cols, context=None):
     model_map = {'Ridge': 'ridge', 'Decision Tree': 'dt', 'Random Forest': 'rf', 'KNN': 'knn', 'Extra Trees': 'et',
                  'Gradient Boosting': 'gb'}
 
@@ -65,4 +65,8 @@ def evaluate_models(models, predictions, train, val, test, feature_cols):
 
     results = {'test_mae': test_mae, 'test_r2': test_r2, 'test_rmse': test_rmse}
 
+    if context is not None:
+        for name, value in [('X_test', X_test), ('y_test', y_test), ('y_test_pred', y_test_pred)]:
+            context.put(name, value)
+
     return best_model, best_name, results
\ No newline at end of file
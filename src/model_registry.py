@@ -0,0 +1,130 @@
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import time
+
+REGISTRY_DIR = 'models/registry'
+POINTER_NAME = 'CURRENT'
+KEEP_VERSIONS = 5
+# Files FlightDelayPredictor needs, and the ones it uses when present
+SERVING_FILES = ['best_model.pkl', 'robust_scaler.pkl', 'label_encoders.pkl', 'feature_columns.pkl',
+                 'features_to_scale.pkl', 'carrier_names.pkl', 'airport_names.pkl', 'ui_lookup_table.pkl',
+                 'dataset_stats.pkl']
+OPTIONAL_FILES = ['compact_model.pkl', 'surrogate_model.pkl', 'drift_reference.pkl', 'route_index.pkl',
+                  'carrier_leaderboard.pkl', 'airport_leaderboard.pkl']
+# The shadow models and their index (src/shadow_scoring.py)
+OPTIONAL_PATTERNS = ['shadow_*.pkl']
+
+
+def pointer_path(registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, POINTER_NAME)
+
+
+def version_dir(version, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, version)
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    """Version the pointer names, or None before anything has been published"""
+    try:
+        with open(pointer_path(registry_dir)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_models_dir(registry_dir=REGISTRY_DIR, fallback='models'):
+    """Directory of the published version, or ``fallback`` (models/ as written by main.py) without a registry"""
+    version = current_version(registry_dir)
+    return version_dir(version, registry_dir) if version else fallback
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path):
+    # Makes renames inside the directory durable; not possible on Windows, where it is skipped
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_pointer(version, registry_dir):
+    tmp = f'{pointer_path(registry_dir)}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer_path(registry_dir))
+    _fsync_dir(registry_dir)
+
+
+def publish(source_dir='models', registry_dir=REGISTRY_DIR, keep=KEEP_VERSIONS):
+    """Copy the serving artifacts in ``source_dir`` into a new version and point the registry at it"""
+    # Files are copied (main.py rewrites models/*.pkl in place) into a hidden staging directory with a manifest of
+    # their sizes and SHA-256 digests, renamed once complete; CURRENT is then replaced atomically, so a reader
+    # sees either the previous version or the complete new one.
+    missing = [name for name in SERVING_FILES if not os.path.exists(os.path.join(source_dir, name))]
+    if missing:
+        raise FileNotFoundError(f'Cannot publish, missing from {source_dir}: {", ".join(missing)}')
+
+    os.makedirs(registry_dir, exist_ok=True)
+    # Seconds and nanoseconds from one clock reading, so versions published in order sort in order
+    now = time.time_ns()
+    version = time.strftime('v%Y%m%d-%H%M%S', time.localtime(now // 1_000_000_000)) + f'-{now % 1_000_000_000:09d}'
+    staging = os.path.join(registry_dir, f'.{version}.tmp')
+    os.makedirs(staging)
+    files = {}
+    for name in SERVING_FILES + OPTIONAL_FILES + sorted(
+            name for pattern in OPTIONAL_PATTERNS for name in fnmatch.filter(os.listdir(source_dir), pattern)):
+        source = os.path.join(source_dir, name)
+        if os.path.exists(source):
+            target = os.path.join(staging, name)
+            shutil.copyfile(source, target)
+            with open(target, 'rb+') as f:
+                os.fsync(f.fileno())
+            files[name] = {'bytes': os.path.getsize(target), 'sha256': _sha256(target)}
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump({'version': version, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'files': files}, f, indent=2)
+    _fsync_dir(staging)
+
+    os.rename(staging, version_dir(version, registry_dir))
+    _write_pointer(version, registry_dir)
+    prune(registry_dir, keep)
+    return version
+
+
+def versions(registry_dir=REGISTRY_DIR):
+    """Published versions, oldest first"""
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(name for name in os.listdir(registry_dir)
+                  if name.startswith('v') and os.path.isdir(os.path.join(registry_dir, name)))
+
+
+def prune(registry_dir=REGISTRY_DIR, keep=KEEP_VERSIONS):
+    # Loaded predictors hold their artifacts in memory, so old versions can be removed once
+    # the pointer has moved on; the current one is always kept
+    current = current_version(registry_dir)
+    for version in versions(registry_dir)[:-keep] if keep else []:
+        if version != current:
+            shutil.rmtree(version_dir(version, registry_dir), ignore_errors=True)
+
+
+def rollback(version, registry_dir=REGISTRY_DIR):
+    """Point the registry back at an earlier published version"""
+    if not os.path.isdir(version_dir(version, registry_dir)):
+        raise FileNotFoundError(f'No published version {version} in {registry_dir}')
+    _write_pointer(version, registry_dir)
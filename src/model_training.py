@@ -1,3 +1,5 @@
+import time
+
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import LabelEncoder, RobustScaler
@@ -6,13 +8,47 @@ from sklearn.linear_model import Ridge
 from sklearn.tree import DecisionTreeRegressor
 from sklearn.neighbors import KNeighborsRegressor
 
+from .profiling import profile_stage
+
+
+def candidate_models():
+    # Unfitted model zoo keyed by display name, with the short key used in the predictions dict
+    return {
+        'Ridge': ('ridge', Ridge(alpha=1.0, random_state=42)),
+        'Decision Tree': ('dt', DecisionTreeRegressor(max_depth=10, min_samples_split=15, min_samples_leaf=8,
+                                                      random_state=42)),
+        'Random Forest': ('rf', RandomForestRegressor(n_estimators=150, max_depth=12, min_samples_split=8,
+                                                      min_samples_leaf=4, random_state=42, n_jobs=-1)),
+        'KNN': ('knn', KNeighborsRegressor(n_neighbors=25, weights='distance', n_jobs=-1)),
+        'Extra Trees': ('et', ExtraTreesRegressor(n_estimators=120, max_depth=10, min_samples_split=12,
+                                                  min_samples_leaf=6, random_state=42, n_jobs=-1)),
+        'Gradient Boosting': ('gb', GradientBoostingRegressor(n_estimators=100, learning_rate=0.05, max_depth=5,
+                                                              min_samples_split=20, min_samples_leaf=10,
+                                                              subsample=0.8, random_state=42)),
+    }
+
+
+EXCLUDED_COLUMNS = ['arr_del15', 'arr_flights', 'flight_volume_percentile', 'capacity_utilization',
+                    'flight_volume_category', 'carrier_name', 'airport_name', 'carrier_airport_combo', 'delay_rate',
+                    'avg_delay_minutes']
+CATEGORICAL_FEATURES = ['carrier', 'airport', 'flight_volume_category', 'operational_stress_level']
+UNSCALED_FEATURES = ['year', 'month', 'holiday_period', 'peak_summer', 'winter_weather_season',
+                     'diversion_occurred'] + CATEGORICAL_FEATURES
+
 
-def train_models(train, val):
-    exclude = ['arr_del15', 'arr_flights', 'flight_volume_percentile', 'capacity_utilization', 'flight_volume_category',
-               'carrier_name', 'airport_name', 'carrier_airport_combo', 'delay_rate', 'avg_delay_minutes']
-    feature_cols = [col for col in train.columns if col not in exclude]
+def feature_columns(frame):
+    return [col for col in frame.columns if col not in EXCLUDED_COLUMNS]
 
-    categorical = ['carrier', 'airport', 'flight_volume_category', 'operational_stress_level']
+
+def scaled_features(frame, feature_cols):
+    return [col for col in feature_cols if
+            col not in UNSCALED_FEATURES and frame[col].dtype in ['int64', 'float64', 'int32', 'float32']]
+
+
+def prepare_training_data(train, val):
+    feature_cols = feature_columns(train)
+
+    categorical = CATEGORICAL_FEATURES
     encoders = {}
     train_enc = train.copy()
     val_enc = val.copy()
@@ -25,10 +61,7 @@ def train_models(train, val):
         mask = val[col].astype(str).isin(enc.classes_)
         val_enc.loc[mask, col] = enc.transform(val[col].astype(str)[mask])
 
-    dont_scale = ['year', 'month', 'holiday_period', 'peak_summer', 'winter_weather_season',
-                  'diversion_occurred'] + categorical
-    features_to_scale = [col for col in feature_cols if
-                         col not in dont_scale and train[col].dtype in ['int64', 'float64', 'int32', 'float32']]
+    features_to_scale = scaled_features(train, feature_cols)
 
     scaler = RobustScaler()
     train_enc[features_to_scale] = scaler.fit_transform(train_enc[features_to_scale])
@@ -43,52 +76,50 @@ def train_models(train, val):
     X_train = train_enc[feature_cols]
     X_val = val_enc[feature_cols]
 
+    return X_train, y_train, X_val, y_val, feature_cols, encoders, scaler, features_to_scale
+
+
+def delay_rate(frame):
+    return np.where(frame['arr_flights'] > 0, frame['arr_del15'] / frame['arr_flights'], 0)
+
+
+def encode_features(frame, encoders, scaler, feature_cols, features_to_scale):
+    # Encodes and scales new rows with already-fitted encoders and scaler; unseen categories become -1
+    encoded = frame.copy()
+    for col, enc in encoders.items():
+        encoded[col] = pd.Series(-1, index=frame.index)
+        mask = frame[col].astype(str).isin(enc.classes_)
+        encoded.loc[mask, col] = enc.transform(frame[col].astype(str)[mask])
+    encoded[features_to_scale] = scaler.transform(encoded[features_to_scale])
+    return encoded[feature_cols]
+
+
+def fit_model(name, X_train, y_train, X_val):
+    # Fits one model of the zoo and returns it with its clipped train/val predictions and fit seconds
+    key, model = candidate_models()[name]
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    predictions = {f'{key}_train': np.clip(model.predict(X_train), 0, 1),
+                   f'{key}_val': np.clip(model.predict(X_val), 0, 1)}
+    return model, predictions, fit_seconds
+
+
+def train_models(train, val, context=None, profiler=None):
+    X_train, y_train, X_val, y_val, feature_cols, encoders, scaler, features_to_scale = prepare_training_data(train,
+                                                                                                             val)
+
+    if context is not None:
+        for name, value in [('X_train', X_train), ('y_train', y_train), ('X_val', X_val), ('y_val', y_val)]:
+            context.put(name, value)
+
     models = {}
     predictions = {}
 
-    print('Training Ridge...')
-    ridge = Ridge(alpha=1.0, random_state=42)
-    ridge.fit(X_train, y_train)
-    models['Ridge'] = ridge
-    predictions['ridge_train'] = np.clip(ridge.predict(X_train), 0, 1)
-    predictions['ridge_val'] = np.clip(ridge.predict(X_val), 0, 1)
-
-    print('Training Decision Tree...')
-    dt = DecisionTreeRegressor(max_depth=10, min_samples_split=15, min_samples_leaf=8, random_state=42)
-    dt.fit(X_train, y_train)
-    models['Decision Tree'] = dt
-    predictions['dt_train'] = np.clip(dt.predict(X_train), 0, 1)
-    predictions['dt_val'] = np.clip(dt.predict(X_val), 0, 1)
-
-    print('Training Random Forest...')
-    rf = RandomForestRegressor(n_estimators=150, max_depth=12, min_samples_split=8, min_samples_leaf=4, random_state=42,
-                               n_jobs=-1)
-    rf.fit(X_train, y_train)
-    models['Random Forest'] = rf
-    predictions['rf_train'] = np.clip(rf.predict(X_train), 0, 1)
-    predictions['rf_val'] = np.clip(rf.predict(X_val), 0, 1)
-
-    print('Training KNN...')
-    knn = KNeighborsRegressor(n_neighbors=25, weights='distance', n_jobs=-1)
-    knn.fit(X_train, y_train)
-    models['KNN'] = knn
-    predictions['knn_train'] = np.clip(knn.predict(X_train), 0, 1)
-    predictions['knn_val'] = np.clip(knn.predict(X_val), 0, 1)
-
-    print('Training Extra Trees...')
-    et = ExtraTreesRegressor(n_estimators=120, max_depth=10, min_samples_split=12, min_samples_leaf=6, random_state=42,
-                             n_jobs=-1)
-    et.fit(X_train, y_train)
-    models['Extra Trees'] = et
-    predictions['et_train'] = np.clip(et.predict(X_train), 0, 1)
-    predictions['et_val'] = np.clip(et.predict(X_val), 0, 1)
-
-    print('Training Gradient Boosting...')
-    gb = GradientBoostingRegressor(n_estimators=100, learning_rate=0.05, max_depth=5, min_samples_split=20,
-                                   min_samples_leaf=10, subsample=0.8, random_state=42)
-    gb.fit(X_train, y_train)
-    models['Gradient Boosting'] = gb
-    predictions['gb_train'] = np.clip(gb.predict(X_train), 0, 1)
-    predictions['gb_val'] = np.clip(gb.predict(X_val), 0, 1)
-
-    return models, predictions, feature_cols, encoders, scaler, features_to_scale
\ No newline at end of file
+    for name in candidate_models():
+        print(f'Training {name}...')
+        with profile_stage(profiler, f'train:{name}', rows=len(X_train)):
+            models[name], model_predictions, _ = fit_model(name, X_train, y_train, X_val)
+            predictions.update(model_predictions)
+
+    return models, predictions, feature_cols, encoders, scaler, features_to_scale
@@ -0,0 +1,207 @@
+import glob
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import joblib
+import pandas as pd
+
+from .profiling import profile_stage
+
+
+def output_rows(value):
+    # Rows of a stage output: a frame's length, or the total over the frames in a dict or tuple
+    if hasattr(value, 'shape') and hasattr(value, '__len__'):
+        return len(value)
+    members = value.values() if isinstance(value, dict) else value if isinstance(value, (list, tuple)) else []
+    frames = [len(member) for member in members if isinstance(member, pd.DataFrame)]
+    return sum(frames) if frames else None
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Stage:
+    """One step of the pipeline: ``func(*dep_outputs, **params)``"""
+    # ``code`` lists modules or functions the stage depends on beyond ``func``, ``files`` the input files
+    # it reads and ``outputs`` the files it writes (a cached stage reruns if one is missing); stages with
+    # ``cache=False`` are recomputed whenever a downstream stage needs them
+
+    def __init__(self, name, func, deps=(), params=None, code=(), files=(), outputs=(), cache=True):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.params = dict(params or {})
+        self.code = list(code)
+        self.files = list(files)
+        self.outputs = list(outputs)
+        self.cache = cache
+
+    def fingerprint(self):
+        digest = hashlib.sha256(inspect.getsource(self.func).encode())
+        for obj in self.code:
+            digest.update(inspect.getsource(obj).encode())
+        for path in self.files:
+            digest.update(file_digest(path).encode())
+        digest.update(json.dumps(self.params, sort_keys=True, default=repr).encode())
+        return digest.hexdigest()
+
+
+class Pipeline:
+    """Runs a DAG of stages concurrently with a content-addressed, resumable on-disk cache"""
+    # A stage's key hashes its code, parameters and input files with its dependencies' keys, so a change
+    # invalidates the stage and everything downstream; outputs are cached as soon as each stage finishes
+
+    def __init__(self, stages, cache_dir='.pipeline_cache', max_workers=4, profiler=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.profiler = profiler
+        self.events = []
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(name, path):
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}' (required by {path[-1] if path else 'target'})")
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Cycle in pipeline: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def keys(self, targets=None):
+        # Keys are only computed for the targets and their ancestors, so input files of stages
+        # that are not requested do not have to exist
+        keys = {}
+
+        def key(name):
+            if name not in keys:
+                stage = self.stages[name]
+                digest = hashlib.sha256(f'{name}:{stage.fingerprint()}'.encode())
+                for dep in stage.deps:
+                    digest.update(key(dep).encode())
+                keys[name] = digest.hexdigest()
+            return keys[name]
+
+        for name in targets or self.order:
+            key(name)
+        return keys
+
+    def _cache_path(self, name, key):
+        return os.path.join(self.cache_dir, f"{re.sub(r'[^A-Za-z0-9_.]', '_', name)}-{key}.pkl")
+
+    def _is_fresh(self, name, key):
+        stage = self.stages[name]
+        return (stage.cache and os.path.exists(self._cache_path(name, key))
+                and all(os.path.exists(path) for path in stage.outputs))
+
+    def plan(self, targets=None, force=()):
+        """Return {stage: 'run' | 'load'} for the stages needed to produce ``targets``"""
+        targets = list(targets or self.order)
+        force = set(self.order) if 'all' in force else set(force)
+        for name in list(targets) + list(force):
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'")
+        # A forced stage also reruns everything downstream of it
+        for name in self.order:
+            if any(dep in force for dep in self.stages[name].deps):
+                force.add(name)
+        keys = self.keys(targets)
+        plan = {}
+
+        def visit(name):
+            if plan.get(name) == 'run':
+                return
+            if name not in force and self._is_fresh(name, keys[name]):
+                plan[name] = 'load'
+                return
+            plan[name] = 'run'
+            for dep in self.stages[name].deps:
+                visit(dep)
+
+        for name in targets:
+            visit(name)
+        return plan, keys
+
+    def run(self, targets=None, force=()):
+        plan, keys = self.plan(targets, force)
+        print(f"Pipeline plan: {sum(a == 'run' for a in plan.values())} to run, "
+              f"{sum(a == 'load' for a in plan.values())} cached, {len(self.order) - len(plan)} skipped")
+
+        values, running, errors = {}, {}, []
+        pending = [name for name in self.order if name in plan]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    if plan[name] == 'load' or all(dep in values for dep in self.stages[name].deps):
+                        pending.remove(name)
+                        task = self._load if plan[name] == 'load' else self._execute
+                        running[pool.submit(task, name, keys[name], values)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        values[name] = future.result()
+                    except Exception as exc:
+                        print(f'[pipeline] {name} failed: {exc!r}')
+                        errors.append(exc)
+                        # Let running stages finish and cache their outputs, but start nothing new
+                        pending = []
+        if errors:
+            raise errors[0]
+        return values
+
+    def _load(self, name, key, values):
+        start = time.perf_counter()
+        value = joblib.load(self._cache_path(name, key))
+        elapsed = time.perf_counter() - start
+        self.events.append({'artifact': name, 'status': 'hit', 'seconds': elapsed, 'key': key})
+        print(f'[pipeline] {name}: cached ({elapsed:.2f}s to load)')
+        return value
+
+    def _execute(self, name, key, values):
+        stage = self.stages[name]
+        print(f'[pipeline] {name}: running')
+        start = time.perf_counter()
+        with profile_stage(self.profiler, name) as record:
+            value = stage.func(*[values[dep] for dep in stage.deps], **stage.params)
+            record['rows'] = output_rows(value)
+        elapsed = time.perf_counter() - start
+        if stage.cache:
+            self._store(name, key, value)
+        self.events.append({'artifact': name, 'status': 'miss', 'seconds': elapsed, 'key': key})
+        print(f'[pipeline] {name}: done in {elapsed:.2f}s')
+        return value
+
+    def _store(self, name, key, value):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(name, key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+        # Only the latest output of each stage is kept
+        for stale in glob.glob(self._cache_path(name, '*')):
+            if stale != path:
+                os.remove(stale)
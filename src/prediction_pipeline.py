@@ -1,44 +1,267 @@
+import os
+import threading
+import time
 import joblib
 import pandas as pd
 import numpy as np
 
+from .lookup_table import CompactLookup
+from .model_registry import REGISTRY_DIR, current_version, version_dir
+from .model_compression import COMPACT_MODEL_PATH
+from .distillation import SURROGATE_PATH
+from .drift_monitor import DRIFT_REFERENCE_PATH, DriftMonitor
+from .shadow_scoring import ShadowScorer, load_shadow_models
+from .telemetry import PredictorTelemetry
+from .uncertainty import INTERVAL_LEVEL, observed_interval, observed_interval_one, tree_ensemble, tree_interval
+from .utils import build_route_index
+
+# What scores routes missing from the lookup: the trained model, or the distilled surrogate
+MISS_MODELS = ('model', 'surrogate')
+# Default arr_flights values of a scenario grid: log-spaced from 10 to 2000 flights a month
+SCENARIO_FLIGHTS = np.unique(np.round(np.geomspace(10, 2000, 30))).astype(int)
+DELAY_CAUSE_DEFAULTS = {'avg_carrier_pct': 37.48, 'avg_weather_pct': 5.65, 'avg_nas_pct': 19.42,
+                        'avg_security_pct': 0.19, 'avg_late_aircraft_pct': 34.60}
+
+
+def risk_level(delay_prob):
+    return 'Very Low' if delay_prob < 0.15 else 'Low' if delay_prob < 0.25 else 'Moderate' if delay_prob < 0.35 else 'High'
+
 
 class FlightDelayPredictor:
-    def __init__(self):
-        self.model = joblib.load('models/best_model.pkl')
-        self.scaler = joblib.load('models/robust_scaler.pkl')
-        self.encoders = joblib.load('models/label_encoders.pkl')
-        self.feature_cols = joblib.load('models/feature_columns.pkl')
-        self.features_to_scale = joblib.load('models/features_to_scale.pkl')
-        self.carrier_names = joblib.load('models/carrier_names.pkl')
-        self.airport_names = joblib.load('models/airport_names.pkl')
-        self.lookup = joblib.load('models/ui_lookup_table.pkl')
-        self.stats = joblib.load('models/dataset_stats.pkl')
+    def __init__(self, miss_model='model', monitor_drift=False, telemetry=False, models_dir=None, shadow_models=None,
+                 registry_dir=REGISTRY_DIR):
+        if miss_model not in MISS_MODELS:
+            raise ValueError(f'Unknown miss model: {miss_model}')
+        # The version published in the model registry, or models/ itself when nothing has been published
+        if models_dir is None:
+            self.version = current_version(registry_dir)
+            models_dir = version_dir(self.version, registry_dir) if self.version else 'models'
+        else:
+            self.version = None
+        self.models_dir = models_dir
+
+        compact_path = self._path(COMPACT_MODEL_PATH)
+        if os.path.exists(compact_path):
+            # Compressed copy of best_model.pkl written by main.py; smaller and faster to load
+            self.model = joblib.load(compact_path)
+        else:
+            self.model = joblib.load(self._path('best_model.pkl'))
+        self.scaler = joblib.load(self._path('robust_scaler.pkl'))
+        self.encoders = joblib.load(self._path('label_encoders.pkl'))
+        self.feature_cols = joblib.load(self._path('feature_columns.pkl'))
+        self.features_to_scale = joblib.load(self._path('features_to_scale.pkl'))
+        self.carrier_names = joblib.load(self._path('carrier_names.pkl'))
+        self.airport_names = joblib.load(self._path('airport_names.pkl'))
+        self.lookup = joblib.load(self._path('ui_lookup_table.pkl'))
+        if isinstance(self.lookup, pd.DataFrame):
+            # Artifacts saved before the lookup was stored in compact form
+            self.lookup = CompactLookup.from_frame(self.lookup)
+        self.stats = joblib.load(self._path('dataset_stats.pkl'))
+        # Per-tree predictions of the model for prediction intervals (None if it has no separate trees)
+        self.interval_trees = tree_ensemble(self.model)
+
+        self.surrogate = None
+        if miss_model == 'surrogate':
+            if os.path.exists(self._path(SURROGATE_PATH)):
+                self.surrogate = joblib.load(self._path(SURROGATE_PATH))
+            else:
+                print(f'{self._path(SURROGATE_PATH)} not found (run main.py), scoring misses with the model')
+
+        # Histograms of the queries scored, compared with the training distributions
+        self.monitor = None
+        if monitor_drift:
+            if os.path.exists(self._path(DRIFT_REFERENCE_PATH)):
+                self.monitor = DriftMonitor(joblib.load(self._path(DRIFT_REFERENCE_PATH)))
+            else:
+                print(f'{self._path(DRIFT_REFERENCE_PATH)} not found (run main.py), drift monitoring disabled')
+
+        # Which path each prediction takes and how long it takes, see telemetry_stats()
+        self.telemetry = PredictorTelemetry() if telemetry else None
+
+        # Other fitted models ('all' or a list of names or keys) scored in the background on
+        # every batch the model scores, and compared with what was served, see shadow_report()
+        self.shadow = None
+        if shadow_models:
+            models = load_shadow_models(self.models_dir, shadow_models)
+            if models:
+                self.shadow = ShadowScorer(models)
+            else:
+                print(f'No shadow models matching {shadow_models} in {self.models_dir} (run main.py)')
+
+        self.carrier_avg = self.lookup.carrier_means()
+        self.airport_avg = self.lookup.airport_means()
+
+        if os.path.exists(self._path('route_index.pkl')):
+            self.route_index = joblib.load(self._path('route_index.pkl'))
+        else:
+            self.route_index = build_route_index(self.lookup.to_frame())
+        self._carrier_pos = {c: i for i, c in enumerate(self.route_index['carriers'].tolist())}
+        self._airport_pos = {a: i for i, a in enumerate(self.route_index['airports'].tolist())}
+
+    def _path(self, name):
+        # Artifact paths are kept as 'models/<file>' constants; only the file name is used here
+        return os.path.join(self.models_dir, os.path.basename(name))
+
+    def get_carrier_airports(self, carrier):
+        i = self._carrier_pos.get(carrier)
+        if i is None:
+            return []
+        offsets = self.route_index['carrier_offsets']
+        neighbours = self.route_index['carrier_airports'][offsets[i]:offsets[i + 1]]
+        return self.route_index['airports'][neighbours].tolist()
+
+    def get_airport_carriers(self, airport):
+        i = self._airport_pos.get(airport)
+        if i is None:
+            return []
+        offsets = self.route_index['airport_offsets']
+        neighbours = self.route_index['airport_carriers'][offsets[i]:offsets[i + 1]]
+        return self.route_index['carriers'][neighbours].tolist()
 
     def predict(self, carrier, airport, month, arr_flights=100):
-        lookup_match = self.lookup[
-            (self.lookup['carrier'] == carrier) & (self.lookup['airport'] == airport) & (self.lookup['month'] == month)]
+        start = time.perf_counter_ns()
+        pos = self.lookup.get(carrier, airport, month)
 
-        if len(lookup_match) > 0:
-            delay_prob = float(lookup_match['delay_probability'].iloc[0])
-            avg_delay = float(lookup_match['avg_delay_minutes'].iloc[0])
+        low = high = float('nan')
+        interval_source = None
+        if pos >= 0:
+            delay_prob = float(self.lookup.delay_probability(pos))
+            avg_delay = float(self.lookup.avg_delay_minutes[pos])
+            low, high = observed_interval_one(float(self.lookup.values['arr_del15'][pos]),
+                                              float(self.lookup.values['arr_flights'][pos]))
+            path, interval_source = 'lookup', 'observed'
+        elif self.surrogate is not None and 1 <= month <= 12:
+            delay_prob = min(max(self.surrogate.predict_one(carrier, airport, month, arr_flights), 0.0), 1.0)
+            avg_delay = self.stats['avg_delay_minutes']
+            path = 'surrogate'
         else:
             input_data = self._build_features(carrier, airport, month, arr_flights)
-            X = input_data[self.feature_cols]
-            delay_prob = float(np.clip(self.model.predict(X)[0], 0, 1))
+            prediction, lower, upper = self._score_model(input_data[self.feature_cols])
+            delay_prob, low, high = float(prediction[0]), float(lower[0]), float(upper[0])
             avg_delay = self.stats['avg_delay_minutes']
+            path = 'model'
+            interval_source = 'trees' if self.interval_trees is not None else None
 
-        risk = 'Very Low' if delay_prob < 0.15 else 'Low' if delay_prob < 0.25 else 'Moderate' if delay_prob < 0.35 else 'High'
-
+        if self.telemetry is not None:
+            self.telemetry.record(path, time.perf_counter_ns() - start,
+                                  None if pos >= 0 else (carrier, airport, int(month)))
+        if self.monitor is not None:
+            self.monitor.record(carrier, airport, month, arr_flights, delay_prob, pos >= 0)
         return {'carrier': self.carrier_names.get(carrier, carrier),
                 'airport': self.airport_names.get(airport, airport), 'month': month, 'delay_probability': delay_prob,
-                'avg_delay_minutes': avg_delay, 'risk_level': risk, 'expected_delays_per_100': int(delay_prob * 100)}
+                'avg_delay_minutes': avg_delay, 'risk_level': risk_level(delay_prob),
+                'expected_delays_per_100': int(delay_prob * 100), 'interval_low': low, 'interval_high': high,
+                'interval_level': INTERVAL_LEVEL, 'interval_source': interval_source}
+
+    def predict_batch(self, carriers, airports, months, arr_flights=100):
+        start = time.perf_counter_ns()
+        # Scalars broadcast against sequences, so a sweep only varies the argument it sweeps
+        carriers, airports, months, arr_flights = np.broadcast_arrays(
+            np.asarray(carriers, dtype=object), np.asarray(airports, dtype=object), np.asarray(months, dtype='int64'),
+            np.asarray(arr_flights))
+        positions = self.lookup.find(carriers, airports, months)
+        miss = positions < 0
+
+        delay_prob = self.lookup.delay_probability(positions)
+        avg_delay = self.lookup.avg_delay_minutes[positions].astype(float)
+        low, high = observed_interval(self.lookup.values['arr_del15'][positions],
+                                      self.lookup.values['arr_flights'][positions])
+        # Misses go to the surrogate when there is one, except months outside 1-12 which it has no terms for
+        surrogate = miss & self.surrogate.covers(months) if self.surrogate is not None else np.zeros_like(miss)
+        modelled = miss & ~surrogate
+        if surrogate.any():
+            delay_prob[surrogate] = np.clip(self.surrogate.predict(carriers[surrogate], airports[surrogate],
+                                                                   months[surrogate], arr_flights[surrogate]), 0, 1)
+            low[surrogate] = high[surrogate] = np.nan
+        if modelled.any():
+            input_data = self._build_features(carriers[modelled], airports[modelled], months[modelled],
+                                              arr_flights[modelled])
+            delay_prob[modelled], low[modelled], high[modelled] = self._score_model(input_data[self.feature_cols])
+        avg_delay[miss] = self.stats['avg_delay_minutes']
+
+        if self.telemetry is not None:
+            self.telemetry.record_batch(time.perf_counter_ns() - start, int((~miss).sum()),
+                                        zip(carriers[miss].tolist(), airports[miss].tolist(), months[miss].tolist()))
+        if self.monitor is not None:
+            self.monitor.record_batch(carriers, airports, months, arr_flights, delay_prob, ~miss)
+        return pd.DataFrame({'carrier': [self.carrier_names.get(c, c) for c in carriers],
+                             'airport': [self.airport_names.get(a, a) for a in airports],
+                             'month': months, 'delay_probability': delay_prob,
+                             'avg_delay_minutes': avg_delay,
+                             'risk_level': [risk_level(p) for p in delay_prob],
+                             'expected_delays_per_100': (delay_prob * 100).astype(int),
+                             'interval_low': low, 'interval_high': high})
+
+    def _score_model(self, X):
+        """Clipped model predictions for feature rows ``X`` and the INTERVAL_LEVEL interval across its trees"""
+        trees = self.interval_trees
+        if trees is None:
+            prediction = np.clip(self.model.predict(X), 0, 1)
+            low = high = np.full(len(prediction), np.nan)
+        else:
+            # One traversal gives every tree's prediction; for the compressed model their mean is the prediction
+            values = trees.leaf_values(X)
+            prediction = np.clip(trees.predict_from_leaves(values) if trees is self.model else self.model.predict(X),
+                                 0, 1)
+            low, high = tree_interval(values)
+        if self.shadow is not None:
+            self.shadow.submit(X, prediction)
+        return prediction, low, high
+
+    def shadow_report(self):
+        """Divergence of each shadow model from the served model predictions, or None without shadows"""
+        # Shadows only see the rows the model scores: lookup misses and scenario grids. Lookup hits are served
+        # without the model, and with miss_model='surrogate' no query reaches it, so the report samples model traffic.
+        return self.shadow.report() if self.shadow is not None else None
+
+    def telemetry_stats(self, top=20):
+        """Lookup hit ratio, latency percentiles per path and the most frequently missed keys"""
+        return self.telemetry.stats(top=top) if self.telemetry is not None else None
+
+    def scenario_grid(self, carrier, airport, arr_flights=None, months=None):
+        """Modelled delay probability of one route over every (month, arr_flights) pair, in one batch"""
+        # The lookup has one rate per route-month whatever the volume, so every cell is scored by the model (or
+        # surrogate, if every month is 1-12); rows carry the interval across trees and the route-month's historical
+        # rate (NaN if missing).
+        arr_flights = SCENARIO_FLIGHTS if arr_flights is None else np.asarray(arr_flights)
+        months = np.arange(1, 13) if months is None else np.asarray(months, dtype='int64')
+        month_grid, flight_grid = (grid.ravel() for grid in np.meshgrid(months, arr_flights, indexing='ij'))
+
+        if self.surrogate is not None and self.surrogate.covers(months).all():
+            prediction = np.clip(self.surrogate.predict(np.full(len(month_grid), carrier, dtype=object),
+                                                        np.full(len(month_grid), airport, dtype=object),
+                                                        month_grid, flight_grid), 0, 1)
+            low = high = np.full(len(prediction), np.nan)
+        else:
+            input_data = self._build_features(carrier, airport, month_grid, flight_grid)
+            prediction, low, high = self._score_model(input_data[self.feature_cols])
+
+        positions = self.lookup.find(np.full(len(months), carrier, dtype=object),
+                                     np.full(len(months), airport, dtype=object), months)
+        historical = np.where(positions >= 0, self.lookup.delay_probability(positions), np.nan)
+        return pd.DataFrame({'month': month_grid, 'arr_flights': flight_grid, 'delay_probability': prediction,
+                             'interval_low': low, 'interval_high': high,
+                             'historical_delay_probability': np.repeat(historical, len(arr_flights))})
+
+    def predict_months(self, carrier, airport, arr_flights=100):
+        return self.predict_batch(carrier, airport, np.arange(1, 13), arr_flights)
+
+    def predict_carriers(self, carriers, airport, month, arr_flights=100):
+        return self.predict_batch(list(carriers), airport, month, arr_flights)
+
+    def predict_airports(self, carrier, airports, month, arr_flights=100):
+        return self.predict_batch(carrier, list(airports), month, arr_flights)
 
     def _build_features(self, carrier, airport, month, arr_flights):
+        # Accepts scalars for a single query or equal-length arrays for a batch
+        carrier, airport, month, arr_flights = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(carrier, dtype=object)), np.atleast_1d(np.asarray(airport, dtype=object)),
+            np.atleast_1d(month), np.atleast_1d(arr_flights))
         data = pd.DataFrame(
-            {'year': [2023], 'month': [month], 'carrier': [carrier], 'airport': [airport], 'arr_flights': [arr_flights],
-             'arr_cancelled': [int(arr_flights * 0.02)], 'arr_diverted': [int(arr_flights * 0.003)],
-             'arr_delay': [int(arr_flights * 12)]})
+            {'year': 2023, 'month': month, 'carrier': carrier, 'airport': airport, 'arr_flights': arr_flights,
+             'arr_cancelled': np.trunc(arr_flights * 0.02).astype(int),
+             'arr_diverted': np.trunc(arr_flights * 0.003).astype(int),
+             'arr_delay': np.trunc(arr_flights * 12).astype(int)})
 
         # Create log features
         data['arr_flights_log'] = np.log1p(data['arr_flights'])
@@ -63,19 +286,15 @@ class FlightDelayPredictor:
                      'carrier_issues_occurred', 'security_incident_occurred']:
             data[flag] = 0
 
-        carrier_avg = self.lookup[self.lookup['carrier'] == carrier]['delay_probability'].mean()
-        airport_avg = self.lookup[self.lookup['airport'] == airport]['delay_probability'].mean()
-        seasonal_avg = self.lookup[(self.lookup['carrier'] == carrier) & (self.lookup['airport'] == airport) & (
-                    self.lookup['month'] == month)]['delay_probability'].mean()
+        positions = self.lookup.find(carrier, airport, month)
+        seasonal = np.where(positions >= 0, self.lookup.delay_probability(positions), np.nan)
 
-        data['carrier_historical_delay_rate'] = carrier_avg if not pd.isna(carrier_avg) else 0.196
-        data['airport_historical_delay_rate'] = airport_avg if not pd.isna(airport_avg) else 0.193
-        data['seasonal_delay_rate'] = seasonal_avg if not pd.isna(seasonal_avg) else 0.199
+        data['carrier_historical_delay_rate'] = data['carrier'].map(self.carrier_avg).fillna(0.196)
+        data['airport_historical_delay_rate'] = data['airport'].map(self.airport_avg).fillna(0.193)
+        data['seasonal_delay_rate'] = pd.Series(seasonal, index=data.index).fillna(0.199)
 
-        for col in ['avg_carrier_pct', 'avg_weather_pct', 'avg_nas_pct', 'avg_security_pct', 'avg_late_aircraft_pct']:
-            data[col] = [37.48, 5.65, 19.42, 0.19, 34.60][
-                ['avg_carrier_pct', 'avg_weather_pct', 'avg_nas_pct', 'avg_security_pct',
-                 'avg_late_aircraft_pct'].index(col)]
+        for col, value in DELAY_CAUSE_DEFAULTS.items():
+            data[col] = value
 
         data['carrier_peak_risk'] = data['carrier_historical_delay_rate'] * data['peak_summer']
         data['carrier_winter_risk'] = data['carrier_historical_delay_rate'] * data['winter_weather_season']
@@ -83,12 +302,59 @@ class FlightDelayPredictor:
 
         for col in ['carrier', 'airport', 'operational_stress_level']:
             if col in self.encoders:
-                if data[col].iloc[0] in self.encoders[col].classes_:
-                    data[col] = self.encoders[col].transform([data[col].iloc[0]])[0]
-                else:
-                    data[col] = -1
+                values = data[col].astype(str)
+                known = values.isin(self.encoders[col].classes_).to_numpy()
+                encoded = np.full(len(data), -1)
+                if known.any():
+                    encoded[known] = self.encoders[col].transform(values[known])
+                data[col] = encoded
 
         cols_to_scale = [col for col in self.features_to_scale if col in data.columns]
         data[cols_to_scale] = self.scaler.transform(data[cols_to_scale])
 
-        return data
\ No newline at end of file
+        return data
+
+
+class ReloadingPredictor:
+    """FlightDelayPredictor that follows the model registry"""
+    # A background thread checks the CURRENT pointer every interval seconds, loads a new version on that thread
+    # and swaps it in with one assignment, so calls never wait for a load; if loading fails the current predictor
+    # keeps serving. on_load(new, old) is called after every swap (old=None for the first load).
+
+    def __init__(self, interval=30, on_load=None, registry_dir=REGISTRY_DIR, **kwargs):
+        self._kwargs = kwargs
+        self._on_load = on_load
+        self._registry_dir = registry_dir
+        self.current = FlightDelayPredictor(registry_dir=registry_dir, **kwargs)
+        if on_load is not None:
+            on_load(self.current, None)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, args=(interval,), name='model-reloader', daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['current'], name)
+
+    def reload_if_changed(self):
+        """Load and switch to the published version if it differs from the one being served"""
+        version = current_version(self._registry_dir)
+        if version is None or version == self.current.version:
+            return False
+        predictor = FlightDelayPredictor(models_dir=version_dir(version, self._registry_dir), **self._kwargs)
+        predictor.version = version
+        old, self.current = self.current, predictor
+        print(f'Switched to model version {version}')
+        if self._on_load is not None:
+            self._on_load(predictor, old)
+        return True
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                print(f'Model reload failed, still serving {self.current.version}: {e!r}')
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
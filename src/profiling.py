@@ -0,0 +1,86 @@
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """High-water mark of this process's resident memory in MB, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageProfiler:
+    """Wall time, thread CPU time and rows of each stage: ``with profiler.stage('train', rows=n) as record:``"""
+
+    def __init__(self, metadata=None):
+        self.run_id = time.strftime('%Y%m%d-%H%M%S')
+        self.started_at = time.time()
+        self.metadata = dict(metadata or {})
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        record = {'stage': name, 'rows': rows}
+        # Stages run concurrently, so CPU time is that of the stage's own thread (work it hands to
+        # pools or child processes is not counted). peak_rss_mb is the process high-water mark when
+        # the stage ended: it includes memory of earlier and concurrent stages and never decreases
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.thread_time() - cpu_start
+            record['peak_rss_mb'] = peak_rss_mb()
+            self.stages.append(record)
+
+    def profiled(self, name):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def to_dict(self, cache_events=None):
+        return {'run_id': self.run_id, 'started_at': self.started_at, 'python': platform.python_version(),
+                'platform': platform.platform(), 'metadata': self.metadata, 'peak_rss_mb': peak_rss_mb(),
+                'stages': self.stages, 'cache_events': cache_events or []}
+
+    def write_json(self, directory='runs', cache_events=None):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'run-{self.run_id}.json')
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(cache_events), f, indent=2, default=float)
+        return path
+
+    def summary(self):
+        lines = [f"{'stage':<28}{'rows':>10}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}"]
+        for record in self.stages:
+            rows = '' if record['rows'] is None else f"{record['rows']:,}"
+            peak = '' if record.get('peak_rss_mb') is None else f"{record['peak_rss_mb']:.0f}"
+            lines.append(f"{record['stage']:<28}{rows:>10}{record['wall_seconds']:>10.2f}"
+                         f"{record['cpu_seconds']:>10.2f}{peak:>10}")
+        peak = peak_rss_mb()
+        if peak is not None:
+            lines.append(f'Peak RSS of the run: {peak:.0f} MB')
+        return '\n'.join(lines)
+
+
+def profile_stage(profiler, name, rows=None):
+    """``profiler.stage(...)`` when a profiler is given, otherwise a no-op context"""
+    if profiler is None:
+        return nullcontext({'stage': name, 'rows': rows})
+    return profiler.stage(name, rows=rows)
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+
+def _factorize(column):
+    # Small-range integer keys (month, year) are coded by offset instead of hashing
+    values = column.to_numpy()
+    if pd.api.types.is_integer_dtype(column.dtype) and len(values):
+        low, high = values.min(), values.max()
+        if high - low < 100000:
+            present = np.flatnonzero(np.bincount(values - low, minlength=high - low + 1))
+            remap = np.full(high - low + 1, -1, dtype=np.intp)
+            remap[present] = np.arange(len(present))
+            return remap[values - low], pd.Index(present + low, name=column.name)
+
+    codes, uniques = pd.factorize(column, sort=True)
+    return codes, pd.Index(uniques, name=column.name)
+
+
+class GroupingSetsAggregator:
+    """Groupby rollups accumulated frame by frame, matching pd.concat(frames).groupby(key).agg(spec)"""
+    # Count, sum and sum of squares per group are additive, so partial results merge by index
+    # alignment; a key of None is the grand total
+
+    def __init__(self, keys, measures):
+        self.keys = list(keys)
+        # measures maps each column to the statistics that will be requested for it; the
+        # sum of squares is only accumulated for columns that need a standard deviation
+        self.measures = {col: [stats] if isinstance(stats, str) else list(stats) for col, stats in measures.items()}
+        self.n_rows = 0
+        self._partials = {key: None for key in self.keys}
+        self._dtypes = {}
+        # Squares are taken around a per-measure shift so the variance does not lose precision
+        # to cancellation when a measure's mean is large compared to its spread
+        self._shift = {}
+
+    def update(self, frame, extra=None):
+        extra = extra or {}
+        measures = {}
+        for col, stats in self.measures.items():
+            values = np.asarray(extra[col] if col in extra else frame[col], dtype=float)
+            if col not in extra:
+                self._dtypes.setdefault(col, frame[col].dtype)
+            valid = ~np.isnan(values)
+            squares = None
+            if 'std' in stats:
+                if col not in self._shift and valid.any():
+                    self._shift[col] = float(values[valid][0])
+                shifted = values - self._shift.get(col, 0.0)
+                squares = np.where(valid, shifted * shifted, 0.0)
+            measures[col] = (None if valid.all() else valid, np.where(valid, values, 0.0), squares)
+        self.n_rows += len(frame)
+
+        for key in self.keys:
+            if key is None:
+                codes, uniques = np.zeros(len(frame), dtype=np.intp), pd.Index(['all'])
+            else:
+                codes, uniques = _factorize(frame[key])
+            n_groups = len(uniques)
+
+            grouped = None if key is None or (codes >= 0).all() else codes >= 0
+            group = codes if grouped is None else codes[grouped]
+            size = np.bincount(group, minlength=n_groups)
+
+            stats = {('size', ''): size}
+            for col, (valid, values, squares) in measures.items():
+                if grouped is not None:
+                    values = values[grouped]
+                    valid = None if valid is None else valid[grouped]
+                    squares = None if squares is None else squares[grouped]
+                stats[(col, 'n')] = size if valid is None else np.bincount(group[valid], minlength=n_groups)
+                stats[(col, 'sum')] = np.bincount(group, weights=values, minlength=n_groups)
+                if squares is not None:
+                    stats[(col, 'sumsq')] = np.bincount(group, weights=squares, minlength=n_groups)
+
+            partial = pd.DataFrame(stats, index=uniques)
+            if self._partials[key] is not None:
+                partial = self._partials[key].add(partial, fill_value=0)
+            self._partials[key] = partial
+
+        return self
+
+    def _statistic(self, partial, col, stat):
+        if stat == 'size':
+            return partial[('size', '')].astype('int64')
+        if stat not in self.measures[col]:
+            raise ValueError(f'{stat} of {col} was not declared when the aggregator was created')
+
+        n, total = partial[(col, 'n')], partial[(col, 'sum')]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if stat == 'count':
+                return n.astype('int64')
+            if stat == 'sum':
+                return total.astype('int64') if pd.api.types.is_integer_dtype(self._dtypes.get(col)) else total
+            if stat == 'mean':
+                return total / n.where(n > 0)
+            if stat == 'std':
+                shifted_total = total - n * self._shift.get(col, 0.0)
+                m2 = (partial[(col, 'sumsq')] - shifted_total ** 2 / n.where(n > 0)).clip(lower=0)
+                return np.sqrt(m2 / (n - 1).where(n > 1))
+        raise ValueError(f'Unsupported statistic: {stat}')
+
+    def result(self, key, spec):
+        """Return the rollup for ``key`` shaped like ``groupby(key).agg(spec)``"""
+        partial = self._partials[key]
+        partial = partial[partial[('size', '')] > 0].sort_index()
+
+        if all(isinstance(stats, str) for stats in spec.values()):
+            return pd.DataFrame({col: self._statistic(partial, col, stat) for col, stat in spec.items()},
+                                index=partial.index)
+
+        data = {(col, stat): self._statistic(partial, col, stat)
+                for col, stats in spec.items() for stat in ([stats] if isinstance(stats, str) else stats)}
+        return pd.DataFrame(data, index=partial.index)
+
+    def groups(self, key):
+        partial = self._partials[key]
+        return partial.index[partial[('size', '')] > 0].sort_values()
+
+    def total(self, col, stat):
+        return self._statistic(self._partials[None], col, stat).iloc[0]
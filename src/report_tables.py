@@ -0,0 +1,59 @@
+import importlib.util
+import os
+
+import pandas as pd
+
+# Report tables written to models/ by main.py: the CSV header rows (two for the tables built
+# from multi-statistic rollups) and whether the first column is the index
+REPORT_TABLES = {
+    'monthly_patterns': {'header': [0, 1], 'index': True},
+    'carrier_performance': {'header': [0, 1], 'index': True},
+    'airport_performance': {'header': [0, 1], 'index': True},
+    'yearly_trends': {'header': [0, 1], 'index': True},
+    'stress_level_analysis': {'header': 0, 'index': True},
+    'feature_importance': {'header': 0, 'index': False},
+    'test_predictions': {'header': 0, 'index': False},
+    'compression_report': {'header': 0, 'index': False},
+    'surrogate_fidelity': {'header': 0, 'index': False},
+    'cv_results': {'header': 0, 'index': False},
+}
+TABLE_FORMATS = ('csv', 'parquet')
+
+
+def parquet_available():
+    return any(importlib.util.find_spec(engine) is not None for engine in ('pyarrow', 'fastparquet'))
+
+
+def write_report_table(df, name, models_dir='models', table_format='csv'):
+    """Save a report table as CSV or as Parquet, which keeps dtypes and multi-index columns"""
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(f'Unsupported table format: {table_format}')
+    if table_format == 'parquet' and not parquet_available():
+        print(f'pyarrow is not installed, saving {name} as CSV')
+        table_format = 'csv'
+
+    path = os.path.join(models_dir, f'{name}.{table_format}')
+    if table_format == 'parquet':
+        df.to_parquet(path, index=REPORT_TABLES[name]['index'])
+    else:
+        df.to_csv(path, index=REPORT_TABLES[name]['index'])
+    return path
+
+
+def report_table_path(name, models_dir='models'):
+    """Path ``read_report_table`` reads: the newer of the Parquet and CSV files, Parquet on a tie"""
+    candidates = [os.path.join(models_dir, f'{name}.parquet'), os.path.join(models_dir, f'{name}.csv')]
+    if not parquet_available():
+        candidates = candidates[1:]
+    existing = [path for path in candidates if os.path.exists(path)]
+    if not existing:
+        raise FileNotFoundError(f'No saved {name} table in {models_dir}/ (run main.py first)')
+    return max(existing, key=os.path.getmtime)
+
+
+def read_report_table(name, models_dir='models'):
+    spec = REPORT_TABLES[name]
+    path = report_table_path(name, models_dir)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, index_col=0 if spec['index'] else None, header=spec['header'])
@@ -0,0 +1,32 @@
+import time
+
+
+class RunContext:
+    """Artifacts stages of one run hand to later stages; a get with nothing stored computes it and records the miss"""
+
+    def __init__(self, events=None, stage=None):
+        self._artifacts = {}
+        # Pass a shared list to collect the events of several contexts, e.g. for the run record
+        self.events = events if events is not None else []
+        self.stage = stage
+
+    def __contains__(self, name):
+        return name in self._artifacts
+
+    def put(self, name, value):
+        self._artifacts[name] = value
+        return value
+
+    def get(self, name, compute=None):
+        if name in self._artifacts:
+            self.events.append({'artifact': name, 'status': 'hit', 'seconds': 0.0, 'stage': self.stage})
+            return self._artifacts[name]
+        if compute is None:
+            raise KeyError(f'{name} was not produced by an earlier stage of this run')
+
+        start = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - start
+        self.events.append({'artifact': name, 'status': 'miss', 'seconds': elapsed, 'stage': self.stage})
+        print(f'[cache miss] {name} recomputed in {elapsed:.2f}s')
+        return self.put(name, value)
@@ -0,0 +1,147 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+VOLUME_BINS = [0, 50, 200, 500, float('inf')]
+VOLUME_LABELS = ['Low (<50)', 'Medium (50-200)', 'High (200-500)', 'Major (>500)']
+DELAY_BINS = [0, 0.15, 0.25, 0.35, 1.0]
+DELAY_LABELS = ['Very Low (<15%)', 'Moderate (15-25%)', 'High (25-35%)', 'Very High (>35%)']
+BATCH_ROWS = 100_000
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy (log-spaced buckets, as in DDSketch)"""
+    # Bucket bounds grow by gamma = (1 + a) / (1 - a), so quantiles are within a relative error of a; values
+    # below min_value count as zero, those above max_value fall in the last bucket.
+
+    def __init__(self, relative_accuracy=0.005, min_value=1e-9, max_value=1.0):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.offset = self._index(min_value)
+        self.counts = np.zeros(self._index(max_value) - self.offset + 1, dtype=np.int64)
+        self.zero_count = 0
+
+    def _index(self, value):
+        return int(math.ceil(math.log(value) / self.log_gamma))
+
+    @property
+    def count(self):
+        return self.zero_count + int(self.counts.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        small = values < self.min_value
+        self.zero_count += int(small.sum())
+        indices = np.ceil(np.log(np.minimum(values[~small], self.max_value)) / self.log_gamma).astype(np.int64)
+        self.counts += np.bincount(indices - self.offset, minlength=len(self.counts))
+
+    def merge(self, other):
+        if (other.relative_accuracy, other.min_value, other.max_value) != (self.relative_accuracy, self.min_value,
+                                                                           self.max_value):
+            raise ValueError('Only sketches with the same settings can be merged')
+        self.counts += other.counts
+        self.zero_count += other.zero_count
+        return self
+
+    def quantile(self, q):
+        n = self.count
+        if n == 0:
+            return float('nan')
+        rank = q * (n - 1)
+        if rank < self.zero_count:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.counts), rank - self.zero_count, side='right'))
+        # Midpoint of the bucket (gamma**(k-1), gamma**k] in relative terms
+        return 2 * math.exp((i + self.offset) * self.log_gamma) / (1 + math.exp(self.log_gamma))
+
+
+class SegmentErrorStats:
+    """Per-segment absolute-error statistics accumulated batch by batch and mergeable across workers"""
+    # Count, mean and squared deviations combine with Chan's parallel update; the median comes from a QuantileSketch
+
+    def __init__(self, labels):
+        self.labels = list(labels)
+        self.count = np.zeros(len(self.labels), dtype=np.int64)
+        self.mean = np.zeros(len(self.labels))
+        self.m2 = np.zeros(len(self.labels))
+        self.sum_true = np.zeros(len(self.labels))
+        self.sum_pred = np.zeros(len(self.labels))
+        self.sketches = [QuantileSketch() for _ in self.labels]
+
+    def _combine(self, k, count, mean, m2):
+        total = self.count[k] + count
+        delta = mean - self.mean[k]
+        self.m2[k] += m2 + delta ** 2 * self.count[k] * count / total
+        self.mean[k] += delta * count / total
+        self.count[k] = total
+
+    def update(self, codes, y_true, y_pred):
+        """Add a batch; ``codes`` are positions in ``labels``, -1 for rows outside every segment"""
+        codes, y_true, y_pred = np.asarray(codes), np.asarray(y_true, dtype=float), np.asarray(y_pred, dtype=float)
+        abs_error = np.abs(y_true - y_pred)
+        for k in np.unique(codes[codes >= 0]):
+            rows = codes == k
+            errors = abs_error[rows]
+            self._combine(k, len(errors), errors.mean(), ((errors - errors.mean()) ** 2).sum())
+            self.sum_true[k] += y_true[rows].sum()
+            self.sum_pred[k] += y_pred[rows].sum()
+            self.sketches[k].update(errors)
+        return self
+
+    def merge(self, other):
+        if other.labels != self.labels:
+            raise ValueError('Only accumulators over the same segments can be merged')
+        for k in np.flatnonzero(other.count):
+            self._combine(k, other.count[k], other.mean[k], other.m2[k])
+            self.sum_true[k] += other.sum_true[k]
+            self.sum_pred[k] += other.sum_pred[k]
+            self.sketches[k].merge(other.sketches[k])
+        return self
+
+    def to_frame(self, index_name, include_means=False):
+        """Observed segments in label order, laid out like groupby().agg() on abs_error"""
+        observed = self.count > 0
+        count = self.count[observed]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2[observed] / (count - 1))
+        columns = {('abs_error', 'mean'): self.mean[observed],
+                   ('abs_error', 'median'): [s.quantile(0.5) for s, seen in zip(self.sketches, observed) if seen],
+                   ('abs_error', 'std'): np.where(count > 1, std, np.nan), ('abs_error', 'count'): count}
+        if include_means:
+            columns[('y_true', 'mean')] = self.sum_true[observed] / count
+            columns[('y_pred', 'mean')] = self.sum_pred[observed] / count
+        index = pd.CategoricalIndex([label for label, seen in zip(self.labels, observed) if seen],
+                                    categories=self.labels, ordered=True, name=index_name)
+        return pd.DataFrame(columns, index=index)
+
+
+def segment_codes(values, bins):
+    # Same right-closed intervals as pd.cut; -1 outside them
+    codes = np.searchsorted(bins, values, side='left') - 1
+    inside = (values > bins[0]) & (values <= bins[-1])
+    return np.where(inside, codes, -1)
+
+
+def _accumulate(arr_flights, y_true, y_pred):
+    volume = SegmentErrorStats(VOLUME_LABELS).update(segment_codes(arr_flights, VOLUME_BINS), y_true, y_pred)
+    delay = SegmentErrorStats(DELAY_LABELS).update(segment_codes(y_true, DELAY_BINS), y_true, y_pred)
+    return volume, delay
+
+
+def segment_error_stats(arr_flights, y_true, y_pred, batch_rows=BATCH_ROWS, max_workers=None):
+    """Error statistics by flight volume and by delay rate range, merged over row batches on a thread pool"""
+    arr_flights, y_true, y_pred = (np.asarray(a, dtype=float) for a in (arr_flights, y_true, y_pred))
+    starts = range(0, len(y_true), batch_rows)
+    volume, delay = SegmentErrorStats(VOLUME_LABELS), SegmentErrorStats(DELAY_LABELS)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for batch_volume, batch_delay in pool.map(
+                lambda s: _accumulate(arr_flights[s:s + batch_rows], y_true[s:s + batch_rows],
+                                      y_pred[s:s + batch_rows]), starts):
+            volume.merge(batch_volume)
+            delay.merge(batch_delay)
+    return volume, delay
@@ -0,0 +1,191 @@
+import argparse
+import gc
+import multiprocessing as mp
+import os
+import sys
+import threading
+
+from .drift_monitor import print_drift_report
+from .prediction_pipeline import FlightDelayPredictor, MISS_MODELS
+from .telemetry import merge_snapshots, print_telemetry, telemetry_stats
+
+_predictors = {}
+
+
+def load_shared_predictor(miss_model='model', monitor_drift=False, telemetry=False):
+    """Load the predictor once per set of arguments in the parent so forked workers inherit it copy-on-write"""
+    key = (miss_model, monitor_drift, telemetry)
+    if key not in _predictors:
+        _predictors[key] = FlightDelayPredictor(miss_model=miss_model, monitor_drift=monitor_drift,
+                                                telemetry=telemetry)
+        # Move everything loaded so far into the permanent generation, otherwise the
+        # first collection in each worker writes to every inherited object header and
+        # turns the shared pages into private copies.
+        gc.collect()
+        gc.freeze()
+    return _predictors[key]
+
+
+def process_memory():
+    """Return RSS, PSS and private memory of the current process in MB"""
+    fields = {'Rss': 'rss_mb', 'Pss': 'pss_mb', 'Private_Clean': 'private_mb', 'Private_Dirty': 'private_mb'}
+    memory = {'rss_mb': 0.0, 'pss_mb': 0.0, 'private_mb': 0.0}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    memory[fields[key]] += int(value.split()[0]) / 1024
+    except OSError:
+        import resource
+        memory = {'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'pss_mb': None,
+                  'private_mb': None}
+    return memory
+
+
+def _single_threaded(predictor):
+    # Each worker is already one of N processes; nested joblib pools would only oversubscribe
+    shadows = predictor.shadow.models.values() if predictor.shadow is not None else []
+    for model in [predictor.model, predictor.surrogate, *shadows]:
+        if hasattr(model, 'n_jobs'):
+            model.n_jobs = 1
+
+
+def _worker_loop(conn, predictor):
+    _single_threaded(predictor)
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        kind, payload = message
+        try:
+            if kind == 'predict':
+                conn.send(('ok', [predictor.predict(*query) for query in payload]))
+            elif kind == 'memory':
+                conn.send(('ok', {'pid': os.getpid(), **process_memory()}))
+            elif kind == 'drift':
+                conn.send(('ok', predictor.monitor.counts() if predictor.monitor is not None else None))
+            elif kind == 'telemetry':
+                conn.send(('ok', predictor.telemetry.snapshot() if predictor.telemetry is not None else None))
+            else:
+                conn.send(('error', f'Unknown request: {kind}'))
+        except Exception as e:
+            conn.send(('error', repr(e)))
+    conn.close()
+
+
+class PreforkScorer:
+    """Scoring workers forked (Linux only) from a parent that has already loaded the predictor"""
+
+    def __init__(self, n_workers=None, miss_model='model', monitor_drift=False, telemetry=False):
+        # Forking a process that has started threads is unsafe on macOS (system frameworks are
+        # not fork-safe), and Windows cannot fork at all
+        if not sys.platform.startswith('linux'):
+            raise RuntimeError('Prefork serving is only supported on Linux')
+
+        self.predictor = load_shared_predictor(miss_model, monitor_drift, telemetry)
+        ctx = mp.get_context('fork')
+        self._lock = threading.Lock()
+        self._workers = []
+        for _ in range(n_workers or os.cpu_count() or 1):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(target=_worker_loop, args=(child_conn, self.predictor), daemon=True)
+            proc.start()
+            child_conn.close()
+            self._workers.append((proc, parent_conn))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _request(self, payloads, kind):
+        with self._lock:
+            for (_, conn), payload in zip(self._workers, payloads):
+                conn.send((kind, payload))
+            replies = [conn.recv() for _, conn in self._workers[:len(payloads)]]
+
+        for status, reply in replies:
+            if status != 'ok':
+                raise RuntimeError(f'Scoring worker failed: {reply}')
+        return [reply for _, reply in replies]
+
+    def predict_many(self, queries):
+        """Score (carrier, airport, month, arr_flights) tuples across the workers, preserving order"""
+        queries = list(queries)
+        n = len(self._workers)
+        size = -(-len(queries) // n) if queries else 0
+        chunks = [queries[i * size:(i + 1) * size] for i in range(n)]
+        return [result for chunk in self._request(chunks, 'predict') for result in chunk]
+
+    def predict(self, carrier, airport, month, arr_flights=100):
+        return self._request([[(carrier, airport, month, arr_flights)]], 'predict')[0][0]
+
+    def memory_report(self):
+        return {'parent': {'pid': os.getpid(), **process_memory()},
+                'workers': self._request([None] * len(self._workers), 'memory')}
+
+    def drift_report(self):
+        """Drift report over the queries scored by every worker (their histograms summed)"""
+        monitor = self.predictor.monitor
+        if monitor is None:
+            return None
+        counts = [c for c in self._request([None] * len(self._workers), 'drift') if c is not None]
+        return monitor.report({name: sum(c[name] for c in counts) for name in counts[0]} if counts else None)
+
+    def telemetry_snapshot(self):
+        """Hit/miss counts, latency histograms and missed keys of every worker, merged"""
+        if self.predictor.telemetry is None:
+            return None
+        return merge_snapshots([s for s in self._request([None] * len(self._workers), 'telemetry') if s is not None])
+
+    def close(self):
+        for proc, conn in self._workers:
+            if proc.is_alive():
+                conn.send(None)
+            conn.close()
+        for proc, _ in self._workers:
+            proc.join(timeout=5)
+        self._workers = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prefork scoring workers sharing one loaded predictor')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--miss-model', choices=MISS_MODELS, default='model',
+                        help='score routes missing from the lookup with the model or the distilled surrogate')
+    parser.add_argument('--monitor-drift', action='store_true',
+                        help='compare the scored queries with the training distributions and print PSI/KS')
+    parser.add_argument('--telemetry', action='store_true',
+                        help='print the lookup hit ratio, latency per prediction path and the most missed keys')
+    args = parser.parse_args()
+
+    with PreforkScorer(args.workers, miss_model=args.miss_model, monitor_drift=args.monitor_drift,
+                       telemetry=args.telemetry) as scorer:
+        lookup = scorer.predictor.lookup.to_frame()
+        sample = lookup.sample(min(args.queries, len(lookup)), replace=False, random_state=42)
+        queries = [(c, a, int(m), 100) for c, a, m in sample[['carrier', 'airport', 'month']].values]
+        # Unknown routes exercise the model path as well as the lookup path
+        queries += [(c, 'ZZZ', i % 12 + 1, 100) for i, c in enumerate(sample['carrier'].values[:100])]
+        scorer.predict_many(queries)
+
+        report = scorer.memory_report()
+        parent = report['parent']
+        print(f"Parent  pid={parent['pid']}: RSS {parent['rss_mb']:.1f} MB")
+        for worker in report['workers']:
+            print(f"Worker  pid={worker['pid']}: RSS {worker['rss_mb']:.1f} MB, "
+                  f"PSS {worker['pss_mb']:.1f} MB, private {worker['private_mb']:.1f} MB")
+
+        drift = scorer.drift_report()
+        if drift is not None:
+            print_drift_report(drift)
+        snapshot = scorer.telemetry_snapshot()
+        if snapshot is not None:
+            print_telemetry(telemetry_stats(snapshot))
+
+
+if __name__ == '__main__':
+    main()
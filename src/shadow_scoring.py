@@ -0,0 +1,181 @@
+import copy
+import fnmatch
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+SHADOW_INDEX_PATH = 'models/shadow_models.pkl'
+SHADOW_FILE_PATTERN = 'shadow_*.pkl'
+# Batches waiting for the shadows beyond this are dropped rather than queued
+MAX_PENDING = 16
+# Bounds of prediction_pipeline.risk_level, to count how often a shadow gives the same risk level
+RISK_BOUNDS = (0.15, 0.25, 0.35)
+
+
+def save_shadow_models(models, directory='models'):
+    """Save the fitted models not being served, ``{name: (key, model)}``, one file per model"""
+    # The index maps display names to files, so a predictor only unpickles the shadows it asks for; files of models
+    # that are no longer shadows are removed.
+    os.makedirs(directory, exist_ok=True)
+    index = {}
+    for name, (key, model) in models.items():
+        index[name] = f'shadow_{key}.pkl'
+        joblib.dump(model, os.path.join(directory, index[name]))
+    for stale in fnmatch.filter(os.listdir(directory), SHADOW_FILE_PATTERN):
+        if stale not in index.values() and stale != os.path.basename(SHADOW_INDEX_PATH):
+            os.remove(os.path.join(directory, stale))
+    joblib.dump(index, os.path.join(directory, os.path.basename(SHADOW_INDEX_PATH)))
+    return index
+
+
+def load_shadow_models(directory, names='all'):
+    """Shadow models in ``directory``, all or those whose name or key is in ``names``; None if none were saved"""
+    index_path = os.path.join(directory, os.path.basename(SHADOW_INDEX_PATH))
+    if not os.path.exists(index_path):
+        return None
+    index = joblib.load(index_path)
+    if names != 'all':
+        wanted = {names} if isinstance(names, str) else set(names)
+        index = {name: file for name, file in index.items()
+                 if name in wanted or file[len('shadow_'):-len('.pkl')] in wanted}
+    return {name: joblib.load(os.path.join(directory, file)) for name, file in index.items()}
+
+
+def _serial(model):
+    # Shadows run beside the served model; a joblib pool per shadow would take the cores it needs
+    if hasattr(model, 'get_params') and 'n_jobs' in model.get_params():
+        model = copy.copy(model)
+        model.n_jobs = 1
+    return model
+
+
+def _empty_stats():
+    return {'batches': 0, 'rows': 0, 'abs_diff': 0.0, 'sq_diff': 0.0, 'diff': 0.0, 'max_abs_diff': 0.0,
+            'same_risk': 0, 'seconds': 0.0, 'errors': 0}
+
+
+class ShadowScorer:
+    """Scores shadow models on the feature rows the primary model scored, off the request path"""
+    # submit hands the rows to a background pool and returns at once; past MAX_PENDING waiting batches a batch is
+    # dropped and counted. The pool starts on the first submit, so a scorer created before forking works in each
+    # worker. Shadows are scored with n_jobs=1.
+
+    def __init__(self, models, max_workers=1, max_pending=MAX_PENDING):
+        self.models = {name: _serial(model) for name, model in models.items()}
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._stats = {name: _empty_stats() for name in models}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._executor = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, X, primary):
+        """Queue feature rows ``X`` and the primary model's (clipped) predictions for the shadows"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='shadow-scoring')
+            executor = self._executor
+        executor.submit(self._score, X, np.asarray(primary, dtype=float))
+        return True
+
+    def _score(self, X, primary):
+        try:
+            primary_risk = np.searchsorted(RISK_BOUNDS, primary, side='right')
+            for name, model in self.models.items():
+                start = time.perf_counter()
+                try:
+                    prediction = np.clip(model.predict(X), 0, 1)
+                except Exception as e:
+                    with self._lock:
+                        self._stats[name]['errors'] += 1
+                    print(f'Shadow model {name} failed: {e!r}')
+                    continue
+                diff = prediction - primary
+                same_risk = int((np.searchsorted(RISK_BOUNDS, prediction, side='right') == primary_risk).sum())
+                with self._lock:
+                    stats = self._stats[name]
+                    stats['batches'] += 1
+                    stats['rows'] += len(diff)
+                    stats['abs_diff'] += float(np.abs(diff).sum())
+                    stats['sq_diff'] += float((diff ** 2).sum())
+                    stats['diff'] += float(diff.sum())
+                    stats['max_abs_diff'] = max(stats['max_abs_diff'], float(np.abs(diff).max(initial=0)))
+                    stats['same_risk'] += same_risk
+                    stats['seconds'] += time.perf_counter() - start
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._idle.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until every submitted batch has been scored; False if ``timeout`` ran out first"""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def report(self):
+        """Divergence of each shadow from the served predictions so far (shadow minus primary)"""
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+            dropped, pending = self.dropped, self._pending
+        rows = []
+        for name, s in stats.items():
+            n = s['rows']
+            rows.append({'model': name, 'batches': s['batches'], 'rows': n,
+                         'mean_abs_diff': s['abs_diff'] / n if n else float('nan'),
+                         'rmse_diff': np.sqrt(s['sq_diff'] / n) if n else float('nan'),
+                         'mean_diff': s['diff'] / n if n else float('nan'),
+                         'max_abs_diff': s['max_abs_diff'] if n else float('nan'),
+                         'risk_agreement': s['same_risk'] / n if n else float('nan'),
+                         'ms_per_batch': s['seconds'] / s['batches'] * 1e3 if s['batches'] else float('nan'),
+                         'errors': s['errors']})
+        report = pd.DataFrame(rows)
+        report.attrs['dropped_batches'] = dropped
+        report.attrs['pending_batches'] = pending
+        return report
+
+    def start(self, interval=60, callback=None):
+        """Call ``callback`` (print_shadow_report by default) with a fresh report every ``interval`` seconds"""
+        callback = callback or print_shadow_report
+
+        def run():
+            while not self._stop.wait(interval):
+                callback(self.report())
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='shadow-report', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        # Lets queued batches finish; further submits start a new pool
+        self.stop()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def print_shadow_report(report):
+    print(report.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+    if report.attrs['dropped_batches']:
+        print(f"Dropped {report.attrs['dropped_batches']:,} batches while the shadows were behind")
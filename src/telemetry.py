@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+
+SUB_BUCKET_BITS = 5
+# Latencies above 2**MAX_BITS ns (about 18 minutes) share the last bucket
+MAX_BITS = 40
+N_BUCKETS = (MAX_BITS - SUB_BUCKET_BITS + 1) << SUB_BUCKET_BITS
+TOP_MISSING_CAPACITY = 256
+PATHS = ('lookup', 'model', 'surrogate', 'batch')
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_index(nanoseconds):
+    """HDR-style histogram bucket of a latency, within 1 / 2**SUB_BUCKET_BITS (~3%) of its values"""
+    # Exact below 2**(SUB_BUCKET_BITS + 1), then 2**SUB_BUCKET_BITS linear sub-buckets per power of two
+    value = min(max(int(nanoseconds), 0), (1 << MAX_BITS) - 1)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return value
+    return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+
+def bucket_bounds(index):
+    """[low, high) in nanoseconds of the values counted in bucket ``index``"""
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    if shift <= 0:
+        return index, index + 1
+    low = (index - (shift << SUB_BUCKET_BITS)) << shift
+    return low, low + (1 << shift)
+
+
+def percentile(counts, q):
+    total = sum(counts)
+    if not total:
+        return float('nan')
+    rank, seen = q / 100 * total, 0
+    for index, count in enumerate(counts):
+        seen += count
+        if count and seen >= rank:
+            low, high = bucket_bounds(index)
+            return (low + high - 1) / 2
+    return float('nan')
+
+
+class TopKeys:
+    """Approximate most frequent keys in fixed memory (the Space-Saving algorithm)"""
+    # A new key replaces the least counted one and inherits its count, so counts are over-estimates by at most
+    # the count of the key it replaced.
+
+    def __init__(self, capacity=TOP_MISSING_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, key, count=1):
+        if key in self.counts or len(self.counts) < self.capacity:
+            self.counts[key] = self.counts.get(key, 0) + count
+            return
+        smallest = min(self.counts, key=self.counts.get)
+        self.counts[key] = self.counts.pop(smallest) + count
+
+
+class PredictorTelemetry:
+    """Which path each prediction took, how long it took, and which keys missed the lookup"""
+    # Like DriftMonitor, every recording thread owns its counters, so record takes no locks; snapshot() sums
+    # them into a picklable dict and stats() summarises one or several snapshots (e.g. one per worker).
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._register = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {'latency': {path: [0] * N_BUCKETS for path in PATHS}, 'total_ns': dict.fromkeys(PATHS, 0),
+                     'hits': 0, 'misses': 0, 'missing': TopKeys()}
+            self._local.shard = shard
+            with self._register:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, path, nanoseconds, missing_key=None):
+        """One single-route prediction; ``missing_key`` is the (carrier, airport, month) of a lookup miss"""
+        shard = self._shard()
+        shard['latency'][path][bucket_index(nanoseconds)] += 1
+        shard['total_ns'][path] += nanoseconds
+        if missing_key is None:
+            shard['hits'] += 1
+        else:
+            shard['misses'] += 1
+            shard['missing'].add(missing_key)
+
+    def record_batch(self, nanoseconds, hits, missing_keys):
+        shard = self._shard()
+        shard['latency']['batch'][bucket_index(nanoseconds)] += 1
+        shard['total_ns']['batch'] += nanoseconds
+        shard['hits'] += hits
+        for key in missing_keys:
+            shard['misses'] += 1
+            shard['missing'].add(key)
+
+    def snapshot(self):
+        with self._register:
+            shards = list(self._shards)
+        return merge_snapshots([{'latency': {path: list(counts) for path, counts in shard['latency'].items()},
+                                 'total_ns': dict(shard['total_ns']), 'hits': shard['hits'], 'misses': shard['misses'],
+                                 'missing': dict(shard['missing'].counts)} for shard in shards])
+
+    def stats(self, snapshot=None, top=20):
+        return telemetry_stats(snapshot if snapshot is not None else self.snapshot(), top)
+
+    def export(self, path):
+        """Write the current stats to ``path``: Prometheus text format for .prom files, JSON otherwise"""
+        snapshot = self.snapshot()
+        content = prometheus_text(snapshot) if path.endswith('.prom') else json.dumps(telemetry_stats(snapshot),
+                                                                                       indent=2)
+        # Write then rename, so a scraper never reads a half-written file
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def start_exporter(self, path, interval=60):
+        def run():
+            while not self._stop.wait(interval):
+                self.export(path)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='telemetry-exporter', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop_exporter(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def merge_snapshots(snapshots):
+    merged = {'latency': {path: [0] * N_BUCKETS for path in PATHS}, 'total_ns': dict.fromkeys(PATHS, 0), 'hits': 0,
+              'misses': 0, 'missing': {}}
+    missing = TopKeys()
+    for snapshot in snapshots:
+        for path, counts in snapshot['latency'].items():
+            merged['latency'][path] = [a + b for a, b in zip(merged['latency'][path], counts)]
+            merged['total_ns'][path] += snapshot['total_ns'][path]
+        merged['hits'] += snapshot['hits']
+        merged['misses'] += snapshot['misses']
+        for key, count in snapshot['missing'].items():
+            missing.add(key, count)
+    merged['missing'] = missing.counts
+    return merged
+
+
+def telemetry_stats(snapshot, top=20):
+    """Hit ratio, latency percentiles per path (microseconds) and the most frequent missed keys"""
+    hits, misses = snapshot['hits'], snapshot['misses']
+    latency = {}
+    for path, counts in snapshot['latency'].items():
+        n = sum(counts)
+        if n:
+            latency[path] = {'count': n, 'mean_us': snapshot['total_ns'][path] / n / 1e3,
+                             **{f'p{q:g}_us': percentile(counts, q) / 1e3 for q in PERCENTILES},
+                             'max_us': bucket_bounds(max(i for i, c in enumerate(counts) if c))[1] / 1e3}
+    top_missing = sorted(snapshot['missing'].items(), key=lambda item: item[1], reverse=True)[:top]
+    return {'predictions': hits + misses, 'hits': hits, 'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else None, 'latency': latency,
+            'top_missing': [{'carrier': c, 'airport': a, 'month': int(m), 'count': n} for (c, a, m), n in top_missing]}
+
+
+def prometheus_text(snapshot):
+    lines = ['# TYPE flightcast_lookup_total counter',
+             f'flightcast_lookup_total{{result="hit"}} {snapshot["hits"]}',
+             f'flightcast_lookup_total{{result="miss"}} {snapshot["misses"]}',
+             '# TYPE flightcast_predict_seconds histogram']
+    for path, counts in snapshot['latency'].items():
+        total, seen = sum(counts), 0
+        if not total:
+            continue
+        # Cumulative counts at power-of-two bucket boundaries keep the exposition short
+        for index, count in enumerate(counts):
+            seen += count
+            high = bucket_bounds(index)[1]
+            if high & (high - 1) == 0 and high >= 1 << SUB_BUCKET_BITS:
+                lines.append(f'flightcast_predict_seconds_bucket{{path="{path}",le="{high / 1e9:g}"}} {seen}')
+            if seen == total:
+                break
+        lines.append(f'flightcast_predict_seconds_bucket{{path="{path}",le="+Inf"}} {total}')
+        lines.append(f'flightcast_predict_seconds_sum{{path="{path}"}} {snapshot["total_ns"][path] / 1e9:g}')
+        lines.append(f'flightcast_predict_seconds_count{{path="{path}"}} {total}')
+    return '\n'.join(lines) + '\n'
+
+
+def print_telemetry(stats):
+    if stats['hit_ratio'] is not None:
+        print(f"Predictions: {stats['predictions']:,} ({stats['hit_ratio']:.1%} lookup hits)")
+    for path, summary in stats['latency'].items():
+        print(f"  {path:<10} n={summary['count']:<8,} mean {summary['mean_us']:8.1f} us  "
+              f"p50 {summary['p50_us']:8.1f}  p99 {summary['p99_us']:8.1f}  p99.9 {summary['p99.9_us']:8.1f}")
+    for row in stats['top_missing'][:10]:
+        print(f"  missed {row['carrier']}/{row['airport']}/{row['month']:>2}: {row['count']:,}")
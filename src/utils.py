@@ -1,7 +1,50 @@
 import joblib
 import pandas as pd
+import numpy as np
 import os
 
+from .drift_monitor import DRIFT_REFERENCE_PATH, build_drift_reference
+from .lookup_table import CompactLookup
+
+
+def build_leaderboards(lookup, carrier_names, airport_names):
+    carrier_board = lookup.groupby('carrier').agg(avg_delay_prob=('delay_probability', 'mean'),
+                                                  avg_delay_mins=('avg_delay_minutes', 'mean'),
+                                                  routes_count=('airport', 'size')).reset_index()
+    carrier_board.insert(1, 'carrier_name', carrier_board['carrier'].map(lambda c: carrier_names.get(c, c)))
+
+    airport_board = lookup.groupby('airport').agg(avg_delay_prob=('delay_probability', 'mean'),
+                                                  avg_delay_mins=('avg_delay_minutes', 'mean'),
+                                                  carriers_count=('carrier', 'nunique')).reset_index()
+    airport_board.insert(1, 'airport_name', airport_board['airport'].map(lambda a: airport_names.get(a, a)))
+
+    return (carrier_board.sort_values('avg_delay_prob').reset_index(drop=True),
+            airport_board.sort_values('avg_delay_prob').reset_index(drop=True))
+
+
+def _csr(src, dst, n_src):
+    order = np.lexsort((dst, src))
+    offsets = np.zeros(n_src + 1, dtype=np.int32)
+    np.cumsum(np.bincount(src, minlength=n_src), out=offsets[1:])
+    return offsets, dst[order].astype(np.int32)
+
+
+def build_route_index(lookup):
+    # Sorted carrier/airport IDs plus CSR neighbour lists in both directions: the neighbours
+    # of carriers[i] are airports[carrier_airports[carrier_offsets[i]:carrier_offsets[i + 1]]]
+    routes = lookup[['carrier', 'airport']].drop_duplicates()
+    carriers = np.array(sorted(routes['carrier'].unique()), dtype=str)
+    airports = np.array(sorted(routes['airport'].unique()), dtype=str)
+    carrier_codes = np.searchsorted(carriers, routes['carrier'].to_numpy(dtype=str))
+    airport_codes = np.searchsorted(airports, routes['airport'].to_numpy(dtype=str))
+
+    carrier_offsets, carrier_airports = _csr(carrier_codes, airport_codes, len(carriers))
+    airport_offsets, airport_carriers = _csr(airport_codes, carrier_codes, len(airports))
+
+    return {'carriers': carriers, 'airports': airports, 'carrier_offsets': carrier_offsets,
+            'carrier_airports': carrier_airports, 'airport_offsets': airport_offsets,
+            'airport_carriers': airport_carriers}
+
 
 def save_artifacts(model, scaler, encoders, feature_cols, features_to_scale, train, results):
     os.makedirs('models', exist_ok=True)
@@ -36,14 +79,20 @@ def save_artifacts(model, scaler, encoders, feature_cols, features_to_scale, tra
              'min_flights': int(train['arr_flights'].min()), 'max_flights': int(train['arr_flights'].quantile(0.995)),
              'median_flights': int(train['arr_flights'].median())}
 
+    carrier_board, airport_board = build_leaderboards(lookup, carrier_names, airport_names)
+
     joblib.dump(model, 'models/best_model.pkl')
     joblib.dump(scaler, 'models/robust_scaler.pkl')
     joblib.dump(encoders, 'models/label_encoders.pkl')
     joblib.dump(feature_cols, 'models/feature_columns.pkl')
     joblib.dump(carrier_names, 'models/carrier_names.pkl')
     joblib.dump(airport_names, 'models/airport_names.pkl')
-    joblib.dump(lookup, 'models/ui_lookup_table.pkl')
+    joblib.dump(CompactLookup.from_frame(lookup), 'models/ui_lookup_table.pkl')
     joblib.dump(stats, 'models/dataset_stats.pkl')
     joblib.dump(features_to_scale, 'models/features_to_scale.pkl')
+    joblib.dump(carrier_board, 'models/carrier_leaderboard.pkl')
+    joblib.dump(airport_board, 'models/airport_leaderboard.pkl')
+    joblib.dump(build_route_index(lookup), 'models/route_index.pkl')
+    joblib.dump(build_drift_reference(train, stats), DRIFT_REFERENCE_PATH)
 
     print('Artifacts saved to models/')
\ No newline at end of file
@@ -0,0 +1,83 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from benchmarks.synthetic_data import SCALES, make_bts_data
+from src.data_preprocessing import load_and_clean_data
+from src.feature_engineering import engineer_features
+from src.model_training import prepare_training_data
+from src.shadow_scoring import save_shadow_models
+from src.utils import save_artifacts
+
+
+@pytest.fixture(scope='session')
+def bts_clean(tmp_path_factory):
+    # Cleaned rows of the 'tiny' synthetic BTS extract
+    path = tmp_path_factory.mktemp('data') / 'bts.csv'
+    make_bts_data(**SCALES['tiny']).to_csv(path, index=False)
+    return load_and_clean_data(str(path))
+
+
+@pytest.fixture(scope='session')
+def bts_frame(bts_clean):
+    # Cleaned and feature-engineered rows
+    return engineer_features(bts_clean.copy())
+
+
+@pytest.fixture(scope='session')
+def split(bts_frame):
+    from main import split_data
+    _, train, val, test = split_data(bts_frame)
+    return {'train': train, 'val': val, 'test': test}
+
+
+@pytest.fixture(scope='session')
+def prepared(split):
+    X_train, y_train, X_val, y_val, feature_cols, encoders, scaler, features_to_scale = prepare_training_data(
+        split['train'], split['val'])
+    return {'X_train': X_train, 'y_train': y_train, 'X_val': X_val, 'y_val': y_val, 'feature_cols': feature_cols,
+            'encoders': encoders, 'scaler': scaler, 'features_to_scale': features_to_scale}
+
+
+@pytest.fixture(scope='session')
+def forest(prepared):
+    return RandomForestRegressor(n_estimators=8, max_depth=6, random_state=0).fit(prepared['X_train'],
+                                                                                   prepared['y_train'])
+
+
+@pytest.fixture(scope='session')
+def artifacts_root(tmp_path_factory, split, prepared, forest):
+    """Directory whose models/ holds the serving artifacts of a small Random Forest, with a Ridge shadow"""
+    root = tmp_path_factory.mktemp('artifacts')
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        save_artifacts(forest, prepared['scaler'], prepared['encoders'], prepared['feature_cols'],
+                       prepared['features_to_scale'], split['train'], {'test_mae': 0.0})
+        ridge = Ridge().fit(prepared['X_train'], prepared['y_train'])
+        save_shadow_models({'Ridge': ('ridge', ridge)})
+    finally:
+        os.chdir(cwd)
+    return root
+
+
+@pytest.fixture
+def in_artifacts_root(artifacts_root, monkeypatch):
+    # The predictor and the registry resolve models/ relative to the working directory
+    monkeypatch.chdir(artifacts_root)
+    return artifacts_root
+
+
+@pytest.fixture(scope='session')
+def routes(artifacts_root):
+    lookup = joblib.load(artifacts_root / 'models' / 'ui_lookup_table.pkl').to_frame()
+    return lookup[['carrier', 'airport', 'month']].drop_duplicates().reset_index(drop=True)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from src.cross_validation import FoldCache, _fit_fold, _init_worker, expanding_year_folds
+from src.model_training import prepare_training_data
+
+TRAIN_YEARS, VAL_YEAR = [2013, 2014, 2015], 2016
+
+
+@pytest.fixture(scope='module')
+def frame(bts_frame):
+    # A carrier first seen in the validation year
+    frame = bts_frame[bts_frame['year'] <= VAL_YEAR].copy()
+    first_val_rows = frame.index[frame['year'] == VAL_YEAR][:25]
+    frame.loc[first_val_rows, 'carrier'] = 'ZZ'
+    return frame
+
+
+def test_expanding_year_folds():
+    assert expanding_year_folds([2015, 2013, 2014, 2016, 2013], min_train_years=2) == [
+        ([2013, 2014], 2015), ([2013, 2014, 2015], 2016)]
+    assert expanding_year_folds([2013, 2014], min_train_years=3) == []
+
+
+def test_fold_matches_preprocessing_fitted_on_its_training_years(frame):
+    cache = FoldCache(frame)
+    center, scale = cache.scaler_statistics(TRAIN_YEARS)
+    codes = cache.category_codes(TRAIN_YEARS)
+    train, val = frame[frame['year'].isin(TRAIN_YEARS)], frame[frame['year'] == VAL_YEAR]
+    X_train, _, X_val, _, feature_cols, _, scaler, features_to_scale = prepare_training_data(train, val)
+    assert feature_cols == cache.feature_cols and features_to_scale == cache.features_to_scale
+    np.testing.assert_allclose(center, scaler.center_)
+    np.testing.assert_allclose(scale, scaler.scale_)
+
+    X = cache.X[cache.years == VAL_YEAR]
+    for col, mapping in zip(cache.category_index, codes):
+        expected = X_val[feature_cols[col]].to_numpy()
+        np.testing.assert_array_equal(mapping[X[:, col].astype(np.int64)], expected)
+    carrier = feature_cols.index('carrier')
+    assert (codes[list(cache.category_index).index(carrier)][X[:, carrier].astype(np.int64)] == -1).sum() == 25
+
+
+def test_fit_fold_scores_the_validation_year(frame):
+    cache = FoldCache(frame)
+    _init_worker(cache.X, cache.y, cache.years, cache.scale_index, cache.category_index)
+    row = _fit_fold(0, TRAIN_YEARS, VAL_YEAR, 'Ridge', *cache.scaler_statistics(TRAIN_YEARS),
+                    cache.category_codes(TRAIN_YEARS))
+    assert row['train_years'] == '2013-2015' and row['val_rows'] == (frame['year'] == VAL_YEAR).sum()
+    assert 0 <= row['val_mae'] < 0.2
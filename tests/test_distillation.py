@@ -0,0 +1,82 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.distillation import TERMS, UNKNOWN, AdditiveSurrogate, backfit, distill
+from src.prediction_pipeline import FlightDelayPredictor
+
+
+@pytest.fixture(scope='module')
+def surrogate():
+    rng = np.random.default_rng(0)
+    carriers, airports, knots = ['AA', 'DL', UNKNOWN], ['ATL', 'JFK', 'ORD', UNKNOWN], np.array([1, 10, 100, 1000])
+    sizes = {('carrier',): 3, ('airport',): 4, ('month',): 12, ('flights',): 4, ('carrier', 'month'): 36,
+             ('airport', 'month'): 48}
+    tables = {term: rng.normal(0, 0.01, size) for term, size in sizes.items()}
+    return AdditiveSurrogate(carriers, airports, knots, 0.2, tables)
+
+
+def test_predict_one_matches_predict(surrogate):
+    queries = [('AA', 'ATL', 1, 1), ('DL', 'ORD', 7, 55), ('XX', 'JFK', 12, 5000), ('AA', 'YYY', 3, 0)]
+    batch = surrogate.predict(*map(list, zip(*queries)))
+    np.testing.assert_allclose([surrogate.predict_one(*query) for query in queries], batch)
+
+
+def test_unknown_routes_use_the_unknown_slot(surrogate):
+    assert surrogate.predict_one('XX', 'YYY', 5, 100) == surrogate.predict_one(UNKNOWN, UNKNOWN, 5, 100)
+
+
+def test_flights_term_interpolates_between_knots_and_holds_outside(surrogate):
+    values = surrogate.tables[('flights',)].astype(float)
+    assert surrogate._flights_term(10) == pytest.approx(values[1])
+    assert surrogate._flights_term(0) == values[0] and surrogate._flights_term(10 ** 6) == values[-1]
+    middle = surrogate._flights_term(np.expm1((np.log1p(10) + np.log1p(100)) / 2))
+    assert middle == pytest.approx((values[1] + values[2]) / 2)
+
+
+def test_pickle_round_trip_rebuilds_the_indexes(surrogate):
+    restored = pickle.loads(pickle.dumps(surrogate))
+    assert restored.predict_one('DL', 'JFK', 2, 40) == surrogate.predict_one('DL', 'JFK', 2, 40)
+
+
+def test_backfit_recovers_an_additive_function(rng):
+    sizes = {('a',): 5, ('b',): 7}
+    codes = {('a',): rng.integers(0, 5, 2000), ('b',): rng.integers(0, 7, 2000)}
+    effects = {term: rng.normal(0, 1, size) for term, size in sizes.items()}
+    y = 3.0 + sum(effects[term][codes[term]] for term in sizes)
+    intercept, tables = backfit(codes, sizes, y)
+    fitted = intercept + sum(tables[term][codes[term]] for term in sizes)
+    np.testing.assert_allclose(fitted, y, atol=1e-6)
+
+
+def test_distill_reports_fidelity_against_the_model(in_artifacts_root):
+    predictor = FlightDelayPredictor()
+    surrogate, report = distill(predictor)
+    assert list(report['sample']) == ['fit', 'held_out'] and set(surrogate.tables) == set(TERMS)
+    assert (report['mae'] < 0.05).all()
+    assert surrogate.fidelity['held_out']['rows'] == report.loc[1, 'rows']
+
+
+def test_months_outside_the_tables_are_rejected(surrogate):
+    for month in (0, 13):
+        with pytest.raises(ValueError):
+            surrogate.predict_one('AA', 'ATL', month, 10)
+        with pytest.raises(ValueError):
+            surrogate.predict(['AA'], ['ATL'], [month], [10])
+    assert surrogate.covers([0, 1, 12, 13]).tolist() == [False, True, True, False]
+
+
+def test_predictor_scores_months_outside_1_12_with_the_model(in_artifacts_root, surrogate):
+    model_only = FlightDelayPredictor()
+    predictor = FlightDelayPredictor()
+    predictor.surrogate = surrogate
+    for month in (0, 13):
+        assert predictor.predict('C0', 'ZZZ', month) == model_only.predict('C0', 'ZZZ', month)
+    batch = predictor.predict_batch('C0', 'ZZZ', [0, 5, 13])
+    expected = model_only.predict_batch('C0', 'ZZZ', [0, 13])
+    np.testing.assert_allclose(batch['delay_probability'].iloc[[0, 2]], expected['delay_probability'])
+    assert batch.loc[1, 'delay_probability'] == pytest.approx(np.clip(surrogate.predict_one('C0', 'ZZZ', 5, 100), 0, 1))
+    grid = predictor.scenario_grid('C0', 'ZZZ', arr_flights=[10, 100], months=[1, 13])
+    pd.testing.assert_frame_equal(grid, model_only.scenario_grid('C0', 'ZZZ', arr_flights=[10, 100], months=[1, 13]))
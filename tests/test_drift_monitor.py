@@ -0,0 +1,68 @@
+import threading
+
+import joblib
+import numpy as np
+import pytest
+
+from src.drift_monitor import N_PROBABILITY_BINS, DriftMonitor, psi
+
+
+@pytest.fixture(scope='module')
+def reference(artifacts_root):
+    # Written by save_artifacts
+    return joblib.load(artifacts_root / 'models' / 'drift_reference.pkl')
+
+
+def test_reference_has_extra_bins_for_unseen_and_invalid_values(reference):
+    counts = reference['counts']
+    assert len(counts['carrier']) == len(reference['carriers']) + 1 and counts['carrier'][-1] == 0
+    assert len(counts['month']) == 13 and counts['month'][12] == 0
+    assert len(counts['delay_probability']) == N_PROBABILITY_BINS + 1 and counts['delay_probability'][-1] == 0
+
+
+def test_scalar_and_batch_recording_agree(reference, rng):
+    carriers = reference['carriers'] + ['NEW']
+    n = 500
+    queries = (list(rng.choice(carriers, n)), list(rng.choice(reference['airports'], n)), rng.integers(0, 15, n),
+               rng.integers(1, 3000, n), np.append(rng.uniform(-0.1, 1.1, n - 1), np.nan), rng.random(n) < 0.7)
+    single, batch = DriftMonitor(reference), DriftMonitor(reference)
+    for query in zip(*queries):
+        single.record(*query)
+    batch.record_batch(*queries)
+    for name, counts in single.counts().items():
+        np.testing.assert_array_equal(counts, batch.counts()[name])
+        assert counts.sum() == n
+    assert single.counts()['month'][12] == ((queries[2] < 1) | (queries[2] > 12)).sum()
+    assert single.counts()['delay_probability'][N_PROBABILITY_BINS] == 1
+
+
+def test_out_of_range_inputs_never_raise(reference):
+    monitor = DriftMonitor(reference)
+    monitor.record('NEW', 'NEW', 13, 100, float('nan'), False)
+    monitor.record('NEW', 'NEW', 0, 100, 1.5, False)
+    monitor.record_batch(['NEW'], ['NEW'], [-4], [100], [float('nan')], [True])
+    counts = monitor.counts()
+    assert counts['month'][12] == 3 and counts['month'][11] == 0
+    assert monitor.report().set_index('feature').loc['month', 'queries'] == 3
+
+
+def test_shards_from_every_thread_are_summed(reference):
+    monitor = DriftMonitor(reference)
+
+    def record():
+        for _ in range(100):
+            monitor.record(reference['carriers'][0], reference['airports'][0], 6, 50, 0.2, True)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert monitor.counts()['source'].tolist() == [400, 0]
+    assert monitor.report().attrs['lookup_hit_rate'] == 1.0
+
+
+def test_psi_is_zero_for_identical_shapes_and_grows_with_shift():
+    reference = np.array([10, 20, 30, 40])
+    assert psi(reference, reference * 3) == pytest.approx(0)
+    assert psi(reference, np.array([40, 30, 20, 10])) > 0.25
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import Ridge
+
+from src.feature_attribution import attribute_features, path_attribution, permutation_importance
+
+
+@pytest.fixture(scope='module')
+def rows(prepared):
+    return prepared['X_val'].head(300), prepared['y_val'][:300]
+
+
+@pytest.fixture(scope='module')
+def boosting(prepared):
+    return GradientBoostingRegressor(n_estimators=10, max_depth=3, random_state=0).fit(prepared['X_train'],
+                                                                                        prepared['y_train'])
+
+
+@pytest.mark.parametrize('name', ['forest', 'boosting'])
+def test_path_contributions_sum_to_the_prediction(request, rows, name):
+    model = request.getfixturevalue(name)
+    X, _ = rows
+    bias, contributions = path_attribution(model, X)
+    assert contributions.shape == X.shape
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict(X), atol=1e-9)
+
+
+def test_tree_models_use_path_importance(forest, rows):
+    table = attribute_features(forest, *rows, n_repeats=1)
+    assert (table['method'] == 'path').all()
+    assert table['importance'].sum() == pytest.approx(1.0) and (table['importance'] >= 0).all()
+    assert table['importance'].is_monotonic_decreasing
+    expected = table['path_importance'] / table['path_importance'].sum()
+    np.testing.assert_allclose(table['importance'], expected)
+
+
+def test_linear_models_fall_back_to_permutation(prepared, rows):
+    ridge = Ridge().fit(prepared['X_train'], prepared['y_train'])
+    table = attribute_features(ridge, *rows, n_repeats=1)
+    assert (table['method'] == 'permutation').all() and 'path_importance' not in table
+    assert table['importance'].sum() == pytest.approx(1.0)
+    expected = table['permutation_importance'].clip(lower=0)
+    np.testing.assert_allclose(table['importance'], expected / expected.sum())
+
+
+def test_permutation_importance_does_not_depend_on_the_threads(forest, rows):
+    serial = permutation_importance(forest, *rows, n_repeats=2, max_workers=1)
+    threaded = permutation_importance(forest, *rows, n_repeats=2, max_workers=3, features_per_batch=2)
+    pd.testing.assert_frame_equal(serial, threaded)
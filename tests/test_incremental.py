@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+from main import split_data
+from src.feature_engineering import engineer_features, feature_statistics
+from src.incremental import extend_ensemble, full_refit_reason, incremental_update, new_rows, training_state
+from src.model_training import feature_columns
+
+
+@pytest.fixture(scope='module')
+def extended_frame(bts_frame):
+    # Two months after the test period
+    later = bts_frame[(bts_frame['year'] == 2023) & bts_frame['month'].isin([1, 2])].assign(year=2024)
+    return pd.concat([bts_frame, later], ignore_index=True)
+
+
+def test_split_keeps_year_bounds_unless_extended(extended_frame):
+    _, train, _, _ = split_data(extended_frame)
+    assert train['year'].max() == 2018
+    _, extended, val, test = split_data(extended_frame, extend_train=True)
+    assert set(extended['year']) == set(train['year']) | {2024}
+    assert set(val['year']) == {2019} and set(test['year']) == {2022, 2023}
+
+
+def test_frozen_statistics_keep_the_features_of_fitted_rows(bts_clean, bts_frame):
+    later = bts_clean[(bts_clean['year'] == 2023) & bts_clean['month'].isin([1, 2])].assign(year=2024)
+    frame = pd.concat([bts_clean, later], ignore_index=True)
+    cols = feature_columns(bts_frame)
+    frozen = engineer_features(frame.copy(), feature_statistics(bts_clean))
+    pd.testing.assert_frame_equal(frozen.iloc[:len(bts_frame)][cols], bts_frame[cols])
+    assert frozen['seasonal_delay_rate'].notna().all()
+    # Statistics of the extended frame move the rates of the rows the model was fitted on
+    moved = engineer_features(frame.copy()).iloc[:len(bts_frame)]
+    assert not moved['carrier_historical_delay_rate'].equals(bts_frame['carrier_historical_delay_rate'])
+
+
+def test_new_rows_are_after_the_trained_period(extended_frame, prepared, forest):
+    _, train, _, _ = split_data(extended_frame)
+    state = training_state(forest, 'Random Forest', train, prepared['feature_cols'], 0.05)
+    _, extended, _, _ = split_data(extended_frame, extend_train=True)
+    new = new_rows(extended, state)
+    assert set(new['year']) == {2024} and set(new['month']) == {1, 2}
+    assert not len(new_rows(train, state))
+
+
+def test_refit_reasons(split, prepared, forest):
+    state = training_state(forest, 'Random Forest', split['train'], prepared['feature_cols'], 0.05)
+    new = split['train'].head(10)
+    assert full_refit_reason(forest, state, new, prepared['encoders'], prepared['feature_cols']) is None
+    assert 'warm_start' in full_refit_reason(Ridge(), state, new, prepared['encoders'], prepared['feature_cols'])
+    assert 'columns' in full_refit_reason(forest, state, new, prepared['encoders'], prepared['feature_cols'][:-1])
+    unseen = new.assign(carrier='NEW')
+    assert 'carrier' in full_refit_reason(forest, state, unseen, prepared['encoders'], prepared['feature_cols'])
+    worn = {**state, 'incremental_rows': state['full_fit_rows']}
+    assert 'exceed' in full_refit_reason(forest, worn, new, prepared['encoders'], prepared['feature_cols'])
+    unknown = new.assign(seasonal_delay_rate=float('nan'))
+    assert 'seasonal' in full_refit_reason(forest, state, unknown, prepared['encoders'], prepared['feature_cols'])
+
+
+def test_extend_ensemble_adds_trees_to_a_copy(prepared, forest):
+    extended = extend_ensemble(forest, prepared['X_train'], prepared['y_train'], 3)
+    assert len(extended.estimators_) == len(forest.estimators_) + 3
+    # The existing trees are kept as they are
+    for kept, original in zip(extended.estimators_, forest.estimators_):
+        assert (kept.tree_.threshold == original.tree_.threshold).all()
+    assert len(forest.estimators_) == 8 and not extended.warm_start
+
+
+def test_incremental_update_without_state_needs_a_full_refit(split, prepared, forest):
+    model, _, report = incremental_update(forest, None, split['train'], split['val'], prepared['encoders'],
+                                          prepared['scaler'], prepared['feature_cols'], prepared['features_to_scale'])
+    assert model is None and report['mode'] == 'full' and 'no training state' in report['reason']
+    assert report['new_rows'] == len(split['train'])
+
+
+def test_incremental_update_reports_the_time_saved(extended_frame, prepared, forest):
+    _, train, val, _ = split_data(extended_frame)
+    state = training_state(forest, 'Random Forest', train, prepared['feature_cols'], 0.05, fit_seconds=30.0)
+    assert state['full_fit_seconds'] == 30.0
+    _, extended, _, _ = split_data(extended_frame, extend_train=True)
+    _, _, report = incremental_update(forest, state, extended, val, prepared['encoders'], prepared['scaler'],
+                                      prepared['feature_cols'], prepared['features_to_scale'], n_new_trees=2)
+    assert report['new_trees'] == 2 and report['full_fit_seconds'] == 30.0
+    assert report['seconds_saved'] == pytest.approx(30.0 - report['seconds'])
@@ -0,0 +1,70 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.lookup_table import CompactLookup
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'carrier': ['B', 'A', 'A', 'B', 'A'], 'airport': ['X', 'Y', 'X', 'X', 'X'],
+                         'month': [2, 1, 12, 1, 1], 'arr_del15': [3.0, 10.0, 0.0, 5.0, 20_000_001.0],
+                         'arr_flights': [30.0, 40.0, 0.0, 25.0, 80_000_001.0],
+                         'avg_delay_minutes': [12.5, 9.0, 0.0, 14.0, 11.0]})
+
+
+def test_get_and_find_agree_with_the_frame(frame):
+    lookup = CompactLookup.from_frame(frame)
+    expected = frame['arr_del15'] / frame['arr_flights']
+    for i, (carrier, airport, month) in enumerate(frame[['carrier', 'airport', 'month']].values):
+        pos = lookup.get(carrier, airport, month)
+        assert pos >= 0
+        assert lookup.delay_probability(pos) == pytest.approx(expected[i], nan_ok=True)
+    positions = lookup.find(frame['carrier'], frame['airport'], frame['month'])
+    assert (positions == [lookup.get(*key) for key in frame[['carrier', 'airport', 'month']].values]).all()
+
+
+def test_misses_return_minus_one(frame):
+    lookup = CompactLookup.from_frame(frame)
+    assert lookup.get('A', 'Y', 2) == -1
+    assert lookup.get('Z', 'X', 1) == -1
+    assert lookup.find(['A', 'Z', 'B'], ['Y', 'X', 'Q'], [2, 1, 1]).tolist() == [-1, -1, -1]
+
+
+def test_out_of_range_months_miss(frame):
+    lookup = CompactLookup.from_frame(frame)
+    # ('A', 'X', 14) and ('B', 'X', -12) have the key of ('A', 'Y', 1)
+    for month in (0, 13, 14, -12, float('nan')):
+        assert lookup.get('A', 'X', month) == -1
+    assert lookup.find(['A', 'A', 'B', 'A'], ['X', 'X', 'X', 'Y'], [14, 0, -12, 1]).tolist() == [
+        -1, -1, -1, lookup.get('A', 'Y', 1)]
+
+
+def test_counts_stay_exact(frame):
+    lookup = CompactLookup.from_frame(frame)
+    # 80,000,001 is not representable in float32 (2**24 limit), so the flight counts stay float64
+    assert lookup.values['arr_flights'].dtype == np.float64
+    assert lookup.values['avg_delay_minutes'].dtype == np.float32
+    pos = lookup.get('A', 'X', 1)
+    assert lookup.delay_probability(pos) == 20_000_001.0 / 80_000_001.0
+
+
+def test_round_trips_through_pickle_and_frame(frame):
+    lookup = pickle.loads(pickle.dumps(CompactLookup.from_frame(frame)))
+    restored = lookup.to_frame().sort_values(['carrier', 'airport', 'month']).reset_index(drop=True)
+    original = frame.sort_values(['carrier', 'airport', 'month']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(restored[original.columns], original, check_dtype=False)
+
+
+def test_group_means_skip_missing_rates(frame):
+    lookup = CompactLookup.from_frame(frame)
+    rates = (frame['arr_del15'] / frame['arr_flights']).where(frame['arr_flights'] > 0)
+    expected = rates.groupby(frame['carrier']).mean()
+    pd.testing.assert_series_equal(lookup.carrier_means(), expected.rename('delay_probability'), check_names=False)
+
+
+def test_rejects_duplicate_keys(frame):
+    with pytest.raises(ValueError):
+        CompactLookup.from_frame(pd.concat([frame, frame.head(1)]))
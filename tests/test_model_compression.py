@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import Ridge
+
+from src.model_compression import CompactForest, compress_model, tree_order
+
+
+@pytest.fixture(scope='module')
+def boosting(prepared):
+    return GradientBoostingRegressor(n_estimators=10, max_depth=3, random_state=0).fit(prepared['X_train'],
+                                                                                      prepared['y_train'])
+
+
+@pytest.mark.parametrize('name', ['forest', 'boosting'])
+def test_exact_edges_predict_like_sklearn(name, request, prepared):
+    model = request.getfixturevalue(name)
+    compact = CompactForest.from_model(model)
+    assert len(compact) == (8 if name == 'forest' else 10)
+    np.testing.assert_allclose(compact.predict(prepared['X_val']), model.predict(prepared['X_val']), atol=1e-6)
+
+
+def test_leaf_values_are_the_tree_predictions(prepared, forest):
+    compact = CompactForest.from_model(forest)
+    values = compact.leaf_values(prepared['X_val'])
+    assert values.shape == (len(forest.estimators_), len(prepared['X_val']))
+    X = prepared['X_val'].to_numpy(dtype=np.float32)
+    np.testing.assert_allclose(values[3], forest.estimators_[3].predict(X), atol=1e-6)
+    np.testing.assert_allclose(compact.predict_from_leaves(values), compact.predict(prepared['X_val']))
+
+
+def test_tree_subset_and_small_dtypes(prepared, forest):
+    full = CompactForest.from_model(forest)
+    compact = CompactForest.from_model(forest, trees=[2, 5], leaf_dtype='float16', max_bins=16)
+    assert len(compact) == 2 and compact.value.dtype == np.float16
+    assert all(len(edges) <= 16 for edges in compact.edges)
+    assert compact.nbytes < full.nbytes
+    assert compact.predict(prepared['X_val'][:0]).shape == (0,)
+
+
+def test_tree_order_is_a_permutation(prepared, forest, boosting):
+    order = tree_order(forest, prepared['X_val'], prepared['y_val'])
+    assert sorted(order) == list(range(8))
+    assert tree_order(boosting, prepared['X_val'], prepared['y_val']) == list(range(10))
+
+
+def test_compress_model_selects_within_the_val_mae_limit(prepared, forest):
+    X_val, y_val = prepared['X_val'], prepared['y_val']
+    test_mae = np.abs(np.clip(forest.predict(X_val), 0, 1) - y_val).mean()
+    compact, report = compress_model(forest, X_val, y_val, X_val, y_val, test_mae)
+    assert report['selected'].sum() == 1 and report.iloc[0]['model'] == 'original'
+    if compact is not None:
+        selected = report[report['selected']].iloc[0]
+        assert selected['val_mae'] <= report.iloc[0]['val_mae'] * 1.01 and len(compact) == selected['trees']
+    assert compress_model(Ridge().fit(X_val, y_val), X_val, y_val, X_val, y_val, test_mae)[0] is None
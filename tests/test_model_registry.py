@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+from src.model_registry import (current_version, prune, publish, resolve_models_dir, rollback, version_dir,
+                                versions)
+from src.prediction_pipeline import FlightDelayPredictor, ReloadingPredictor
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return str(tmp_path / 'registry')
+
+
+@pytest.fixture
+def source(artifacts_root):
+    return str(artifacts_root / 'models')
+
+
+def test_publish_copies_the_artifacts_with_a_manifest(source, registry):
+    assert current_version(registry) is None and resolve_models_dir(registry) == 'models'
+    version = publish(source, registry)
+    assert current_version(registry) == version and resolve_models_dir(registry) == version_dir(version, registry)
+    with open(os.path.join(version_dir(version, registry), 'manifest.json')) as f:
+        files = json.load(f)['files']
+    assert 'best_model.pkl' in files and 'shadow_ridge.pkl' in files and 'shadow_models.pkl' in files
+    assert files['best_model.pkl']['bytes'] == os.path.getsize(os.path.join(source, 'best_model.pkl'))
+    assert not [name for name in os.listdir(registry) if name.endswith('.tmp')]
+
+
+def test_publish_refuses_incomplete_artifacts(tmp_path, registry):
+    with pytest.raises(FileNotFoundError, match='best_model.pkl'):
+        publish(str(tmp_path), registry)
+    assert versions(registry) == []
+
+
+def test_rollback_and_prune_keep_the_current_version(source, registry):
+    published = [publish(source, registry, keep=0) for _ in range(3)]
+    assert versions(registry) == published
+    rollback(published[0], registry)
+    assert current_version(registry) == published[0]
+    with pytest.raises(FileNotFoundError):
+        rollback('v-missing', registry)
+    prune(registry, keep=1)
+    assert versions(registry) == [published[0], published[2]]
+
+
+def test_predictor_loads_the_version_of_its_registry(in_artifacts_root, registry):
+    assert FlightDelayPredictor(registry_dir=registry).version is None
+    version = publish('models', registry)
+    predictor = FlightDelayPredictor(registry_dir=registry)
+    assert predictor.version == version and predictor.models_dir == version_dir(version, registry)
+
+
+def test_reloading_predictor_follows_the_pointer(in_artifacts_root, registry, routes):
+    first = publish('models', registry)
+    loads = []
+    predictor = ReloadingPredictor(interval=3600, on_load=lambda new, old: loads.append((new, old)),
+                                   registry_dir=registry)
+    try:
+        assert predictor.version == first and not predictor.reload_if_changed()
+        second = publish('models', registry)
+        served = predictor.current
+        assert predictor.reload_if_changed() and predictor.version == second
+        assert loads[-1] == (predictor.current, served)
+        query = (routes['carrier'][0], routes['airport'][0], int(routes['month'][0]))
+        assert predictor.predict(*query)['delay_probability'] == served.predict(*query)['delay_probability']
+    finally:
+        predictor.stop()
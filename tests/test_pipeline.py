@@ -0,0 +1,54 @@
+import json
+
+import pandas as pd
+
+from src.pipeline import Pipeline, Stage, output_rows
+from src.profiling import StageProfiler
+from src.run_context import RunContext
+
+
+def make_frame():
+    return pd.DataFrame({'x': range(5)})
+
+
+def split_frame(frame):
+    return {'train': frame.iloc[:3], 'test': frame.iloc[3:], 'note': 'not a frame'}
+
+
+def test_output_rows():
+    assert output_rows(make_frame()) == 5
+    assert output_rows(split_frame(make_frame())) == 5
+    assert output_rows((object(), {'a': 1}, 0.5)) is None
+
+
+def test_stage_records_rows_and_thread_cpu(tmp_path):
+    profiler = StageProfiler()
+    pipeline = Pipeline([Stage('frame', make_frame), Stage('split', split_frame, deps=['frame'])],
+                        cache_dir=str(tmp_path / 'cache'), profiler=profiler)
+    pipeline.run(['split'])
+    records = {record['stage']: record for record in profiler.stages}
+    assert records['frame']['rows'] == 5 and records['split']['rows'] == 5
+    assert all(record['cpu_seconds'] >= 0 for record in records.values())
+    # A process-wide high-water mark, so it cannot fall from one stage to the next
+    peaks = [record['peak_rss_mb'] for record in profiler.stages]
+    assert all(peak > 0 for peak in peaks) and peaks == sorted(peaks)
+
+    cached = Pipeline([Stage('frame', make_frame), Stage('split', split_frame, deps=['frame'])],
+                      cache_dir=str(tmp_path / 'cache'))
+    cached.run(['split'])
+    assert [event['status'] for event in cached.events] == ['hit']
+
+
+def test_run_record_includes_context_events(tmp_path):
+    events = []
+    evaluate = RunContext(events=events, stage='evaluate')
+    evaluate.put('X_test', 1)
+    report = RunContext(events=events, stage='report')
+    report.get('X_test', lambda: 2)
+    evaluate.get('X_test')
+
+    path = StageProfiler().write_json(str(tmp_path), cache_events=events)
+    with open(path) as f:
+        record = json.load(f)
+    assert [(e['stage'], e['status']) for e in record['cache_events']] == [('report', 'miss'), ('evaluate', 'hit')]
+    assert 'peak_rss_mb' in record
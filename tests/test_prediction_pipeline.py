@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+
+from src.prediction_pipeline import SCENARIO_FLIGHTS, FlightDelayPredictor
+from src.uncertainty import (INTERVAL_LEVEL, observed_interval, observed_interval_one, tree_ensemble,
+                             tree_interval)
+
+
+@pytest.fixture(scope='module')
+def predictor(artifacts_root):
+    return FlightDelayPredictor(models_dir=str(artifacts_root / 'models'), registry_dir='no-registry')
+
+
+def test_tree_interval_is_the_quantiles_across_trees(forest, prepared):
+    X = prepared['X_val'].head(50)
+    values = tree_ensemble(forest).leaf_values(X)
+    per_tree = np.array([tree.predict(X.to_numpy()) for tree in forest.estimators_])
+    np.testing.assert_allclose(values, per_tree)
+    low, high = tree_interval(values)
+    np.testing.assert_allclose(low, np.clip(np.quantile(per_tree, 0.05, axis=0), 0, 1))
+    np.testing.assert_allclose(high, np.clip(np.quantile(per_tree, 0.95, axis=0), 0, 1))
+    # 101 trees predicting 0, 0.01, ..., 1 (and the same shifted past 1, which is clipped)
+    spread = np.linspace(0, 1, 101)[:, None] + np.array([[0.0, 0.5]])
+    low, high = tree_interval(spread, level=0.8)
+    np.testing.assert_allclose(low, [0.1, 0.6])
+    np.testing.assert_allclose(high, [0.9, 1.0])
+
+
+def test_boosting_has_no_tree_interval(prepared):
+    boosting = GradientBoostingRegressor(n_estimators=3, max_depth=2).fit(prepared['X_train'], prepared['y_train'])
+    assert tree_ensemble(boosting) is None
+
+
+def test_wilson_interval():
+    assert observed_interval_one(45, 100) == pytest.approx((0.3706, 0.5321), abs=1e-4)
+    # No delays: the lower bound is 0 and the upper one z^2 / (n + z^2)
+    z = 1.6448536
+    assert observed_interval_one(0, 20) == pytest.approx((0.0, z ** 2 / (20 + z ** 2)))
+    assert all(math.isnan(bound) for bound in observed_interval_one(3, 0))
+    low, high = observed_interval([45, 0, 5, 3], [100, 20, 5, 0])
+    np.testing.assert_allclose(low[:3], [observed_interval_one(45, 100)[0], 0.0, observed_interval_one(5, 5)[0]])
+    np.testing.assert_allclose(high[:3], [observed_interval_one(45, 100)[1], observed_interval_one(0, 20)[1], 1.0])
+    assert np.isnan(low[3]) and np.isnan(high[3])
+    # Narrower with more flights at the same rate, wider at a higher level
+    assert np.diff(observed_interval_one(450, 1000)) < np.diff(observed_interval_one(45, 100))
+    assert np.diff(observed_interval_one(45, 100, level=0.99)) > np.diff(observed_interval_one(45, 100))
+
+
+def test_predict_reports_an_interval_around_the_prediction(predictor, routes):
+    hit = predictor.predict(routes['carrier'][0], routes['airport'][0], int(routes['month'][0]))
+    assert hit['interval_source'] == 'observed' and hit['interval_level'] == INTERVAL_LEVEL
+    assert hit['interval_low'] <= hit['delay_probability'] <= hit['interval_high']
+    miss = predictor.predict('C0', 'ZZZ', 3)
+    assert miss['interval_source'] == 'trees'
+    assert miss['interval_low'] <= miss['delay_probability'] <= miss['interval_high']
+
+
+def test_predict_batch_intervals_contain_the_predictions(predictor, routes):
+    sample = routes.head(200)
+    hits = predictor.predict_batch(sample['carrier'], sample['airport'], sample['month'])
+    misses = predictor.predict_batch('C0', 'ZZZ', np.repeat(np.arange(1, 13), 3), np.tile([5, 100, 3000], 12))
+    for batch in (hits, misses):
+        assert batch[['interval_low', 'interval_high']].notna().all().all()
+        assert (batch['interval_low'] <= batch['delay_probability']).all()
+        assert (batch['delay_probability'] <= batch['interval_high']).all()
+    # A hit in a batch gets the interval predict gives it
+    single = predictor.predict(sample['carrier'][0], sample['airport'][0], int(sample['month'][0]))
+    assert hits.loc[0, 'interval_low'] == pytest.approx(single['interval_low'])
+    assert hits.loc[0, 'interval_high'] == pytest.approx(single['interval_high'])
+
+
+def test_scenario_grid_covers_every_month_and_volume(predictor, routes):
+    grid = predictor.scenario_grid(routes['carrier'][0], routes['airport'][0])
+    assert len(grid) == 12 * len(SCENARIO_FLIGHTS)
+    assert list(grid.columns) == ['month', 'arr_flights', 'delay_probability', 'interval_low', 'interval_high',
+                                  'historical_delay_probability']
+    # Months vary slowest
+    assert grid['month'].tolist() == np.repeat(np.arange(1, 13), len(SCENARIO_FLIGHTS)).tolist()
+    assert grid['arr_flights'].tolist() == np.tile(SCENARIO_FLIGHTS, 12).tolist()
+
+
+def test_scenario_grid_matches_predict_cell_by_cell(predictor):
+    # A route missing from the lookup, so predict scores it with the model like every grid cell
+    grid = predictor.scenario_grid('C0', 'ZZZ', arr_flights=[5, 100, 3000], months=[2, 7, 12])
+    for row in grid.itertuples():
+        single = predictor.predict('C0', 'ZZZ', row.month, row.arr_flights)
+        assert row.delay_probability == pytest.approx(single['delay_probability'])
+        assert (row.interval_low, row.interval_high) == pytest.approx((single['interval_low'],
+                                                                      single['interval_high']))
+    assert grid['historical_delay_probability'].isna().all()
+
+
+def test_scenario_grid_models_routes_in_the_lookup(predictor, routes):
+    carrier, airport = routes['carrier'][0], routes['airport'][0]
+    months = sorted(routes.loc[(routes['carrier'] == carrier) & (routes['airport'] == airport), 'month'])[:2]
+    grid = predictor.scenario_grid(carrier, airport, arr_flights=[10, 400], months=months + [13])
+    features = predictor._build_features(carrier, airport, grid['month'], grid['arr_flights'])
+    np.testing.assert_allclose(grid['delay_probability'],
+                               np.clip(predictor.model.predict(features[predictor.feature_cols]), 0, 1))
+    # The historical rate is the lookup's, repeated over the volumes; month 13 is not in the lookup
+    historical = [predictor.predict(carrier, airport, int(month))['delay_probability'] for month in months]
+    np.testing.assert_allclose(grid['historical_delay_probability'][:4], np.repeat(historical, 2))
+    assert grid['historical_delay_probability'][4:].isna().all()
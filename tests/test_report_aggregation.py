@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.report_aggregation import GroupingSetsAggregator
+
+KEYS = ['month', 'carrier', 'airport', 'year', 'operational_stress_level']
+ROLLUP_SPEC = {'delay_rate': ['mean', 'std', 'count'], 'arr_del15': 'sum', 'arr_flights': 'sum',
+               'avg_delay_minutes': 'mean'}
+
+
+@pytest.fixture(scope='module')
+def frames(split):
+    frames = [split['train'], split['val'], split['test'].copy()]
+    # Missing values are skipped like groupby skips them
+    frames[2].loc[frames[2].index[::7], 'avg_delay_minutes'] = np.nan
+    return frames
+
+
+@pytest.fixture(scope='module')
+def aggregator(frames):
+    # Built as main.report_analysis builds it, one frame at a time
+    aggregator = GroupingSetsAggregator(keys=KEYS + [None],
+                                        measures={'delay_rate': ['mean', 'std', 'count'], 'arr_del15': 'sum',
+                                                  'arr_flights': 'sum', 'avg_delay_minutes': 'mean'})
+    for frame in frames:
+        delay_rate = np.where(frame['arr_flights'] > 0, frame['arr_del15'] / frame['arr_flights'], 0)
+        aggregator.update(frame, extra={'delay_rate': delay_rate})
+    return aggregator
+
+
+@pytest.fixture(scope='module')
+def combined(frames):
+    combined = pd.concat(frames)
+    return combined.assign(delay_rate=np.where(combined['arr_flights'] > 0,
+                                               combined['arr_del15'] / combined['arr_flights'], 0))
+
+
+@pytest.mark.parametrize('key', KEYS)
+def test_rollup_matches_groupby(aggregator, combined, key):
+    expected = combined.groupby(key).agg(ROLLUP_SPEC)
+    pd.testing.assert_frame_equal(aggregator.result(key, ROLLUP_SPEC), expected, check_index_type=False)
+    pd.testing.assert_frame_equal(aggregator.result(key, ROLLUP_SPEC).round(4), expected.round(4),
+                                  check_index_type=False)
+
+
+def test_flat_spec_matches_groupby(aggregator, combined):
+    spec = {'delay_rate': 'mean', 'arr_del15': 'sum', 'arr_flights': 'sum'}
+    pd.testing.assert_frame_equal(aggregator.result('operational_stress_level', spec),
+                                  combined.groupby('operational_stress_level').agg(spec), check_index_type=False)
+
+
+def test_grand_total_and_undeclared_statistics(aggregator, combined):
+    assert aggregator.total('avg_delay_minutes', 'mean') == pytest.approx(combined['avg_delay_minutes'].mean())
+    assert aggregator.n_rows == len(combined)
+    with pytest.raises(ValueError):
+        aggregator.result('month', {'arr_flights': 'mean'})
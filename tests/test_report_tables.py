@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import report_tables
+from src.report_tables import read_report_table, report_table_path, write_report_table
+
+
+def rollup():
+    # Shaped like main.py's monthly_patterns: (measure, statistic) columns indexed by month
+    index = pd.Index(range(1, 13), name='month')
+    columns = pd.MultiIndex.from_tuples([('delay_rate', 'mean'), ('delay_rate', 'std'), ('delay_rate', 'count'),
+                                         ('arr_del15', 'sum')])
+    values = np.column_stack([np.linspace(0.1, 0.3, 12), np.linspace(0.01, 0.05, 12), np.arange(100, 112),
+                              np.arange(12) * 10.0])
+    return pd.DataFrame(values, index=index, columns=columns).astype({('delay_rate', 'count'): 'int64',
+                                                                     ('arr_del15', 'sum'): 'int64'})
+
+
+def flat():
+    return pd.DataFrame({'feature': ['month', 'carrier'], 'importance': [0.75, 0.25]})
+
+
+def test_csv_round_trip_keeps_two_row_headers(tmp_path):
+    path = write_report_table(rollup(), 'monthly_patterns', models_dir=str(tmp_path))
+    assert path.endswith('.csv')
+    pd.testing.assert_frame_equal(read_report_table('monthly_patterns', models_dir=str(tmp_path)), rollup())
+
+
+def test_csv_round_trip_of_flat_tables(tmp_path):
+    write_report_table(flat(), 'feature_importance', models_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(read_report_table('feature_importance', models_dir=str(tmp_path)), flat())
+
+    stress = pd.DataFrame({'delay_rate': [0.1, 0.2]}, index=pd.Index(['Low', 'High'], name='operational_stress_level'))
+    write_report_table(stress, 'stress_level_analysis', models_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(read_report_table('stress_level_analysis', models_dir=str(tmp_path)), stress)
+
+
+@pytest.mark.skipif(not report_tables.parquet_available(), reason='needs pyarrow or fastparquet')
+def test_parquet_round_trip_and_newest_file_wins(tmp_path):
+    models_dir = str(tmp_path)
+    csv_path = write_report_table(rollup(), 'monthly_patterns', models_dir=models_dir)
+    parquet_path = write_report_table(rollup(), 'monthly_patterns', models_dir=models_dir, table_format='parquet')
+    pd.testing.assert_frame_equal(read_report_table('monthly_patterns', models_dir=models_dir), rollup())
+    # A CSV written after the Parquet file (e.g. by a run without pyarrow) is the one read
+    os.utime(csv_path, (os.path.getmtime(parquet_path) + 10,) * 2)
+    assert report_table_path('monthly_patterns', models_dir=models_dir) == csv_path
+
+
+def test_parquet_falls_back_to_csv_without_an_engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_tables, 'parquet_available', lambda: False)
+    path = write_report_table(flat(), 'feature_importance', models_dir=str(tmp_path), table_format='parquet')
+    assert path.endswith('.csv')
+    pd.testing.assert_frame_equal(read_report_table('feature_importance', models_dir=str(tmp_path)), flat())
+    with pytest.raises(ValueError):
+        write_report_table(flat(), 'feature_importance', models_dir=str(tmp_path), table_format='xlsx')
+    with pytest.raises(FileNotFoundError):
+        read_report_table('cv_results', models_dir=str(tmp_path))
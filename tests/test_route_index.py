@@ -0,0 +1,30 @@
+import pandas as pd
+
+from src.prediction_pipeline import FlightDelayPredictor
+from src.utils import build_route_index
+
+
+def neighbours(index, i, side):
+    offsets = index[f'{side}_offsets']
+    other = 'airports' if side == 'carrier' else 'carriers'
+    return index[other][index[f'{side}_{other}'][offsets[i]:offsets[i + 1]]].tolist()
+
+
+def test_csr_lists_match_the_routes():
+    lookup = pd.DataFrame({'carrier': ['B', 'A', 'B', 'A', 'C', 'B'], 'airport': ['X', 'Y', 'X', 'X', 'Z', 'Y'],
+                           'month': [1, 1, 2, 3, 1, 1]})
+    index = build_route_index(lookup)
+    assert index['carriers'].tolist() == ['A', 'B', 'C']
+    assert index['airports'].tolist() == ['X', 'Y', 'Z']
+    assert [neighbours(index, i, 'carrier') for i in range(3)] == [['X', 'Y'], ['X', 'Y'], ['Z']]
+    assert [neighbours(index, i, 'airport') for i in range(3)] == [['A', 'B'], ['A', 'B'], ['C']]
+
+
+def test_predictor_neighbours_match_the_lookup(in_artifacts_root, routes):
+    predictor = FlightDelayPredictor()
+    for carrier, group in routes.groupby('carrier'):
+        assert predictor.get_carrier_airports(carrier) == sorted(group['airport'].unique())
+    for airport, group in routes.groupby('airport'):
+        assert predictor.get_airport_carriers(airport) == sorted(group['carrier'].unique())
+    assert predictor.get_carrier_airports('unknown') == []
+    assert predictor.get_airport_carriers('unknown') == []
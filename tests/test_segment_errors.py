@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.segment_errors import (DELAY_BINS, DELAY_LABELS, VOLUME_BINS, VOLUME_LABELS, QuantileSketch,
+                                SegmentErrorStats, segment_codes, segment_error_stats)
+
+
+def test_sketch_quantiles_are_within_the_relative_accuracy(rng):
+    values = rng.uniform(0.001, 0.5, 20_000)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.update(values)
+    for q in (0.1, 0.5, 0.9):
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.02)
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_sketch_merge_equals_one_sketch_over_all_values(rng):
+    values = np.concatenate([rng.uniform(0, 0.3, 5000), [0.0, np.nan, 2.0]])
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    whole.update(values)
+    left.update(values[:2000])
+    right.update(values[2000:])
+    left.merge(right)
+    np.testing.assert_array_equal(left.counts, whole.counts)
+    assert left.zero_count == whole.zero_count and left.count == len(values) - 1
+    with pytest.raises(ValueError):
+        left.merge(QuantileSketch(relative_accuracy=0.01))
+
+
+def test_segment_codes_match_pd_cut():
+    values = np.array([0, 1, 50, 50.5, 200, 500, 501, -3])
+    expected = pd.cut(values, VOLUME_BINS, labels=False)
+    np.testing.assert_array_equal(segment_codes(values, VOLUME_BINS), np.nan_to_num(expected, nan=-1))
+
+
+def test_merged_batches_match_groupby(rng):
+    n = 3000
+    arr_flights = rng.integers(1, 1000, n).astype(float)
+    y_true = rng.uniform(0, 0.5, n)
+    y_pred = np.clip(y_true + rng.normal(0, 0.05, n), 0, 1)
+    volume, delay = segment_error_stats(arr_flights, y_true, y_pred, batch_rows=700, max_workers=3)
+
+    frame = pd.DataFrame({'arr_flights': arr_flights, 'y_true': y_true, 'y_pred': y_pred,
+                          'abs_error': np.abs(y_true - y_pred)})
+    for stats, column, bins, labels in ((volume, 'arr_flights', VOLUME_BINS, VOLUME_LABELS),
+                                        (delay, 'y_true', DELAY_BINS, DELAY_LABELS)):
+        grouped = frame.groupby(pd.cut(frame[column], bins, labels=labels), observed=True)['abs_error']
+        table = stats.to_frame(column, include_means=True)
+        np.testing.assert_allclose(table[('abs_error', 'mean')], grouped.mean())
+        np.testing.assert_allclose(table[('abs_error', 'std')], grouped.std())
+        np.testing.assert_array_equal(table[('abs_error', 'count')], grouped.count())
+        np.testing.assert_allclose(table[('abs_error', 'median')], grouped.median(), rtol=0.02)
+    with pytest.raises(ValueError):
+        volume.merge(SegmentErrorStats(DELAY_LABELS))
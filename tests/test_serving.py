@@ -0,0 +1,33 @@
+import sys
+
+import pytest
+
+from src import serving
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='prefork serving is Linux only')
+
+
+def test_shared_predictor_is_cached_per_arguments(in_artifacts_root, monkeypatch):
+    monkeypatch.setattr(serving, '_predictors', {})
+    plain = serving.load_shared_predictor()
+    assert serving.load_shared_predictor() is plain
+    monitored = serving.load_shared_predictor(monitor_drift=True)
+    assert monitored is not plain
+    assert monitored.monitor is not None and plain.monitor is None
+
+
+def test_workers_score_like_the_parent(in_artifacts_root, routes, monkeypatch):
+    monkeypatch.setattr(serving, '_predictors', {})
+    queries = [(c, a, int(m), 100) for c, a, m in routes.head(20).values] + [('C0', 'ZZZ', 3, 100)]
+    with serving.PreforkScorer(2) as scorer:
+        results = scorer.predict_many(queries)
+        expected = [scorer.predictor.predict(*query) for query in queries]
+    assert [r['delay_probability'] for r in results] == [r['delay_probability'] for r in expected]
+
+
+def test_workers_run_every_model_single_threaded(in_artifacts_root, monkeypatch):
+    monkeypatch.setattr(serving, '_predictors', {})
+    predictor = serving.load_shared_predictor()
+    predictor.model.n_jobs = -1
+    serving._single_threaded(predictor)
+    assert predictor.model.n_jobs == 1
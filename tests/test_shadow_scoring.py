@@ -0,0 +1,83 @@
+import threading
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.prediction_pipeline import FlightDelayPredictor
+from src.shadow_scoring import ShadowScorer, load_shadow_models, save_shadow_models
+
+
+class Constant:
+    def __init__(self, value, gate=None):
+        self.value = value
+        self.gate = gate
+
+    def predict(self, X):
+        if self.gate is not None:
+            self.gate.wait()
+        return np.full(len(X), self.value)
+
+
+class Broken:
+    def predict(self, X):
+        raise RuntimeError('no')
+
+
+def test_divergence_statistics():
+    scorer = ShadowScorer({'high': Constant(0.3), 'broken': Broken()})
+    try:
+        assert scorer.submit(np.zeros((4, 2)), [0.1, 0.2, 0.3, 0.4])
+        assert scorer.wait(timeout=10)
+    finally:
+        scorer.close()
+    report = scorer.report().set_index('model')
+    high = report.loc['high']
+    assert high['rows'] == 4 and high['batches'] == 1
+    assert high['mean_abs_diff'] == pytest.approx(0.1)
+    assert high['mean_diff'] == pytest.approx(0.05) and high['max_abs_diff'] == pytest.approx(0.2)
+    # Only the served 0.3 has the shadow's risk level
+    assert high['risk_agreement'] == pytest.approx(0.25)
+    assert report.loc['broken', 'errors'] == 1 and report.loc['broken', 'rows'] == 0
+
+
+def test_batches_beyond_max_pending_are_dropped():
+    gate = threading.Event()
+    scorer = ShadowScorer({'slow': Constant(0.2, gate)}, max_pending=2)
+    try:
+        results = [scorer.submit(np.zeros((1, 1)), [0.2]) for _ in range(5)]
+        assert results == [True, True, False, False, False] and scorer.report().attrs['dropped_batches'] == 3
+        gate.set()
+        assert scorer.wait(timeout=10)
+    finally:
+        scorer.close()
+    assert scorer.report().loc[0, 'batches'] == 2
+
+
+def test_shadows_are_scored_single_threaded():
+    model = RandomForestRegressor(n_estimators=2, n_jobs=-1)
+    scorer = ShadowScorer({'rf': model})
+    assert scorer.models['rf'].n_jobs == 1 and model.n_jobs == -1
+
+
+def test_save_and_load_by_name_or_key(tmp_path):
+    directory = str(tmp_path)
+    save_shadow_models({'Constant': ('const', Constant(0.1)), 'Other': ('other', Constant(0.2))}, directory)
+    assert set(load_shadow_models(directory)) == {'Constant', 'Other'}
+    assert set(load_shadow_models(directory, ['const'])) == {'Constant'}
+    assert set(load_shadow_models(directory, 'Other')) == {'Other'}
+    save_shadow_models({'Other': ('other', Constant(0.2))}, directory)
+    assert not (tmp_path / 'shadow_const.pkl').exists()
+    assert load_shadow_models(str(tmp_path / 'missing')) is None
+
+
+def test_predictor_submits_the_rows_the_model_scores(in_artifacts_root):
+    predictor = FlightDelayPredictor(shadow_models='all', registry_dir='no-registry')
+    try:
+        predictor.predict('C0', 'ZZZ', 3)
+        predictor.scenario_grid('C0', 'ZZZ', arr_flights=[10, 100], months=[1, 2])
+        assert predictor.shadow.wait(timeout=10)
+        report = predictor.shadow_report().set_index('model')
+        assert report.loc['Ridge', 'batches'] == 2 and report.loc['Ridge', 'rows'] == 5
+    finally:
+        predictor.shadow.close()
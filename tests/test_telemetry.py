@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.telemetry import (MAX_BITS, N_BUCKETS, SUB_BUCKET_BITS, PredictorTelemetry, TopKeys, bucket_bounds,
+                           bucket_index, merge_snapshots, percentile, prometheus_text)
+
+
+def test_buckets_tile_the_range_without_gaps():
+    previous_high = 0
+    for index in range(N_BUCKETS):
+        low, high = bucket_bounds(index)
+        assert low == previous_high and high > low
+        previous_high = high
+    assert previous_high == 1 << MAX_BITS
+
+
+def test_every_value_falls_in_its_bucket_within_the_relative_width(rng):
+    values = np.concatenate([np.arange(200), rng.integers(200, 1 << MAX_BITS, 5000)])
+    for value in values.tolist():
+        low, high = bucket_bounds(bucket_index(value))
+        assert low <= value < high
+        assert high - low <= max(1, low >> SUB_BUCKET_BITS)
+    assert bucket_index(-5) == 0 and bucket_index(1 << (MAX_BITS + 3)) == N_BUCKETS - 1
+
+
+def test_percentile_of_a_histogram():
+    counts = [0] * N_BUCKETS
+    for value in range(1, 101):
+        counts[bucket_index(value * 1000)] += 1
+    assert percentile(counts, 50) == pytest.approx(50_000, rel=2 ** -SUB_BUCKET_BITS)
+    assert percentile(counts, 99) == pytest.approx(99_000, rel=2 ** -SUB_BUCKET_BITS)
+    assert np.isnan(percentile([0] * N_BUCKETS, 50))
+
+
+def test_top_keys_keeps_the_heavy_hitters():
+    top = TopKeys(capacity=3)
+    for key, count in [('a', 50), ('b', 30), ('c', 1), ('d', 1), ('e', 1)]:
+        for _ in range(count):
+            top.add(key)
+    assert len(top.counts) == 3 and top.counts['a'] == 50 and top.counts['b'] == 30
+    # The replacing key inherits the count it evicted
+    assert sum(top.counts.values()) == 83
+
+
+def test_snapshots_merge_and_export(tmp_path):
+    workers = [PredictorTelemetry(), PredictorTelemetry()]
+    workers[0].record('lookup', 2_000)
+    workers[0].record('model', 3_000_000, missing_key=('AA', 'XYZ', 4))
+    workers[1].record('model', 5_000_000, missing_key=('AA', 'XYZ', 4))
+    workers[1].record_batch(40_000, hits=10, missing_keys=[('DL', 'ABC', 1)])
+    merged = merge_snapshots([worker.snapshot() for worker in workers])
+    stats = workers[0].stats(merged)
+    assert (stats['hits'], stats['misses']) == (11, 3)
+    assert stats['latency']['model']['count'] == 2 and stats['latency']['model']['mean_us'] == 4000
+    assert stats['top_missing'][0] == {'carrier': 'AA', 'airport': 'XYZ', 'month': 4, 'count': 2}
+    text = prometheus_text(merged)
+    assert 'flightcast_predict_seconds_count{path="model"} 2' in text
+
+    path = tmp_path / 'telemetry.json'
+    workers[0].export(str(path))
+    assert json.loads(path.read_text())['predictions'] == 2